@@ -0,0 +1,7 @@
+"""
+Importable access to the Dr. Carlos Cortés RAG corpus.
+"""
+
+from .documents import BASE_DIR, MANIFEST_PATH, Corpus, Document, load_manifest
+
+__all__ = ["BASE_DIR", "MANIFEST_PATH", "Corpus", "Document", "load_manifest"]
@@ -0,0 +1,202 @@
+"""
+Inverted-file (IVF) approximate nearest-neighbour index over the vector store.
+
+Spherical k-means splits the embedding space into n_lists cells. Every
+vector is filed under its nearest centroid and the vectors are re-stored in
+cell order, so a query only scores the vectors of the `nprobe` cells whose
+centroids are closest to it: one contiguous slice per cell. With n_lists
+around 4 * sqrt(n), the work per query grows roughly with sqrt(n) instead of n.
+nprobe is the recall/latency knob; nprobe = n_lists is an exact search.
+"""
+
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import BUILD_DIR
+from .lexical import _gather, _install_dir, _load_array, _save_array
+from .vectors import FLOAT32_CACHE_BYTES, VectorStore
+
+IVF_DIR = BUILD_DIR / "ivf"
+FORMAT_VERSION = 1
+DEFAULT_NPROBE = 8
+
+def default_n_lists(n):
+    return max(1, min(n, round(4 * math.sqrt(n))))
+
+def _rows_float32(vectors, start, end):
+    return np.asarray(vectors[start:end], dtype=np.float32)
+
+def _normalize(matrix):
+    lengths = np.linalg.norm(matrix, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    return matrix / lengths
+
+def assign(vectors, centroids, block_rows=65536):
+    """Nearest centroid (by dot product) for every row, computed block by block."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        end = min(start + block_rows, len(vectors))
+        labels[start:end] = np.argmax(_rows_float32(vectors, start, end) @ centroids.T, axis=1)
+    return labels
+
+def kmeans(vectors, n_lists, iters=20, seed=0):
+    """Spherical k-means on a (n, dim) float32 array; returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iters):
+        labels = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            # Reseed empty cells with the points that fit their centroid worst
+            fit = np.einsum('ij,ij->i', vectors, centroids[labels])
+            sums[empty] = vectors[np.argsort(fit)[:empty.size]]
+        new = _normalize(sums)
+        if np.allclose(new, centroids, atol=1e-6):
+            centroids = new
+            break
+        centroids = new
+    return centroids.astype(np.float32)
+
+def build_ivf(store=None, out_dir=IVF_DIR, n_lists=None, iters=20, train_size=None, seed=0):
+    """Train centroids on (a sample of) the store and write the IVF index to out_dir."""
+    store = store if store is not None else VectorStore.load()
+    out_dir = Path(out_dir)
+    n = len(store)
+    if n == 0:
+        raise ValueError("cannot build an IVF index over an empty vector store")
+    n_lists = min(n_lists or default_n_lists(n), n)
+    train_size = min(train_size or 256 * n_lists, n)
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(n, train_size, replace=False))
+    centroids = kmeans(np.asarray(store.vectors[sample], dtype=np.float32), n_lists, iters, seed)
+    labels = assign(store.vectors, centroids)
+
+    order = np.argsort(labels, kind='stable')
+    list_ptr = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=list_ptr[1:])
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    _save_array(tmp_dir, "centroids", centroids)
+    _save_array(tmp_dir, "list_ptr", list_ptr)
+    _save_array(tmp_dir, "list_rows", order.astype(np.int64))
+    _save_array(tmp_dir, "list_vectors", np.asarray(store.vectors[order]))
+    scales = store.scales[order] if store.scales is not None else np.ones(n, dtype=np.float32)
+    _save_array(tmp_dir, "list_scales", np.asarray(scales, dtype=np.float32))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "store_built_at": store.meta.get("built_at"),
+        "embedder_id": store.meta.get("embedder_id"),
+        "count": n,
+        "n_lists": n_lists,
+        "train_size": train_size,
+        "largest_list": int(np.diff(list_ptr).max()),
+    }
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    _install_dir(tmp_dir, out_dir)
+    return meta
+
+class IVFIndex:
+    """Read side of the IVF index; hits come back in VectorStore.search() form."""
+
+    ARRAYS = ("centroids", "list_ptr", "list_rows", "list_vectors", "list_scales")
+
+    def __init__(self, arrays, meta, store, ivf_dir=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.store = store
+        self.ivf_dir = ivf_dir
+        self.centroids = np.asarray(arrays["centroids"], dtype=np.float32)
+        self.list_ptr = np.asarray(arrays["list_ptr"])
+        self.list_rows = arrays["list_rows"]
+        self.list_vectors = arrays["list_vectors"]
+        if self.list_vectors.dtype == np.float16 and self.list_vectors.nbytes * 2 <= FLOAT32_CACHE_BYTES:
+            # Same trade-off as VectorStore: converting float16 per probe costs more than the dot products
+            self.list_vectors = np.asarray(self.list_vectors, dtype=np.float32)
+        self.list_scales = arrays["list_scales"]
+        self.n_lists = meta["n_lists"]
+        # int8 stores need their per-row scales; float16 ones carry all-ones
+        self.scaled = store.scales is not None
+
+    @classmethod
+    def load(cls, ivf_dir=IVF_DIR, store=None):
+        """Open an IVF index; it must have been built from this exact vector store."""
+        ivf_dir = Path(ivf_dir)
+        store = store if store is not None else VectorStore.load()
+        with open(ivf_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported IVF format in {ivf_dir}: {meta.get('format_version')}")
+        if meta.get("store_built_at") != store.meta.get("built_at") or meta["count"] != len(store):
+            raise ValueError(f"IVF index in {ivf_dir} is stale; rebuild it from the current vector store")
+        arrays = {name: _load_array(ivf_dir, name) for name in cls.ARRAYS}
+        return cls(arrays, meta, store, ivf_dir)
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def probe(self, query, nprobe):
+        """The nprobe cells whose centroids score highest against one query vector."""
+        nprobe = min(nprobe, self.n_lists)
+        scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            return np.argpartition(-scores, nprobe - 1)[:nprobe]
+        return np.arange(self.n_lists)
+
+    def top_k(self, queries, k=10, nprobe=DEFAULT_NPROBE, stats=None):
+        """Approximate top-k store rows and scores for (n_queries, dim) query vectors.
+
+        Rows are sorted by descending score; queries whose probed cells hold
+        fewer than k vectors are padded with row -1 and score -inf.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows_out = np.full((len(queries), k), -1, dtype=np.int64)
+        scores_out = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        scanned = 0
+        for i, query in enumerate(queries):
+            cells = self.probe(query, nprobe)
+            starts = self.list_ptr[cells]
+            ends = self.list_ptr[cells + 1]
+            block = _gather(self.list_vectors, starts, ends)
+            if len(block) == 0:
+                continue
+            scores = block.astype(np.float32, copy=False) @ query
+            if self.scaled:
+                scores *= _gather(self.list_scales, starts, ends)
+            positions = np.arange(len(scores))
+            if len(scores) > k:
+                positions = np.argpartition(-scores, k - 1)[:k]
+            positions = positions[np.argsort(-scores[positions], kind='stable')]
+            rows_out[i, :len(positions)] = _gather(self.list_rows, starts, ends)[positions]
+            scores_out[i, :len(positions)] = scores[positions]
+            scanned += len(scores)
+        if stats is not None:
+            stats["vectors_scanned"] = stats.get("vectors_scanned", 0) + scanned
+            stats["vectors_total"] = stats.get("vectors_total", 0) + len(self) * len(queries)
+        return rows_out, scores_out
+
+    def search_vectors(self, queries, k=10, nprobe=DEFAULT_NPROBE, stats=None):
+        rows, scores = self.top_k(queries, k, nprobe, stats)
+        hit = self.store.hit
+        return [[hit(int(r), float(s)) for r, s in zip(row, row_scores) if r >= 0]
+                for row, row_scores in zip(rows.tolist(), scores.tolist())]
+
+    def search_batch(self, texts, k=10, nprobe=DEFAULT_NPROBE, stats=None):
+        """Approximate top-k hits for each query string."""
+        return self.search_vectors(self.store.embed(texts), k, nprobe, stats)
+
+    def search(self, query, k=10, nprobe=DEFAULT_NPROBE, stats=None):
+        """Approximate top-k hits for one query string."""
+        return self.search_batch([query], k, nprobe, stats)[0]
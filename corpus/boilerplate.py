@@ -0,0 +1,147 @@
+"""
+Cross-page boilerplate removal for scraped blog HTML.
+
+Tag-based filtering (dropping nav/header/footer/aside) leaves whatever site
+chrome the theme puts inside the article element: "Latest Posts" sidebars,
+newsletter prompts, bylines, share lines. Those blocks are identical on many
+pages of the same site, while real paragraphs almost never are, so a
+BoilerplateFilter counts in how many pages each normalised block occurs
+(by 8-byte hash, so the model stays small) and strips every block seen on at
+least max(min_pages, min_ratio * pages) of them.
+
+parse_page() is the block extraction scrape_blog_post() has always used;
+extract_blog_text() renders the same text format with boilerplate removed.
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+MIN_PAGES = 3
+MIN_RATIO = 0.1
+MIN_BLOCK_CHARS = 10
+
+CHROME_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside']
+BLOCK_TAGS = ['p', 'h2', 'h3', 'h4', 'blockquote', 'li']
+
+def block_hash(text):
+    """Hash of a block with case and whitespace normalised."""
+    normalized = ' '.join(text.lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+def site_of(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+_CANONICAL = re.compile(r'<link[^>]*rel=["\']canonical["\'][^>]*href=["\']([^"\']+)', re.IGNORECASE)
+
+def page_site(html):
+    """Site of a saved page, from its canonical link ("" if it has none)."""
+    match = _CANONICAL.search(html)
+    return site_of(match.group(1)) if match else ""
+
+def parse_page(html):
+    """(title, blocks) for a blog page.
+
+    Blocks are the article's paragraph-level elements longer than
+    MIN_BLOCK_CHARS. When the page has no article element, title is None and
+    blocks are the lines of the whole page's text.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    for element in soup(CHROME_TAGS):
+        element.decompose()
+
+    article = soup.find('article') or soup.find('main') or soup.find(class_='post-content') or soup.find(class_='entry-content')
+    if not article:
+        return None, soup.get_text(separator='\n', strip=True).split('\n')
+
+    title_elem = soup.find('h1')
+    title = title_elem.get_text(strip=True) if title_elem else "Unknown"
+    blocks = []
+    for p in article.find_all(BLOCK_TAGS):
+        text = p.get_text(strip=True)
+        if text and len(text) > MIN_BLOCK_CHARS:
+            blocks.append(text)
+    return title, blocks
+
+def page_text(title, blocks):
+    """Render parse_page() output in the extracted/blog_posts text format."""
+    if title is None:
+        return "\n".join(blocks)
+    lines = [title, "=" * len(title), ""]
+    for block in blocks:
+        lines.append(block)
+        lines.append("")
+    return "\n".join(lines)
+
+class BoilerplateFilter:
+    """Per-site block frequencies; blocks on too many pages are boilerplate."""
+
+    def __init__(self, counts=None, n_pages=0, min_pages=MIN_PAGES, min_ratio=MIN_RATIO):
+        self.counts = Counter(counts or {})
+        self.n_pages = n_pages
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+
+    @classmethod
+    def learn(cls, pages, **options):
+        """Filter learned from an iterable of per-page block lists."""
+        model = cls(**options)
+        for blocks in pages:
+            model.add_page(blocks)
+        return model
+
+    @classmethod
+    def from_hashes(cls, hashes):
+        """Filter that strips exactly the given block hashes (see boilerplate_hashes())."""
+        return cls({h: 1 for h in hashes}, min_pages=1, min_ratio=0)
+
+    def boilerplate_hashes(self):
+        """Sorted hashes of the blocks this filter strips: all it needs to be saved."""
+        return sorted(h for h, n in self.counts.items() if n >= self.threshold)
+
+    def add_page(self, blocks):
+        self.counts.update({block_hash(b) for b in blocks})
+        self.n_pages += 1
+
+    @property
+    def threshold(self):
+        return max(self.min_pages, math.ceil(self.min_ratio * self.n_pages))
+
+    def is_boilerplate(self, block):
+        return self.counts.get(block_hash(block), 0) >= self.threshold
+
+    def strip(self, blocks, stats=None):
+        """Blocks minus boilerplate; pass a dict as stats to get {"kept", "stripped"}."""
+        kept = [b for b in blocks if not self.is_boilerplate(b)]
+        if stats is not None:
+            stats["kept"] = stats.get("kept", 0) + len(kept)
+            stats["stripped"] = stats.get("stripped", 0) + len(blocks) - len(kept)
+        return kept
+
+def learn_from_html(paths, **options):
+    """BoilerplateFilter learned from saved HTML pages of one site."""
+    return BoilerplateFilter.learn((parse_page(Path(p).read_text(encoding='utf-8'))[1] for p in paths), **options)
+
+def pages_by_site(paths):
+    """{site: [html paths]}, from each saved page's canonical link."""
+    by_site = defaultdict(list)
+    for html_path in paths:
+        by_site[page_site(Path(html_path).read_text(encoding='utf-8'))].append(html_path)
+    return by_site
+
+def learn_by_site(paths, **options):
+    """{site: BoilerplateFilter}, each learned from that site's pages only."""
+    return {site: learn_from_html(pages, **options) for site, pages in pages_by_site(paths).items()}
+
+def extract_blog_text(html, boilerplate=None, stats=None):
+    """Extracted text for a blog page, with boilerplate blocks stripped when a filter is given."""
+    title, blocks = parse_page(html)
+    if boilerplate is not None:
+        blocks = boilerplate.strip(blocks, stats)
+    return page_text(title, blocks)
@@ -0,0 +1,213 @@
+"""
+Query result cache for the retrieval front-ends.
+
+Entries are keyed by the normalised query (its token sequence, so case and
+punctuation differences share an entry) plus k and any filter/option
+arguments, and tagged with the data generation they were computed against:
+the manifest's generated_at and the build time of every index consulted. When
+the corpus or an index is rebuilt, the generation changes and every older
+entry is dropped on the next lookup. Eviction is LRU, bounded by entry count
+and estimated result size, with an optional TTL.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .documents import MANIFEST_PATH
+from .tokenizer import tokenize
+
+def normalize_query(query):
+    return ' '.join(tokenize(query))
+
+def _sizeof(value):
+    """Rough deep size in bytes of a result made of lists, dicts and scalars."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+class DataVersion:
+    """Current data generation, from the manifest and index meta.json files.
+
+    Files are re-stat'ed at most every check_interval seconds and only
+    re-read when their mtime changes, so calling current() per query is cheap.
+    """
+
+    def __init__(self, meta_paths=(), manifest_path=MANIFEST_PATH, check_interval=1.0):
+        self.paths = [manifest_path] + list(meta_paths)
+        self.check_interval = check_interval
+        self._mtimes = None
+        self._checked = 0.0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        parts = []
+        for path in self.paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                parts.append(None)
+                continue
+            parts.append(data.get("generated_at") or data.get("built_at") or data.get("updated_at"))
+        return tuple(parts)
+
+    def current(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._generation is not None and now - self._checked < self.check_interval:
+                return self._generation
+            self._checked = now
+            mtimes = []
+            for path in self.paths:
+                try:
+                    mtimes.append(os.stat(path).st_mtime_ns)
+                except OSError:
+                    mtimes.append(None)
+            if mtimes != self._mtimes:
+                self._mtimes = mtimes
+                self._generation = self._read()
+            return self._generation
+
+def index_meta_paths(searcher):
+    """meta.json (or segment state) files of every index behind a searcher.
+
+    Follows the components of wrappers such as HybridSearcher, BatchScorer
+    and IVFIndex, so the default DataVersion changes when any of them is
+    rebuilt, not only the manifest.
+    """
+    paths = []
+    seen = set()
+
+    def visit(obj):
+        if obj is None or id(obj) in seen:
+            return
+        seen.add(id(obj))
+        for attr, name in (("index_dir", "meta.json"), ("store_dir", "meta.json"), ("ivf_dir", "meta.json"),
+                           ("segments_dir", "state.json")):
+            directory = getattr(obj, attr, None)
+            if directory is not None:
+                path = Path(directory) / name
+                if path not in paths:
+                    paths.append(path)
+        for attr in ("searcher", "lexical", "vectors", "index", "store", "ivf"):
+            visit(getattr(obj, attr, None))
+
+    visit(searcher)
+    return paths
+
+class QueryCache:
+    """Thread-safe LRU cache of query results with generation tagging and optional TTL."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (generation, stored_at, size, value)
+        self._generation = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query, k=10, **filters):
+        return (normalize_query(query), k, tuple(sorted((name, repr(v)) for name, v in filters.items())))
+
+    def _drop(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _set_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def get(self, key, generation=None):
+        """Cached value or None; entries from another generation or past their TTL miss."""
+        with self._lock:
+            self._set_generation(generation)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[1] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key, value, generation=None):
+        size = _sizeof(value)
+        with self._lock:
+            self._set_generation(generation)
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, self.clock(), size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+class CachedSearcher:
+    """Wraps any object with search(query, k, **options) in a QueryCache.
+
+    Results are returned as fresh lists of hit-dict copies, so callers may
+    annotate them without touching the cached entry. Without an explicit
+    version, entries are tagged with the manifest and the meta files of the
+    searcher's own indexes (index_meta_paths).
+    """
+
+    def __init__(self, searcher, cache=None, version=None):
+        self.searcher = searcher
+        self.cache = cache if cache is not None else QueryCache()
+        self.version = version if version is not None else DataVersion(index_meta_paths(searcher))
+
+    def search(self, query, k=10, **options):
+        key = self.cache.key(query, k, **options)
+        generation = self.version.current()
+        hits = self.cache.get(key, generation)
+        if hits is None:
+            hits = self.searcher.search(query, k, **options)
+            self.cache.put(key, hits, generation)
+        return [dict(hit) for hit in hits]
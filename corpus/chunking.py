@@ -0,0 +1,243 @@
+"""
+Streaming chunker for RAG ingestion.
+
+Extracted files are read line by line, split into sentences and packed into
+overlapping chunks. Chunks never cross a [Page N] marker or a title/section
+heading (a line underlined with ===== or -----), and each one records the page
+and byte range it came from. Everything is a generator, so memory stays flat
+no matter how large a document is.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from .documents import BUILD_DIR, Corpus
+
+CHUNKS_PATH = BUILD_DIR / "chunks.jsonl"
+
+DEFAULT_MAX_TOKENS = 200
+DEFAULT_OVERLAP = 40
+
+PAGE_LINE = re.compile(r'^\[Page (\d+)\]\s*$')
+UNDERLINE = re.compile(r'^\s*(?:={3,}|-{3,})\s*$')
+SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*(?=\s|$)')
+WORD = re.compile(r'\S+')
+
+def _byte_offsets(line, positions):
+    """Byte offsets (within the UTF-8 line) of ascending character positions."""
+    if line.isascii():
+        return list(positions)
+    offsets = []
+    last_char = 0
+    last_byte = 0
+    for pos in positions:
+        last_byte += len(line[last_char:pos].encode('utf-8'))
+        last_char = pos
+        offsets.append(last_byte)
+    return offsets
+
+def _lines_with_lookahead(path):
+    """Yield (byte_offset, line, next_line) for every line of a file."""
+    offset = 0
+    prev = None
+    with open(path, 'rb') as f:
+        for raw in f:
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if prev is not None:
+                yield prev[0], prev[1], line
+            prev = (offset, line)
+            offset += len(raw)
+    if prev is not None:
+        yield prev[0], prev[1], None
+
+def iter_units(path):
+    """Stream a text file as structural events and sentences.
+
+    Yields ('page', number), ('section', heading) or
+    ('sentence', text, byte_start, byte_end, fragments), where fragments are
+    the (text, byte_start, byte_end) line pieces making up the sentence. A sentence that wraps across
+    lines (as OCR text does) is stitched back together; a blank line ends it.
+    """
+    partial = []
+    skip_underline = False
+
+    def flush():
+        if partial:
+            text = ' '.join(p[0] for p in partial)
+            event = ('sentence', text, partial[0][1], partial[-1][2], list(partial))
+            partial.clear()
+            return event
+        return None
+
+    for offset, line, next_line in _lines_with_lookahead(path):
+        if skip_underline:
+            skip_underline = False
+            continue
+
+        page = PAGE_LINE.match(line)
+        is_heading = (line.strip() and next_line is not None
+                      and UNDERLINE.match(next_line) and not UNDERLINE.match(line))
+        if page or is_heading or not line.strip():
+            event = flush()
+            if event:
+                yield event
+            if page:
+                yield ('page', int(page.group(1)))
+            elif is_heading:
+                skip_underline = True
+                yield ('section', line.strip())
+            continue
+
+        # Split the line at sentence terminators, carrying the tail over
+        cuts = [(m.end(), True) for m in SENTENCE_END.finditer(line)]
+        spans = []
+        start = 0
+        for cut, closed in cuts + [(len(line), False)]:
+            piece = line[start:cut]
+            if piece.strip():
+                spans.append((start + len(piece) - len(piece.lstrip()),
+                              start + len(piece.rstrip()), closed))
+            start = cut
+        positions = sorted({p for span in spans for p in span[:2]})
+        byte_of = dict(zip(positions, _byte_offsets(line, positions)))
+        for s, e, closed in spans:
+            partial.append((line[s:e], offset + byte_of[s], offset + byte_of[e]))
+            if closed:
+                yield flush()
+
+    event = flush()
+    if event:
+        yield event
+
+def _split_words(fragments, max_tokens):
+    """Group a sentence's words into max_tokens-word pieces with exact byte offsets."""
+    words = []
+    for text, start, _ in fragments:
+        spans = [(m.start(), m.end()) for m in WORD.finditer(text)]
+        offsets = _byte_offsets(text, [p for span in spans for p in span])
+        for i, (s, e) in enumerate(spans):
+            words.append((text[s:e], start + offsets[2 * i], start + offsets[2 * i + 1]))
+    for i in range(0, len(words), max_tokens):
+        group = words[i:i + max_tokens]
+        yield ' '.join(w[0] for w in group), group[0][1], group[-1][2], len(group)
+
+def _iter_pieces(path, unit, max_tokens):
+    """Turn iter_units() events into packable pieces (text, start, end, ntokens)."""
+    for event in iter_units(path):
+        if event[0] != 'sentence':
+            yield event
+            continue
+        _, text, start, end, fragments = event
+        ntok = len(text.split())
+        if unit == 'token' or ntok > max_tokens:
+            size = 1 if unit == 'token' else max_tokens
+            yield from (('piece',) + p for p in _split_words(fragments, size))
+        else:
+            yield ('piece', text, start, end, ntok)
+
+def _content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+def chunk_document(doc, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP, unit='sentence'):
+    """Yield chunk dicts for one Document.
+
+    unit='sentence' packs whole sentences up to max_tokens words and repeats
+    trailing sentences worth up to `overlap` words at the start of the next
+    chunk; unit='token' uses a plain sliding word window instead.
+    """
+    if unit not in ('sentence', 'token'):
+        raise ValueError(f"unknown chunk unit: {unit}")
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+
+    page = None
+    section = None
+    window = []
+    window_tokens = 0
+    fresh = False
+    seq = 0
+    seen_hashes = {}
+
+    def emit():
+        nonlocal seq
+        text = ' '.join(p[0] for p in window)
+        content_hash = _content_hash(text)
+        occurrence = seen_hashes.get(content_hash, 0)
+        seen_hashes[content_hash] = occurrence + 1
+        chunk_id = _content_hash(f"{doc.doc_id}\0{content_hash}\0{occurrence}")
+        chunk = {
+            "chunk_id": chunk_id,
+            "content_hash": content_hash,
+            "doc_id": doc.doc_id,
+            "seq": seq,
+            "page": page,
+            "section": section,
+            "byte_start": window[0][1],
+            "byte_end": window[-1][2],
+            "token_count": window_tokens,
+            "is_placeholder": doc.is_placeholder,
+            "text": text,
+        }
+        seq += 1
+        return chunk
+
+    for event in _iter_pieces(doc.path, unit, max_tokens):
+        if event[0] in ('page', 'section'):
+            if fresh:
+                yield emit()
+            window, window_tokens, fresh = [], 0, False
+            if event[0] == 'page':
+                page = event[1]
+            else:
+                section = event[1]
+            continue
+
+        piece = event[1:]
+        ntok = piece[3]
+        if window_tokens + ntok > max_tokens and fresh:
+            yield emit()
+            # Keep the tail of the window as overlap for the next chunk, as
+            # far as it still leaves room for this piece within max_tokens
+            tail = []
+            tail_tokens = 0
+            for p in reversed(window):
+                if tail_tokens + p[3] > overlap or tail_tokens + p[3] + ntok > max_tokens:
+                    break
+                tail.insert(0, p)
+                tail_tokens += p[3]
+            window, window_tokens, fresh = tail, tail_tokens, False
+        window.append(piece)
+        window_tokens += ntok
+        fresh = True
+
+    if fresh:
+        yield emit()
+
+def chunk_corpus(corpus=None, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP,
+                 unit='sentence', **filters):
+    """Yield chunks for every document in the corpus (filters as in Corpus.documents)."""
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    for doc in corpus.documents(**filters):
+        yield from chunk_document(doc, max_tokens, overlap, unit)
+
+def write_chunks(chunks, path=CHUNKS_PATH):
+    """Stream chunks to a JSONL file, replacing it atomically. Returns the count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def read_chunks(path=CHUNKS_PATH):
+    """Stream chunks back from a JSONL file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
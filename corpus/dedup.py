@@ -0,0 +1,271 @@
+"""
+Near-duplicate detection with MinHash and locality-sensitive hashing.
+
+Texts are reduced to sets of hashed word 5-shingles and summarised by a
+128-value MinHash signature, whose per-position agreement estimates the
+Jaccard similarity of two sets. LSH splits each signature into bands and
+only compares items that collide in at least one band, so finding duplicate
+pairs costs roughly linear time instead of comparing every pair.
+
+find_duplicate_documents()/annotate_manifest() group whole extracted texts
+(alternate blog slugs, re-downloads) into clusters with one canonical member;
+drop_near_duplicate_chunks() filters a chunk stream down to the first copy of
+each near-duplicate passage.
+
+Jaccard similarity cannot match a one-page placeholder summary against the
+full text that later replaces it: the full text's shingle set dwarfs it. So
+placeholders are also scored by containment, the fraction of the smaller
+set's shingles found in the larger one. Real texts are indexed as
+overlapping windows of WINDOW_SHINGLES shingles, each the size of a summary,
+so LSH proposes the texts a placeholder shares much of one window with, and
+the containment of each candidate pair is then computed exactly.
+"""
+
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from .documents import Corpus
+from .tokenizer import tokenize
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+CONTAINMENT_THRESHOLD = 0.8
+MIN_CHUNK_TOKENS = 20
+
+# Real texts are indexed for containment as windows of this many shingles,
+# overlapping by half, so a passage up to half as long lies inside one window
+WINDOW_SHINGLES = 512
+# LSH threshold for proposing placeholder/window pairs: a fully contained
+# summary of 150 shingles still shares 0.3 of a window's
+WINDOW_THRESHOLD = 0.3
+
+# Bands are tuned this far below the similarity threshold, so pairs right at
+# the threshold are almost always proposed as candidates (the exact cut is
+# made afterwards on the signature estimate)
+CANDIDATE_MARGIN = 0.15
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+class MinHasher:
+    """Shingles text and computes MinHash signatures with multiply-shift hashing."""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+    def shingle_sequence(self, text):
+        """uint64 hashes of the text's word shingles, in text order."""
+        tokens = tokenize(text)
+        if not tokens:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens), dtype=np.uint64, count=len(tokens))
+        k = min(self.shingle_size, len(tokens))
+        n = len(tokens) - k + 1
+        combined = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            combined = combined * _MIX + hashes[j:j + n]
+        return combined
+
+    def shingles(self, text):
+        """Unique uint64 hashes of the text's word shingles."""
+        return np.unique(self.shingle_sequence(text))
+
+    def signature_of(self, shingles, block=4096):
+        sig = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, shingles.size, block):
+            part = shingles[start:start + block]
+            values = (self.a[:, None] * part[None, :] + self.b[:, None]) >> np.uint64(32)
+            np.minimum(sig, values.min(axis=1).astype(np.uint32), out=sig)
+        return sig
+
+    def signature(self, text):
+        return self.signature_of(self.shingles(text))
+
+def lsh_params(threshold=THRESHOLD, num_perm=NUM_PERM):
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+def containment(shingles_a, shingles_b):
+    """Exact fraction of the smaller of two unique shingle sets that occurs in the other."""
+    small, large = sorted((shingles_a, shingles_b), key=len)
+    if small.size == 0:
+        return 0.0
+    return float(np.isin(small, large, assume_unique=True).mean())
+
+def windows(sequence, size=WINDOW_SHINGLES):
+    """Unique shingles of overlapping windows (stride size // 2) covering a shingle sequence."""
+    step = max(size // 2, 1)
+    starts = list(range(0, max(sequence.size - size, 0) + 1, step))
+    if starts[-1] + size < sequence.size:
+        starts.append(sequence.size - size)
+    return [np.unique(sequence[start:start + size]) for start in starts]
+
+class LSHIndex:
+    """Banded signature buckets; query() returns keys sharing at least one band."""
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM):
+        self.bands, self.rows = lsh_params(max(threshold - CANDIDATE_MARGIN, 0.05), num_perm)
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+        self.signatures = {}
+
+    def _band_keys(self, sig):
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, sig):
+        found = set()
+        for bucket, band in zip(self.buckets, self._band_keys(sig)):
+            found.update(bucket.get(band, ()))
+        return found
+
+    def insert(self, key, sig):
+        self.signatures[key] = sig
+        for bucket, band in zip(self.buckets, self._band_keys(sig)):
+            bucket[band].append(key)
+
+def near_duplicate_pairs(signatures, threshold=THRESHOLD):
+    """[(key_a, key_b, similarity)] for every pair above threshold, via LSH candidates."""
+    num_perm = len(next(iter(signatures.values()))) if signatures else NUM_PERM
+    lsh = LSHIndex(threshold, num_perm)
+    pairs = []
+    for key, sig in signatures.items():
+        for other in lsh.query(sig):
+            sim = similarity(sig, lsh.signatures[other])
+            if sim >= threshold:
+                pairs.append((other, key, sim))
+        lsh.insert(key, sig)
+    return pairs
+
+def _clusters(keys, pairs):
+    """Connected components (size >= 2) of the duplicate-pair graph, by union-find."""
+    parent = {k: k for k in keys}
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for a, b, _ in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+    groups = defaultdict(list)
+    for k in keys:
+        groups[find(k)].append(k)
+    return [members for members in groups.values() if len(members) > 1]
+
+def contained_placeholder_pairs(sequences, placeholders, threshold=CONTAINMENT_THRESHOLD, hasher=None,
+                                window=WINDOW_SHINGLES):
+    """[(placeholder, doc, containment)] for placeholders whose shingles mostly occur in a real text.
+
+    sequences maps keys to shingle sequences (MinHasher.shingle_sequence);
+    placeholders is the set of keys that are placeholder summaries. Windows
+    of the other texts go into an LSH index that each placeholder queries;
+    candidates are kept when their exact containment reaches threshold.
+    """
+    hasher = hasher or MinHasher()
+    lsh = LSHIndex(WINDOW_THRESHOLD, hasher.num_perm)
+    shingles = {key: np.unique(seq) for key, seq in sequences.items()}
+    for key, seq in sequences.items():
+        if key not in placeholders:
+            for i, part in enumerate(windows(seq, window)):
+                lsh.insert((key, i), hasher.signature_of(part))
+    pairs = []
+    for key in sorted(placeholders & set(sequences)):
+        candidates = {doc for doc, _ in lsh.query(hasher.signature_of(shingles[key]))}
+        for doc in sorted(candidates):
+            score = containment(shingles[key], shingles[doc])
+            if score >= threshold:
+                pairs.append((key, doc, score))
+    return pairs
+
+def find_duplicate_documents(corpus=None, threshold=THRESHOLD, hasher=None,
+                             containment_threshold=CONTAINMENT_THRESHOLD):
+    """Clusters of near-duplicate documents.
+
+    Each cluster is {"canonical", "members", "similarity"}; the canonical copy
+    is the real (non-placeholder) text with the most words, and similarity is
+    the lowest pairwise score that joined the cluster (the Jaccard estimate,
+    or for a placeholder found inside a real text, its containment).
+    """
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    hasher = hasher or MinHasher()
+    docs = {}
+    sequences = {}
+    signatures = {}
+    for doc in corpus.documents():
+        if not doc.path.exists():
+            continue
+        sequence = hasher.shingle_sequence(doc.text())
+        if sequence.size:
+            docs[doc.doc_id] = doc
+            sequences[doc.doc_id] = sequence
+            signatures[doc.doc_id] = hasher.signature_of(np.unique(sequence))
+    pairs = near_duplicate_pairs(signatures, threshold)
+    placeholders = {doc_id for doc_id, doc in docs.items() if doc.is_placeholder}
+    if placeholders:
+        pairs += contained_placeholder_pairs(sequences, placeholders, containment_threshold, hasher)
+    clusters = []
+    for members in _clusters(list(signatures), pairs):
+        members.sort(key=lambda d: (docs[d].is_placeholder, -docs[d].word_count, d))
+        member_set = set(members)
+        sims = [sim for a, b, sim in pairs if a in member_set and b in member_set]
+        clusters.append({"canonical": members[0], "members": members, "similarity": min(sims)})
+    clusters.sort(key=lambda c: c["canonical"])
+    return clusters
+
+def annotate_manifest(manifest, base_dir, threshold=THRESHOLD):
+    """Record duplicate clusters in a manifest dict (in place) and return them.
+
+    Non-canonical items get "duplicate_of": <canonical doc_id>; the manifest
+    gets a top-level "duplicate_clusters" list.
+    """
+    corpus = Corpus(manifest, base_dir)
+    clusters = find_duplicate_documents(corpus, threshold)
+    duplicate_of = {m: c["canonical"] for c in clusters for m in c["members"] if m != c["canonical"]}
+    for doc in corpus:
+        doc.item.pop("duplicate_of", None)
+        if doc.doc_id in duplicate_of:
+            doc.item["duplicate_of"] = duplicate_of[doc.doc_id]
+    manifest["duplicate_clusters"] = clusters
+    corpus.close()
+    return clusters
+
+def drop_near_duplicate_chunks(chunks, threshold=THRESHOLD, hasher=None, min_tokens=MIN_CHUNK_TOKENS,
+                               stats=None):
+    """Yield chunks, skipping any whose text nearly duplicates an earlier chunk.
+
+    Chunks shorter than min_tokens (headers, captions) are always kept: their
+    tiny shingle sets make similarity estimates meaningless. Pass a dict as
+    stats to get {"kept", "dropped", "duplicate_of": {chunk_id: kept chunk_id}}.
+    """
+    hasher = hasher or MinHasher()
+    lsh = LSHIndex(threshold, hasher.num_perm)
+    if stats is not None:
+        stats.update(kept=0, dropped=0, duplicate_of={})
+    for chunk in chunks:
+        sig = None
+        if chunk["token_count"] >= min_tokens:
+            sig = hasher.signature(chunk["text"])
+            match = next((other for other in lsh.query(sig)
+                          if similarity(sig, lsh.signatures[other]) >= threshold), None)
+            if match is not None:
+                if stats is not None:
+                    stats["dropped"] += 1
+                    stats["duplicate_of"][chunk["chunk_id"]] = match
+                continue
+            lsh.insert(chunk["chunk_id"], sig)
+        if stats is not None:
+            stats["kept"] += 1
+        yield chunk
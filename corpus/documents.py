@@ -0,0 +1,311 @@
+"""
+Lazy, memory-mapped access to the extracted corpus.
+
+A Corpus is built from manifest.json alone. Each Document carries its
+manifest fields eagerly, but only maps its extracted text into memory the
+first time the text is touched, and slices hand back memoryviews into that
+mapping rather than copies.
+"""
+
+import json
+import mmap
+import re
+from bisect import bisect_right
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+MANIFEST_PATH = BASE_DIR / "manifest.json"
+BUILD_DIR = BASE_DIR / "build"
+
+PAGE_MARKER = re.compile(rb'^\[Page (\d+)\]\r?$', re.MULTILINE)
+
+# Character offsets are resolved through a checkpoint every CHAR_STRIDE chars
+CHAR_STRIDE = 1024
+# Bytes scanned at a time when counting characters
+SCAN_BLOCK = 1 << 20
+
+def load_manifest(path=None):
+    """Load manifest.json as a dict."""
+    with open(path or MANIFEST_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def normalize_path(path):
+    """Turn a manifest path (written on Windows with backslashes) into a relative POSIX path."""
+    if not path:
+        return None
+    return path.replace('\\', '/')
+
+class Document:
+    """One manifest item, with its extracted text mapped on first use."""
+
+    def __init__(self, item, base_dir=BASE_DIR):
+        self.item = item
+        self.base_dir = Path(base_dir)
+        self.resource_type = item["resource_type"]
+        self.title = item.get("title")
+        self.source_file = item.get("source_file")
+        self.download_status = item.get("download_status")
+        self.extraction_status = item.get("extraction_status")
+        self.word_count = item.get("word_count", 0)
+        self.is_placeholder = bool(item.get("is_placeholder", False))
+        self.duplicate_of = item.get("duplicate_of")
+        self.extracted_path = normalize_path(item.get("extracted_path"))
+        self.metadata_path = normalize_path(item.get("metadata_path"))
+
+        stem_source = self.extracted_path or self.source_file or self.title
+        self.doc_id = f"{self.resource_type}/{Path(stem_source).stem}"
+
+        self._mmap = None
+        self._pages = None
+        self._char_index = None
+        self._sidecar = None
+
+    def __repr__(self):
+        return f"<Document {self.doc_id}>"
+
+    @property
+    def has_text(self):
+        return self.extracted_path is not None
+
+    @property
+    def path(self):
+        """Absolute path to the extracted text, or None."""
+        if not self.extracted_path:
+            return None
+        return self.base_dir / self.extracted_path
+
+    @property
+    def sidecar(self):
+        """Metadata sidecar JSON (loaded on first access, {} if there is none)."""
+        if self._sidecar is None:
+            self._sidecar = {}
+            if self.metadata_path:
+                meta_file = self.base_dir / self.metadata_path
+                if meta_file.exists():
+                    with open(meta_file, 'r', encoding='utf-8') as f:
+                        self._sidecar = json.load(f)
+        return self._sidecar
+
+    # ------------------------------------------------------------------
+    # Raw bytes
+    # ------------------------------------------------------------------
+
+    def _map(self):
+        if self._mmap is None:
+            if not self.has_text:
+                raise ValueError(f"{self.doc_id} has no extracted text")
+            with open(self.path, 'rb') as f:
+                if f.seek(0, 2) == 0:
+                    self._mmap = b""
+                else:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    @property
+    def buffer(self):
+        """The whole extracted file as a read-only mapping."""
+        return self._map()
+
+    @property
+    def size(self):
+        """Size of the extracted text in bytes."""
+        return len(self._map())
+
+    def view(self, start=0, end=None):
+        """Zero-copy memoryview over a byte range of the UTF-8 text."""
+        return memoryview(self._map())[start:end]
+
+    def close(self):
+        """Release the mapping; it is re-opened on next access."""
+        if self._mmap is not None and not isinstance(self._mmap, bytes):
+            self._mmap.close()
+        self._mmap = None
+
+    # ------------------------------------------------------------------
+    # Character offsets
+    # ------------------------------------------------------------------
+
+    def _build_char_index(self):
+        """Record the byte offset of every CHAR_STRIDE-th character.
+
+        Characters are counted straight from the mapping, SCAN_BLOCK bytes at
+        a time: every byte that is not a UTF-8 continuation byte starts one.
+        """
+        data = np.frombuffer(self._map(), dtype=np.uint8)
+        checkpoints = array('Q')
+        length = 0
+        for start in range(0, data.size, SCAN_BLOCK):
+            leads = np.flatnonzero((data[start:start + SCAN_BLOCK] & 0xC0) != 0x80)
+            first = -length % CHAR_STRIDE
+            checkpoints.extend((leads[first::CHAR_STRIDE] + start).tolist())
+            length += leads.size
+        if length == data.size:
+            # Pure ASCII: characters and bytes line up
+            self._char_index = (None, length)
+            return
+        if checkpoints:
+            # Stray continuation bytes at the very start belong to the first character
+            checkpoints[0] = 0
+        self._char_index = (checkpoints, length)
+
+    @property
+    def char_length(self):
+        """Length of the text in characters."""
+        if self._char_index is None:
+            self._build_char_index()
+        return self._char_index[1]
+
+    def char_to_byte(self, pos):
+        """Convert a character offset into a byte offset."""
+        if self._char_index is None:
+            self._build_char_index()
+        checkpoints, length = self._char_index
+        pos = max(0, min(pos, length))
+        if checkpoints is None:
+            return pos
+        if pos == length:
+            return self.size
+        block, rest = divmod(pos, CHAR_STRIDE)
+        start = checkpoints[block]
+        if rest == 0:
+            return start
+        end = checkpoints[block + 1] if block + 1 < len(checkpoints) else self.size
+        leads = np.flatnonzero((np.frombuffer(self._map(), dtype=np.uint8, count=end - start, offset=start) & 0xC0)
+                               != 0x80)
+        return start + int(leads[rest])
+
+    def chars(self, start=0, end=None):
+        """Zero-copy memoryview over a character range."""
+        end = self.char_length if end is None else end
+        return self.view(self.char_to_byte(start), self.char_to_byte(end))
+
+    def text(self, start=0, end=None):
+        """Decode a character range (the whole text by default)."""
+        if start == 0 and end is None:
+            return bytes(self._map()).decode('utf-8', errors='replace')
+        return bytes(self.chars(start, end)).decode('utf-8', errors='replace')
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def _scan_pages(self):
+        """Locate the [Page N] markers written by extract_text.py."""
+        buf = self._map()
+        markers = [(int(m.group(1)), m.start(), m.end()) for m in PAGE_MARKER.finditer(buf)]
+        pages = []
+        for i, (number, marker_start, marker_end) in enumerate(markers):
+            body_start = marker_end + 1 if marker_end < len(buf) else marker_end
+            body_end = markers[i + 1][1] if i + 1 < len(markers) else len(buf)
+            pages.append((number, marker_start, body_start, body_end))
+        self._pages = pages
+
+    @property
+    def pages(self):
+        """List of (page_number, marker_start, body_start, body_end) byte offsets."""
+        if self._pages is None:
+            self._scan_pages()
+        return self._pages
+
+    @property
+    def page_numbers(self):
+        return [p[0] for p in self.pages]
+
+    def page_at(self, byte_offset):
+        """Page number containing a byte offset, or None for unpaged text."""
+        pages = self.pages
+        if not pages:
+            return None
+        i = bisect_right([p[1] for p in pages], byte_offset) - 1
+        return pages[max(i, 0)][0]
+
+    def _page_entry(self, number):
+        for entry in self.pages:
+            if entry[0] == number:
+                return entry
+        raise KeyError(f"{self.doc_id} has no page {number}")
+
+    def page(self, number):
+        """Zero-copy memoryview over the body of one page (marker excluded)."""
+        _, _, body_start, body_end = self._page_entry(number)
+        return self.view(body_start, body_end)
+
+    def page_range(self, first, last):
+        """Zero-copy memoryview over pages first..last inclusive, markers included."""
+        start = self._page_entry(first)[1]
+        end = self._page_entry(last)[3]
+        return self.view(start, end)
+
+    def page_text(self, number):
+        return bytes(self.page(number)).decode('utf-8', errors='replace')
+
+class Corpus:
+    """All manifest items, addressable by doc_id and filterable on iteration."""
+
+    def __init__(self, manifest, base_dir=BASE_DIR):
+        self.manifest = manifest
+        self.base_dir = Path(base_dir)
+        self.generated_at = manifest.get("generated_at")
+        self._docs = {}
+        for item in manifest.get("items", []):
+            doc = self._document(item)
+            self._docs[doc.doc_id] = doc
+
+    def _document(self, item):
+        return Document(item, self.base_dir)
+
+    @classmethod
+    def from_manifest(cls, path=None, base_dir=None):
+        """Build a Corpus from manifest.json (defaults to the repo's own)."""
+        path = Path(path or MANIFEST_PATH)
+        return cls(load_manifest(path), base_dir or path.parent)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __iter__(self):
+        return iter(self._docs.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def __getitem__(self, doc_id):
+        return self._docs[doc_id]
+
+    def get(self, doc_id, default=None):
+        return self._docs.get(doc_id, default)
+
+    def documents(self, resource_type=None, placeholder=None, extracted=True, duplicates=True):
+        """Iterate documents, optionally filtered.
+
+        resource_type may be a single type or a collection of types.
+        placeholder=True/False keeps only placeholder / real items.
+        extracted=True skips items without extracted text.
+        duplicates=False skips items the manifest marks as a near-duplicate
+        of another (see corpus.dedup).
+        """
+        if isinstance(resource_type, str):
+            resource_type = {resource_type}
+        for doc in self._docs.values():
+            if resource_type is not None and doc.resource_type not in resource_type:
+                continue
+            if placeholder is not None and doc.is_placeholder != placeholder:
+                continue
+            if extracted and not doc.has_text:
+                continue
+            if not duplicates and doc.duplicate_of:
+                continue
+            yield doc
+
+    def close(self):
+        for doc in self._docs.values():
+            doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
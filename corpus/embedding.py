@@ -0,0 +1,204 @@
+"""
+Parallel, cached embedding of corpus chunks.
+
+Vectors are cached on disk per embedder (build/embed_cache/<embedder id>/)
+keyed by chunk content hash, so after a manifest regeneration only chunks
+whose text actually changed are embedded again. Missing chunks are embedded
+in batches across a process pool; every finished batch is written straight
+away as a shard (hashes .npy + vectors .npy), so an interrupted run resumes
+from the last completed batch.
+"""
+
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from .chunking import CHUNKS_PATH, read_chunks
+from .documents import BUILD_DIR
+from .vectors import VECTOR_DIR, HashingEmbedder, embedder_id, write_vector_store
+
+CACHE_DIR = BUILD_DIR / "embed_cache"
+HASH_DTYPE = "S16"
+MAX_SHARDS = 64
+
+class EmbeddingCache:
+    """Content-hash -> vector cache for one embedder, stored as .npy shards."""
+
+    def __init__(self, embedder_name, cache_dir=CACHE_DIR):
+        self.embedder_name = embedder_name
+        self.dir = Path(cache_dir) / re.sub(r'[^\w.-]+', '_', embedder_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.shards = []
+        self.where = {}
+        self._load()
+
+    def _shard_names(self):
+        return sorted(p.name[:-len(".hashes.npy")] for p in self.dir.glob("shard-*.hashes.npy"))
+
+    def _load(self):
+        self.shards = []
+        self.where = {}
+        for name in self._shard_names():
+            hashes = np.load(self.dir / f"{name}.hashes.npy")
+            vectors = np.load(self.dir / f"{name}.vectors.npy", mmap_mode='r')
+            shard = len(self.shards)
+            self.shards.append((name, vectors))
+            for row, h in enumerate(hashes.tolist()):
+                self.where[h.decode('ascii')] = (shard, row)
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, content_hash):
+        return content_hash in self.where
+
+    def add(self, hashes, vectors):
+        """Persist one batch as a new shard (vectors first; the hashes file marks it complete)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        number = int(self._shard_names()[-1].split('-')[1]) + 1 if self.shards else 1
+        name = f"shard-{number:06d}"
+        for suffix, values in (("vectors", vectors), ("hashes", np.asarray(hashes, dtype=HASH_DTYPE))):
+            tmp_path = self.dir / f"{name}.{suffix}.tmp.npy"
+            np.save(tmp_path, values)
+            os.replace(tmp_path, self.dir / f"{name}.{suffix}.npy")
+        shard = len(self.shards)
+        self.shards.append((name, vectors))
+        for row, h in enumerate(hashes):
+            self.where[h] = (shard, row)
+
+    def get_many(self, hashes):
+        """(len(hashes), dim) float32 vectors; every hash must be cached."""
+        located = [self.where[h] for h in hashes]
+        dim = self.shards[located[0][0]][1].shape[1] if located else 0
+        out = np.empty((len(hashes), dim), dtype=np.float32)
+        by_shard = {}
+        for i, (shard, row) in enumerate(located):
+            by_shard.setdefault(shard, ([], []))
+            by_shard[shard][0].append(i)
+            by_shard[shard][1].append(row)
+        for shard, (positions, rows) in by_shard.items():
+            out[positions] = self.shards[shard][1][rows]
+        return out
+
+    def compact(self):
+        """Merge all shards into one (dropping duplicates) once there are too many."""
+        if len(self.shards) <= MAX_SHARDS:
+            return
+        hashes = list(self.where)
+        vectors = self.get_many(hashes)
+        old = [name for name, _ in self.shards]
+        self.shards = []
+        self.where = {}
+        # Number the merged shard after the old ones so it sorts last
+        number = int(old[-1].split('-')[1]) + 1
+        name = f"shard-{number:06d}"
+        for suffix, values in (("vectors", vectors), ("hashes", np.asarray(hashes, dtype=HASH_DTYPE))):
+            tmp_path = self.dir / f"{name}.{suffix}.tmp.npy"
+            np.save(tmp_path, values)
+            os.replace(tmp_path, self.dir / f"{name}.{suffix}.npy")
+        for old_name in old:
+            (self.dir / f"{old_name}.hashes.npy").unlink()
+            (self.dir / f"{old_name}.vectors.npy").unlink()
+        self._load()
+
+# ============================================================================
+# Worker side
+# ============================================================================
+
+_worker_embedder = None
+
+def _init_worker(embedder):
+    global _worker_embedder
+    _worker_embedder = embedder
+
+def _embed_batch(hashes, texts):
+    return hashes, np.asarray(_worker_embedder(texts), dtype=np.float32)
+
+def _missing_batches(chunks, cache, batch_size):
+    """Batches of (hashes, texts) for chunks whose content is not cached yet, deduplicated."""
+    queued = set()
+    hashes, texts = [], []
+    total = 0
+    for chunk in chunks:
+        total += 1
+        h = chunk["content_hash"]
+        if h in cache or h in queued:
+            continue
+        queued.add(h)
+        hashes.append(h)
+        texts.append(chunk["text"])
+        if len(hashes) == batch_size:
+            yield hashes, texts
+            hashes, texts = [], []
+    if hashes:
+        yield hashes, texts
+
+def embed_missing(chunks, embedder, cache, workers=None, batch_size=256, progress=None):
+    """Embed every chunk whose content hash is not in the cache.
+
+    workers=0 embeds in this process; otherwise batches go to a process pool
+    (default: os.cpu_count()) with at most two batches in flight per worker.
+    progress(done, seconds) is called after each batch is cached. Returns the
+    number of chunks embedded.
+    """
+    start = time.perf_counter()
+    done = 0
+    batches = _missing_batches(chunks, cache, batch_size)
+
+    def finished(hashes, vectors):
+        nonlocal done
+        cache.add(hashes, vectors)
+        done += len(hashes)
+        if progress:
+            progress(done, time.perf_counter() - start)
+
+    if workers == 0:
+        _init_worker(embedder)
+        for hashes, texts in batches:
+            finished(*_embed_batch(hashes, texts))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(embedder,)) as pool:
+            pending = set()
+            for hashes, texts in batches:
+                pending.add(pool.submit(_embed_batch, hashes, texts))
+                if len(pending) >= 2 * workers:
+                    completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        finished(*future.result())
+            for future in pending:
+                finished(*future.result())
+    cache.compact()
+    return done
+
+def cached_rows(chunks, cache, batch_size=256):
+    """(chunk batch, vectors) pairs in chunk order, read back from the cache."""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield batch, cache.get_many([c["content_hash"] for c in batch])
+            batch = []
+    if batch:
+        yield batch, cache.get_many([c["content_hash"] for c in batch])
+
+def embed_corpus(chunks_path=CHUNKS_PATH, embedder=None, out_dir=VECTOR_DIR, dtype="float16",
+                 workers=None, batch_size=256, cache_dir=CACHE_DIR, manifest_generated_at=None,
+                 progress=None):
+    """Bring the embedding cache up to date for a chunks file and write the vector store.
+
+    Returns the store meta with an added "embedding" entry: chunks seen,
+    chunks embedded this run, and chunks served from the cache.
+    """
+    embedder = embedder or HashingEmbedder()
+    name = embedder_id(embedder)
+    cache = EmbeddingCache(name, cache_dir)
+    embedded = embed_missing(read_chunks(chunks_path), embedder, cache, workers, batch_size, progress)
+    meta = write_vector_store(cached_rows(read_chunks(chunks_path), cache, batch_size),
+                              out_dir, dtype, name, manifest_generated_at)
+    meta["embedding"] = {"chunks": meta["count"], "embedded": embedded, "cached": meta["count"] - embedded}
+    return meta
@@ -0,0 +1,153 @@
+"""
+Retrieval evaluation: query sets, quality metrics and load measurements.
+
+Queries are dicts {"query", "relevant": [doc_id, ...], "source"}. Relevance
+is judged per document: hits are collapsed to their distinct doc_ids in rank
+order, recall@k is the share of relevant documents among the first k hits'
+documents, and the reciprocal rank is 1 / position of the first relevant
+document in that list. The gold set in benchmarks/gold_queries.json is
+curated; synthetic queries are short word runs sampled from chunk text, whose
+only relevant document is the one the chunk came from.
+
+A searcher is any callable search(query, k) -> hit dicts, so every index
+type (and wrappers such as the query cache) is measured the same way.
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .documents import BASE_DIR
+
+GOLD_PATH = BASE_DIR / "benchmarks" / "gold_queries.json"
+PERCENTILES = (50, 95, 99)
+
+def load_gold(path=GOLD_PATH, corpus=None):
+    """Curated queries; with a corpus, unknown doc_ids raise instead of silently scoring zero."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    queries = []
+    for entry in data["queries"]:
+        if corpus is not None:
+            unknown = [d for d in entry["relevant"] if corpus.get(d) is None]
+            if unknown:
+                raise ValueError(f"Gold query {entry['query']!r} refers to unknown documents: {unknown}")
+        queries.append({"query": entry["query"], "relevant": list(entry["relevant"]), "source": "gold"})
+    return queries
+
+def synthetic_queries(chunks, n, seed=0, min_words=2, max_words=6):
+    """Known-item queries: a word run from a random chunk, relevant to that chunk's document."""
+    rng = random.Random(seed)
+    pool = [(c["doc_id"], c["text"].split()) for c in chunks]
+    pool = [(doc_id, words) for doc_id, words in pool if len(words) >= 8]
+    queries = []
+    while pool and len(queries) < n:
+        doc_id, words = rng.choice(pool)
+        length = rng.randint(min_words, max_words)
+        start = rng.randrange(len(words) - length)
+        queries.append({"query": ' '.join(words[start:start + length]), "relevant": [doc_id], "source": "synthetic"})
+    return queries
+
+def ranked_docs(hits):
+    """Distinct doc_ids of a hit list, in rank order."""
+    seen = []
+    for hit in hits:
+        if hit["doc_id"] not in seen:
+            seen.append(hit["doc_id"])
+    return seen
+
+def recall_at_k(hits, relevant, k):
+    found = set(ranked_docs(hits[:k]))
+    return len(found.intersection(relevant)) / len(relevant) if relevant else 0.0
+
+def reciprocal_rank(hits, relevant):
+    for rank, doc_id in enumerate(ranked_docs(hits), 1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+def quality(search, queries, k=10):
+    """Mean recall@k and MRR of a searcher over a query set."""
+    recalls, rranks = [], []
+    for q in queries:
+        hits = search(q["query"], k)
+        recalls.append(recall_at_k(hits, q["relevant"], k))
+        rranks.append(reciprocal_rank(hits, q["relevant"]))
+    return {
+        "queries": len(queries),
+        f"recall@{k}": statistics.fmean(recalls) if recalls else 0.0,
+        "mrr": statistics.fmean(rranks) if rranks else 0.0,
+    }
+
+def percentile(sorted_values, p):
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+def latency(search, queries, k=10, repeats=1):
+    """Per-query latency distribution in milliseconds, one query at a time."""
+    for q in queries[:5]:
+        search(q["query"], k)  # warm caches and lazily mapped files
+    samples = []
+    for _ in range(repeats):
+        for q in queries:
+            start = time.perf_counter()
+            search(q["query"], k)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    result = {"samples": len(samples), "mean_ms": statistics.fmean(samples) if samples else 0.0}
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = percentile(samples, p)
+    return result
+
+def throughput(search, queries, k=10, concurrency=1, total=None):
+    """Queries per second with `concurrency` threads working through `total` queries."""
+    total = total or len(queries)
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            search(queries[i % len(queries)]["query"], k)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    seconds = time.perf_counter() - start
+    return {"concurrency": concurrency, "queries": total, "seconds": seconds, "qps": total / seconds}
+
+def rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable, None on Windows."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def dir_bytes(path):
+    """Total size of the files under a directory (or of one file)."""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
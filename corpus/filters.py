@@ -0,0 +1,192 @@
+"""
+Precomputed facet filters over an index's rows (chunks or vectors).
+
+Each facet value -- resource_type, series, year, is_placeholder and
+extraction_status, read from the manifest and the metadata sidecars -- gets a
+packed bitset with one bit per row. A filter spec is compiled into a boolean
+row mask by OR-ing the bitsets of the accepted values within a facet and
+AND-ing across facets, so no document or sidecar is read at query time.
+
+Specs are plain dicts: {"series": "diversity_speech", "is_placeholder": False,
+"max_year": 1989}. A facet maps to one value or a list of accepted values;
+min_year/max_year are inclusive bounds, and rows with no known year never
+satisfy them. The scorers take the mask and only score rows it allows (see
+LexicalIndex.search(filters=...)), instead of post-filtering a ranked list.
+"""
+
+import json
+import re
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import Corpus
+
+FACETS = ("resource_type", "series", "year", "is_placeholder", "extraction_status")
+YEAR_BOUNDS = ("min_year", "max_year")
+
+FILTERS_FILE = "filters"
+FORMAT_VERSION = 1
+
+# Compiled masks kept per FilterIndex; real workloads reuse a handful of facet combinations
+MASK_CACHE_SIZE = 64
+
+YEAR_PREFIX = re.compile(r'^(\d{4})-')
+
+def document_facets(doc):
+    """{facet: value} for one Document, None where the field is unknown."""
+    sidecar = doc.sidecar
+    year = sidecar.get("year")
+    if year is None:
+        # Book, report and ERIC files are named <year>-Cortes-...
+        match = YEAR_PREFIX.match(Path(doc.extracted_path or doc.source_file or "").name)
+        year = int(match.group(1)) if match else None
+    return {
+        "resource_type": doc.resource_type,
+        "series": sidecar.get("series"),
+        "year": int(year) if year is not None else None,
+        "is_placeholder": doc.is_placeholder,
+        "extraction_status": doc.extraction_status,
+    }
+
+class FilterIndex:
+    """Facet bitsets for rows whose documents are given by doc_ids."""
+
+    def __init__(self, values, bits, n_rows, meta):
+        self.values = values      # {facet: {value: bitset row}}
+        self.bits = bits          # (n_values, ceil(n_rows / 8)) uint8, little-endian bit order
+        self.n_rows = n_rows
+        self.meta = meta
+        self._masks = OrderedDict()
+
+    @classmethod
+    def build(cls, doc_ids, corpus=None):
+        """Bitsets for rows whose document is doc_ids[row]."""
+        corpus = corpus if corpus is not None else Corpus.from_manifest()
+        facets_of = {}
+        for doc_id in set(doc_ids):
+            doc = corpus.get(doc_id)
+            facets_of[doc_id] = document_facets(doc) if doc is not None else dict.fromkeys(FACETS)
+
+        values = {facet: {} for facet in FACETS}
+        rows = []
+        for facet in FACETS:
+            for row, doc_id in enumerate(doc_ids):
+                value = facets_of[doc_id][facet]
+                if value not in values[facet]:
+                    values[facet][value] = len(rows)
+                    rows.append([])
+                rows[values[facet][value]].append(row)
+
+        n_rows = len(doc_ids)
+        dense = np.zeros((len(rows), n_rows), dtype=bool)
+        for i, members in enumerate(rows):
+            dense[i, members] = True
+        bits = np.packbits(dense, axis=1, bitorder='little')
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "built_at": datetime.now().isoformat(),
+            "manifest_generated_at": corpus.generated_at,
+            "n_rows": n_rows,
+        }
+        return cls(values, bits, n_rows, meta)
+
+    def save(self, out_dir, index_built_at=None):
+        """Write the bitsets next to the index they describe."""
+        out_dir = Path(out_dir)
+        np.save(out_dir / f"{FILTERS_FILE}.npy", self.bits)
+        meta = dict(self.meta, index_built_at=index_built_at,
+                    values={facet: [[value, row] for value, row in entries.items()]
+                            for facet, entries in self.values.items()})
+        with open(out_dir / f"{FILTERS_FILE}.json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir, doc_ids, index_built_at=None, corpus=None):
+        """Saved bitsets from index_dir, rebuilt in memory if missing or stale."""
+        corpus = corpus if corpus is not None else Corpus.from_manifest()
+        path = Path(index_dir) / f"{FILTERS_FILE}.json" if index_dir is not None else None
+        if path is not None and path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get("format_version") == FORMAT_VERSION and meta.get("n_rows") == len(doc_ids)
+                    and meta.get("index_built_at") == index_built_at
+                    and meta.get("manifest_generated_at") == corpus.generated_at):
+                return cls.from_saved(meta, np.load(path.with_suffix(".npy")))
+        return cls.build(doc_ids, corpus)
+
+    @classmethod
+    def from_saved(cls, meta, bits):
+        """Rebuild a FilterIndex from the JSON meta and bitsets written by save()."""
+        meta = dict(meta)
+        saved = meta.pop("values")
+        values = {facet: {value: row for value, row in saved.get(facet, [])} for facet in FACETS}
+        return cls(values, bits, meta["n_rows"], meta)
+
+    def _facet_bits(self, facet, accepted):
+        rows = [self.values[facet][v] for v in accepted if v in self.values[facet]]
+        if not rows:
+            return np.zeros(self.bits.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bits[rows], axis=0)
+
+    def bitset(self, spec):
+        """Packed bitset of the rows a filter spec allows (None when it allows everything)."""
+        spec = {name: value for name, value in spec.items() if value is not None}
+        unknown = set(spec) - set(FACETS) - set(YEAR_BOUNDS)
+        if unknown:
+            raise ValueError(f"unknown filter field(s): {', '.join(sorted(unknown))}")
+        result = None
+        for facet in FACETS:
+            if facet not in spec:
+                continue
+            accepted = spec[facet]
+            if isinstance(accepted, (str, bool, int)):
+                accepted = [accepted]
+            part = self._facet_bits(facet, accepted)
+            result = part if result is None else result & part
+        if "min_year" in spec or "max_year" in spec:
+            low = spec.get("min_year", -np.inf)
+            high = spec.get("max_year", np.inf)
+            years = [y for y in self.values["year"] if y is not None and low <= y <= high]
+            part = self._facet_bits("year", years)
+            result = part if result is None else result & part
+        return result
+
+    def compile(self, spec):
+        """(boolean row mask, sorted allowed row numbers) for a filter spec.
+
+        Both are None when the spec allows every row. Results are cached per
+        spec, so repeated queries with the same facets pay only a dict lookup.
+        """
+        if not spec:
+            return None, None
+        key = repr(sorted(spec.items()))
+        entry = self._masks.get(key)
+        if entry is None:
+            bits = self.bitset(spec)
+            entry = (None, None)
+            if bits is not None:
+                mask = np.unpackbits(bits, count=self.n_rows, bitorder='little').astype(bool)
+                entry = (mask, np.flatnonzero(mask))
+            self._masks[key] = entry
+            if len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        else:
+            self._masks.move_to_end(key)
+        return entry
+
+    def mask(self, spec):
+        """Boolean mask over rows for a filter spec, or None if the spec is empty."""
+        return self.compile(spec)[0]
+
+    def count(self, spec):
+        """Number of rows a filter spec allows."""
+        allowed = self.compile(spec)[1]
+        return self.n_rows if allowed is None else int(allowed.size)
+
+    def facet_values(self, facet):
+        """Known values of a facet with their row counts."""
+        counts = np.unpackbits(self.bits, axis=1, count=self.n_rows, bitorder='little').sum(axis=1)
+        return {value: int(counts[row]) for value, row in self.values[facet].items()}
@@ -0,0 +1,129 @@
+"""
+Hybrid lexical + vector retrieval.
+
+The vector search runs on a worker thread while the BM25 search runs on the
+calling one (both spend their time in NumPy, which releases the GIL), so on a
+machine with a spare core a hybrid query costs about as much as the slower of
+the two. Their ranked lists are fused either
+with reciprocal rank fusion (sum of weight / (rrf_k + rank)) or with a
+weighted sum of min-max normalised scores, and each fused hit carries the
+manifest provenance of the document it came from.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .documents import Corpus
+from .lexical import LexicalIndex
+from .vectors import VectorStore
+
+FUSIONS = ("rrf", "weighted")
+RRF_K = 60
+
+def rrf_fuse(ranked_lists, weights, rrf_k=RRF_K):
+    """{chunk_id: fused score} from ranked hit lists by reciprocal rank fusion."""
+    fused = {}
+    for hits, weight in zip(ranked_lists, weights):
+        for rank, hit in enumerate(hits, 1):
+            fused[hit["chunk_id"]] = fused.get(hit["chunk_id"], 0.0) + weight / (rrf_k + rank)
+    return fused
+
+def weighted_fuse(ranked_lists, weights):
+    """{chunk_id: fused score} from a weighted sum of per-list min-max normalised scores."""
+    fused = {}
+    for hits, weight in zip(ranked_lists, weights):
+        if not hits:
+            continue
+        scores = [h["score"] for h in hits]
+        low, high = min(scores), max(scores)
+        span = high - low
+        for hit in hits:
+            norm = (hit["score"] - low) / span if span > 0 else 1.0
+            fused[hit["chunk_id"]] = fused.get(hit["chunk_id"], 0.0) + weight * norm
+    return fused
+
+class HybridSearcher:
+    """Runs lexical and vector retrieval side by side and fuses the results.
+
+    `vectors` may be a VectorStore (exact) or an IVFIndex; both expose
+    search(query, k). Pass weights=(lexical, vector) to favour one side.
+    """
+
+    def __init__(self, lexical=None, vectors=None, corpus=None, fusion="rrf", weights=(1.0, 1.0),
+                 depth=50, rrf_k=RRF_K, lexical_method="exhaustive", executor=None):
+        if fusion not in FUSIONS:
+            raise ValueError(f"unknown fusion: {fusion}")
+        self.lexical = lexical or LexicalIndex.load()
+        self.vectors = vectors if vectors is not None else VectorStore.load()
+        self.corpus = corpus if corpus is not None else Corpus.from_manifest()
+        self.fusion = fusion
+        self.weights = weights
+        self.depth = depth
+        self.rrf_k = rrf_k
+        self.lexical_method = lexical_method
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="hybrid")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def retrieve(self, query, depth=None, filters=None):
+        """(lexical hits, vector hits) for one query, searched concurrently."""
+        depth = depth or self.depth
+        # Only pass filters along when given: an IVFIndex does not take them
+        options = {"filters": filters} if filters else {}
+        # The vector side goes to the pool; the lexical side runs on the calling thread meanwhile
+        vector = self.executor.submit(self.vectors.search, query, depth, **options)
+        lexical = self.lexical.search(query, depth, method=self.lexical_method, **options)
+        return lexical, vector.result()
+
+    def fuse(self, lexical_hits, vector_hits, k=10):
+        """Fused top-k hits with per-side ranks and scores plus manifest provenance."""
+        ranked = (lexical_hits, vector_hits)
+        if self.fusion == "rrf":
+            fused = rrf_fuse(ranked, self.weights, self.rrf_k)
+        else:
+            fused = weighted_fuse(ranked, self.weights)
+
+        details = {}
+        for side, hits in zip(("lexical", "vector"), ranked):
+            for rank, hit in enumerate(hits, 1):
+                entry = details.setdefault(hit["chunk_id"], dict(hit, lexical_rank=None, lexical_score=None,
+                                                                  vector_rank=None, vector_score=None))
+                entry[f"{side}_rank"] = rank
+                entry[f"{side}_score"] = hit["score"]
+
+        # Ties (common under RRF) go to the chunk with the better best rank
+        def order(chunk_id):
+            entry = details[chunk_id]
+            best = min(r for r in (entry["lexical_rank"], entry["vector_rank"]) if r is not None)
+            return (-fused[chunk_id], best, chunk_id)
+
+        results = []
+        for chunk_id in sorted(fused, key=order)[:k]:
+            hit = details[chunk_id]
+            hit["score"] = fused[chunk_id]
+            hit.update(self.provenance(hit["doc_id"]))
+            results.append(hit)
+        return results
+
+    def provenance(self, doc_id):
+        doc = self.corpus.get(doc_id)
+        if doc is None:
+            return {"title": None, "resource_type": None, "source_file": None, "extracted_path": None,
+                    "is_placeholder": None}
+        return {
+            "title": doc.title,
+            "resource_type": doc.resource_type,
+            "source_file": doc.source_file,
+            "extracted_path": doc.extracted_path,
+            "is_placeholder": doc.is_placeholder,
+        }
+
+    def search(self, query, k=10, filters=None):
+        """Top-k fused hits for one query, optionally restricted by a facet filter spec."""
+        return self.fuse(*self.retrieve(query, max(self.depth, k), filters), k)
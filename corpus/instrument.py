@@ -0,0 +1,340 @@
+"""
+Instrumentation for the corpus build scripts: per-stage timers and counters,
+buffered non-blocking logging and an optional profiler hook.
+
+setup_logging() routes the "corpus" loggers through a queue: the calling
+thread (a download, a worker process) only enqueues the record, and a
+listener thread writes it to the console and, through a MemoryHandler, to
+one log file under logs/ that is opened once and written in batches (at
+once for warnings and errors). Process pools pass worker_initializer() so
+workers started by spawn as well as fork log through the same queue. Before
+setup_logging() (a module imported on its own), the loggers print INFO and
+above to the console unless the application configured logging itself.
+
+`metrics` is the process-wide Metrics registry. Scripts wrap work in
+metrics.timer(stage, item) and add counts with metrics.count(stage, name,
+n, item), e.g. bytes fetched, pages and words extracted or cache hits, and
+call metrics.dump() when they finish. The dump (logs/metrics_<run>_<time>.json)
+holds per-stage busy and wall time, counters, rates such as pages/s, and
+per-item timings and counters.
+
+Any stage can be profiled by naming it in CORPUS_PROFILE (comma-separated,
+or "all") or with metrics.profile_stages: its timer blocks then run under
+cProfile, or pyinstrument when CORPUS_PROFILER=pyinstrument and it is
+installed, and the report is written next to the metrics.
+"""
+
+import atexit
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .documents import BASE_DIR
+
+LOGS_DIR = BASE_DIR / "logs"
+
+# Records the file handler holds before writing them out
+LOG_BUFFER = 256
+# Counters that also get a per-second rate in the summary
+RATE_COUNTERS = ("bytes", "pages", "words", "tokens", "items")
+PROFILE_ENV = "CORPUS_PROFILE"
+PROFILER_ENV = "CORPUS_PROFILER"
+
+CONSOLE_FORMAT = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
+FILE_FORMAT = logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+
+_listener = None
+_log_path = None
+_records = None
+
+class _ConsoleFallback(logging.StreamHandler):
+    """Console output for "corpus" loggers used without setup_logging(), unless the application configured logging."""
+
+    def emit(self, record):
+        if not logging.getLogger().handlers:
+            super().emit(record)
+
+_fallback = _ConsoleFallback()
+_fallback.setFormatter(CONSOLE_FORMAT)
+
+def setup_logging(run, log_dir=LOGS_DIR, level=logging.INFO):
+    """Send the "corpus" loggers to the console and logs/<run>_<time>.log; returns the log path.
+
+    Only the first call in a process configures anything, so a script run on
+    its own and the pipeline that imports it share one setup.
+    """
+    global _listener, _log_path, _records
+    if _listener is not None:
+        return _log_path
+    log_dir.mkdir(parents=True, exist_ok=True)
+    _log_path = log_dir / f"{run}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+
+    console = logging.StreamHandler()
+    console.setFormatter(CONSOLE_FORMAT)
+    file_handler = logging.FileHandler(_log_path, encoding='utf-8', delay=True)
+    file_handler.setFormatter(FILE_FORMAT)
+    buffered = logging.handlers.MemoryHandler(LOG_BUFFER, flushLevel=logging.WARNING, target=file_handler)
+
+    # A multiprocessing queue, so worker processes log through the same listener (see worker_initializer)
+    _records = multiprocessing.Queue()
+    _listener = logging.handlers.QueueListener(_records, console, buffered, respect_handler_level=False)
+    _listener.start()
+    logger = logging.getLogger("corpus")
+    logger.removeHandler(_fallback)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(_records))
+
+    def stop():
+        _listener.stop()
+        buffered.close()
+        file_handler.close()
+    atexit.register(stop)
+    return _log_path
+
+def get_logger(name):
+    """Logger under "corpus" (configured by setup_logging, printing INFO to the console until then)."""
+    base = logging.getLogger("corpus")
+    if not base.handlers:
+        base.addHandler(_fallback)
+        if base.level == logging.NOTSET:
+            base.setLevel(logging.INFO)
+    return logging.getLogger(f"corpus.{name}")
+
+def worker_initializer():
+    """(initializer, initargs) for a process pool whose workers log and profile like this process.
+
+    Forked workers inherit the logging setup, but spawned ones (the default
+    on Windows and macOS) start with none, so the initializer installs a
+    QueueHandler on this process's listener queue and copies the profiled
+    stages.
+    """
+    level = logging.getLogger("corpus").level or logging.INFO
+    return _init_worker, (_records, level, sorted(metrics.profile_stages))
+
+def _init_worker(records, level, profile_stages):
+    global _records
+    logger = logging.getLogger("corpus")
+    if records is not None:
+        _records = records
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        logger.propagate = False
+    elif not logger.handlers:
+        logger.addHandler(_fallback)
+    logger.setLevel(level)
+    metrics.profile_stages.update(profile_stages)
+
+class Metrics:
+    """Thread-safe timers and counters per stage and per item."""
+
+    def __init__(self, profile_stages=None):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+        self.started_at = datetime.now().isoformat()
+        if profile_stages is None:
+            profile_stages = [s.strip() for s in os.environ.get(PROFILE_ENV, "").split(",") if s.strip()]
+        self.profile_stages = set(profile_stages)
+        self.profiles = []
+        self._profiling = False
+
+    def _stage(self, stage):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {"calls": 0, "busy_s": 0.0, "first": None, "last": None,
+                                          "counters": {}, "items": {}}
+        return entry
+
+    def record(self, stage, seconds, item=None, end=None):
+        """Add one timed call of a stage (and item) that took seconds and ended at end (time.time())."""
+        end = end if end is not None else time.time()
+        with self.lock:
+            entry = self._stage(stage)
+            entry["calls"] += 1
+            entry["busy_s"] += seconds
+            start = end - seconds
+            entry["first"] = start if entry["first"] is None else min(entry["first"], start)
+            entry["last"] = end if entry["last"] is None else max(entry["last"], end)
+            if item is not None:
+                item_entry = entry["items"].setdefault(str(item), {"seconds": 0.0, "counters": {}})
+                item_entry["seconds"] += seconds
+
+    def count(self, stage, name, n=1, item=None):
+        """Add n to a stage's counter (and the item's)."""
+        with self.lock:
+            entry = self._stage(stage)
+            entry["counters"][name] = entry["counters"].get(name, 0) + n
+            if item is not None:
+                counters = entry["items"].setdefault(str(item), {"seconds": 0.0, "counters": {}})["counters"]
+                counters[name] = counters.get(name, 0) + n
+
+    def count_result(self, stage, result, item=None):
+        """Count every numeric field of a result dict (words, pages, ...)."""
+        if not isinstance(result, dict):
+            return
+        for name, value in result.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.count(stage, name, value, item)
+
+    def wants_profile(self, stage):
+        return "all" in self.profile_stages or stage in self.profile_stages
+
+    @contextmanager
+    def profile(self, stage, item=None):
+        """Run a block under the profiler if the stage is selected (without timing it)."""
+        profiler = None
+        if self.wants_profile(stage):
+            with self.lock:
+                # One profiler at a time: nested or concurrent blocks are not profiled
+                if not self._profiling:
+                    self._profiling = True
+                    profiler = _Profiler()
+        if profiler is None:
+            yield
+            return
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            name = f"{stage}_{item}" if item not in (None, stage) else stage
+            self.profiles.append(str(profiler.save(name)))
+            with self.lock:
+                self._profiling = False
+
+    @contextmanager
+    def timer(self, stage, item=None):
+        """Time a block as one call of stage (and item), profiling it if the stage is selected."""
+        start = time.perf_counter()
+        try:
+            with self.profile(stage, item):
+                yield
+        finally:
+            self.record(stage, time.perf_counter() - start, item)
+
+    def take(self):
+        """Remove and return the stages recorded so far (a worker process hands them to merge())."""
+        with self.lock:
+            stages, self.stages = self.stages, {}
+            profiles, self.profiles = self.profiles, []
+        return {"stages": stages, "profiles": profiles}
+
+    def merge(self, taken):
+        """Add stages returned by take() in another process."""
+        with self.lock:
+            for name, other in taken["stages"].items():
+                entry = self._stage(name)
+                entry["calls"] += other["calls"]
+                entry["busy_s"] += other["busy_s"]
+                for bound, pick in (("first", min), ("last", max)):
+                    if other[bound] is not None:
+                        entry[bound] = other[bound] if entry[bound] is None else pick(entry[bound], other[bound])
+                for counter, value in other["counters"].items():
+                    entry["counters"][counter] = entry["counters"].get(counter, 0) + value
+                for item, values in other["items"].items():
+                    mine = entry["items"].setdefault(item, {"seconds": 0.0, "counters": {}})
+                    mine["seconds"] += values["seconds"]
+                    for counter, value in values["counters"].items():
+                        mine["counters"][counter] = mine["counters"].get(counter, 0) + value
+            self.profiles.extend(taken["profiles"])
+
+    def summary(self):
+        """JSON-ready view of every stage: calls, busy and wall seconds, counters, rates, items."""
+        stages = {}
+        with self.lock:
+            for name, entry in self.stages.items():
+                busy = entry["busy_s"]
+                wall = (entry["last"] - entry["first"]) if entry["first"] is not None else 0.0
+                rates = {f"{counter}_per_s": value / busy for counter, value in entry["counters"].items()
+                         if counter in RATE_COUNTERS and busy > 0}
+                stages[name] = {
+                    "calls": entry["calls"],
+                    "busy_s": round(busy, 6),
+                    "wall_s": round(wall, 6),
+                    "counters": dict(entry["counters"]),
+                    "rates": rates,
+                    "items": {item: {"seconds": round(v["seconds"], 6), "counters": dict(v["counters"])}
+                              for item, v in entry["items"].items()},
+                }
+        return stages
+
+    def dump(self, run, log_dir=LOGS_DIR):
+        """Write logs/metrics_<run>_<time>.json and return its path."""
+        log_dir.mkdir(parents=True, exist_ok=True)
+        path = log_dir / f"metrics_{run}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        report = {
+            "run": run,
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(),
+            "seconds": round(time.time() - self.started, 6),
+            "stages": self.summary(),
+            "profiles": self.profiles,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    def log_summary(self, log):
+        """One line per stage through log(msg)."""
+        for name, stage in self.summary().items():
+            counters = ", ".join(f"{k} {v:,}" if isinstance(v, int) else f"{k} {v:,.1f}"
+                                 for k, v in stage["counters"].items())
+            rates = ", ".join(f"{k.replace('_per_s', '')}/s {v:,.0f}" for k, v in stage["rates"].items())
+            parts = [f"{stage['calls']} calls", f"{stage['busy_s']:.2f}s busy", f"{stage['wall_s']:.2f}s wall"]
+            log(f"  {name}: " + ", ".join(parts + [p for p in (counters, rates) if p]))
+
+class _Profiler:
+    """cProfile, or pyinstrument when selected and installed, around one timed block."""
+
+    def __init__(self):
+        self.kind = "cprofile"
+        if os.environ.get(PROFILER_ENV) == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                self.profiler = Profiler()
+                self.kind = "pyinstrument"
+                return
+            except ImportError:
+                pass
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.kind == "pyinstrument":
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def save(self, name, log_dir=LOGS_DIR):
+        """Write the report (pyinstrument HTML, or .prof plus a text summary) and return its path."""
+        log_dir.mkdir(parents=True, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)[:80]
+        stem = log_dir / f"profile_{safe}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if self.kind == "pyinstrument":
+            path = stem.with_suffix(".html")
+            path.write_text(self.profiler.output_html(), encoding='utf-8')
+            return path
+        path = stem.with_suffix(".prof")
+        self.profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(30)
+        stem.with_suffix(".txt").write_text(text.getvalue(), encoding='utf-8')
+        return path
+
+metrics = Metrics()
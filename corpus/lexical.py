@@ -0,0 +1,521 @@
+"""
+BM25 inverted index over corpus chunks.
+
+Each term's postings are stored as delta-encoded chunk numbers and term
+frequencies, both compressed with variable-byte (LEB128) coding into two flat
+byte blobs. Document-length norms and the per-term pointers live in .npy
+arrays. Everything is opened with memory mapping, so loading an index costs a
+handful of page faults rather than a deserialization pass.
+"""
+
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import BUILD_DIR
+from .tokenizer import tokenize
+
+INDEX_DIR = BUILD_DIR / "lexical"
+FORMAT_VERSION = 3
+
+# Postings per skip block; each block records its last chunk number and max score
+BLOCK_SIZE = 128
+
+K1 = 1.2
+B = 0.75
+
+# ============================================================================
+# Variable-byte coding
+# ============================================================================
+
+def vbyte_lengths(values):
+    """Number of bytes each value takes once LEB128-encoded."""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(values.size, dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        nbytes += values >= (1 << shift)
+    return nbytes
+
+def vbyte_encode(values):
+    """Encode non-negative integers as LEB128 bytes (7 bits per byte, high bit = more)."""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    nbytes = vbyte_lengths(values)
+    owner = np.repeat(np.arange(values.size), nbytes)
+    starts = np.cumsum(nbytes) - nbytes
+    k = np.arange(owner.size) - starts[owner]
+    out = (values[owner] >> (7 * k).astype(np.uint64)) & 0x7F
+    out |= (k < nbytes[owner] - 1).astype(np.uint64) << 7
+    return out.astype(np.uint8)
+
+def vbyte_decode(data):
+    """Decode a LEB128 byte array back into uint64 values."""
+    data = np.asarray(data, dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    if ends.size == data.size:
+        # Every value fit in a single byte
+        return data.astype(np.uint64)
+    owner = np.repeat(np.arange(ends.size), ends - starts + 1)
+    k = np.arange(data.size) - starts[owner]
+    parts = (data & 0x7F).astype(np.uint64) << (7 * k).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+def delta_encode(sorted_ids):
+    ids = np.asarray(sorted_ids, dtype=np.uint64)
+    gaps = ids.copy()
+    gaps[1:] -= ids[:-1]
+    return gaps
+
+# ============================================================================
+# Index
+# ============================================================================
+
+def _gather(blob, starts, ends):
+    """Concatenate blob[starts[i]:ends[i]] for every i without a Python loop."""
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(ends, dtype=np.int64) - starts
+    offsets = np.cumsum(lengths) - lengths
+    return blob[np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)]
+
+def _save_array(out_dir, name, values):
+    np.save(out_dir / f"{name}.npy", values)
+
+def _load_array(index_dir, name):
+    path = index_dir / f"{name}.npy"
+    if path.stat().st_size <= 128:
+        # np.load cannot memory-map an empty array
+        return np.load(path)
+    return np.load(path, mmap_mode='r')
+
+def top_k(numbers, scores, k):
+    """The k best (numbers, scores), by descending score and then ascending number.
+
+    Every candidate tied with the k-th score is kept until the final sort, so
+    the result does not depend on how argpartition splits a tie; all search
+    paths share this order.
+    """
+    if numbers.size > k:
+        kth = np.partition(scores, numbers.size - k)[numbers.size - k]
+        keep = scores >= kth
+        numbers, scores = numbers[keep], scores[keep]
+    order = np.lexsort((numbers, -scores))[:k]
+    return numbers[order], scores[order]
+
+def top_k_rows(numbers, scores, k, floor=-np.inf):
+    """top_k for each row of (n_rows, n) number and score arrays, as (n_rows, min(k, n)) arrays.
+
+    Ties at the k-th score are only resolved in the rows they occur in, and
+    not at all when that score is at or below floor (slots the caller drops).
+    """
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_numbers = np.take_along_axis(numbers, keep, axis=1)
+        top_scores = np.take_along_axis(scores, keep, axis=1)
+        kth = top_scores.min(axis=1)
+        tied = (kth > floor) & (np.count_nonzero(scores >= kth[:, None], axis=1) > k)
+        for row in np.flatnonzero(tied):
+            top_numbers[row], top_scores[row] = top_k(numbers[row], scores[row], k)
+        numbers, scores = top_numbers, top_scores
+    order = np.lexsort((numbers, -scores), axis=1)
+    return np.take_along_axis(numbers, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+class LexicalIndex:
+    """Read side of the BM25 index."""
+
+    ARRAYS = ("df", "doc_ptr", "tf_ptr", "doc_blob", "tf_blob", "doc_len", "max_score",
+              "block_ptr", "block_last", "block_max", "block_doc_off", "block_tf_off")
+
+    def __init__(self, arrays, terms, docs, meta, index_dir=None):
+        self.arrays = arrays
+        self.index_dir = index_dir
+        self.meta = meta
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.docs = docs
+        self.df = arrays["df"]
+        self.doc_ptr = arrays["doc_ptr"]
+        self.tf_ptr = arrays["tf_ptr"]
+        self.doc_blob = arrays["doc_blob"]
+        self.tf_blob = arrays["tf_blob"]
+        self.doc_len = arrays["doc_len"]
+        self.max_score = arrays["max_score"]
+        self.block_ptr = arrays["block_ptr"]
+        self.block_last = arrays["block_last"]
+        self.block_max = arrays["block_max"]
+        self.block_doc_off = arrays["block_doc_off"]
+        self.block_tf_off = arrays["block_tf_off"]
+        self.n_docs = meta["n_docs"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self.k1 = meta.get("k1", K1)
+        self.b = meta.get("b", B)
+        self._norm = None
+        self._filters = None
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        """Open an index directory written by build_index()."""
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format in {index_dir}: {meta.get('format_version')}")
+        with open(index_dir / "terms.json", 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        with open(index_dir / "docs.json", 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+        arrays = {name: _load_array(index_dir, name) for name in cls.ARRAYS}
+        return cls(arrays, terms, docs, meta, index_dir)
+
+    @property
+    def norm(self):
+        """BM25 length normalisation k1 * (1 - b + b * dl / avgdl) per chunk."""
+        if self._norm is None:
+            dl = np.asarray(self.doc_len, dtype=np.float32)
+            self._norm = (self.k1 * (1 - self.b + self.b * dl / self.avgdl)).astype(np.float32)
+        return self._norm
+
+    @property
+    def filters(self):
+        """FilterIndex of facet bitsets over this index's chunks (see corpus.filters)."""
+        if self._filters is None:
+            from .filters import FilterIndex
+            self._filters = FilterIndex.load(self.index_dir, [d[1] for d in self.docs], self.meta.get("built_at"))
+        return self._filters
+
+    def idf(self, term_id):
+        df = int(self.df[term_id])
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def postings(self, term_id):
+        """Decode one term's postings into (chunk numbers, term frequencies)."""
+        gaps = vbyte_decode(self.doc_blob[self.doc_ptr[term_id]:self.doc_ptr[term_id + 1]])
+        tfs = vbyte_decode(self.tf_blob[self.tf_ptr[term_id]:self.tf_ptr[term_id + 1]])
+        return np.cumsum(gaps).astype(np.int64), tfs.astype(np.float32)
+
+    def filtered_postings(self, term_id, mask, allowed):
+        """A term's postings restricted to chunks where mask is set.
+
+        allowed is np.flatnonzero(mask). When there are too few allowed chunks
+        to land in even half of the term's skip blocks, only the blocks that
+        can hold one are decoded; otherwise the whole list is decoded and the
+        mask applied before scoring.
+        """
+        if allowed.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        first = int(self.block_ptr[term_id])
+        last = int(self.block_ptr[term_id + 1])
+        if 2 * allowed.size <= last - first:
+            blocks = np.searchsorted(self.block_last[first:last], allowed)
+            # allowed is sorted, so repeated blocks are adjacent
+            blocks = blocks[np.concatenate(([True], blocks[1:] != blocks[:-1]))]
+            blocks = blocks[blocks < last - first]
+            if blocks.size == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            docs, tfs = self.decode_blocks(term_id, first + blocks)
+        else:
+            docs, tfs = self.postings(term_id)
+        keep = mask[docs]
+        return docs[keep], tfs[keep]
+
+    def all_postings(self):
+        """Decode every posting list at once.
+
+        Returns (indptr, docs, tfs): term t's postings are docs[indptr[t]:indptr[t + 1]].
+        """
+        counts = np.asarray(self.df, dtype=np.int64)
+        indptr = np.zeros(counts.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        gaps = vbyte_decode(self.doc_blob).astype(np.int64)
+        tfs = vbyte_decode(self.tf_blob).astype(np.float32)
+        # Running sums restart at the start of every term's list
+        running = np.cumsum(gaps)
+        starts = indptr[:-1][counts > 0]
+        offset = running[starts] - gaps[starts]
+        docs = running - np.repeat(offset, counts[counts > 0])
+        return indptr, docs, tfs
+
+    def decode_block(self, term_id, block):
+        """Decode one skip block (a global block number) of a term's postings."""
+        return self.decode_blocks(term_id, [block])
+
+    def decode_blocks(self, term_id, blocks):
+        """Decode several skip blocks (ascending global block numbers) of one term at once."""
+        blocks = np.asarray(blocks, dtype=np.int64)
+        first = int(self.block_ptr[term_id])
+        last = int(self.block_ptr[term_id + 1])
+        following = np.minimum(blocks + 1, self.block_doc_off.size - 1)
+        is_last = blocks + 1 >= last
+        doc_end = np.where(is_last, self.doc_ptr[term_id + 1], self.block_doc_off[following])
+        tf_end = np.where(is_last, self.tf_ptr[term_id + 1], self.block_tf_off[following])
+        gaps = vbyte_decode(_gather(self.doc_blob, self.block_doc_off[blocks], doc_end))
+        tfs = vbyte_decode(_gather(self.tf_blob, self.block_tf_off[blocks], tf_end))
+
+        # Running sums restart at each block, from the previous block's last chunk number
+        block_size = self.meta.get("block_size", BLOCK_SIZE)
+        counts = np.minimum(block_size, int(self.df[term_id]) - (blocks - first) * block_size)
+        starts = np.cumsum(counts) - counts
+        base = np.where(blocks > first, self.block_last[np.maximum(blocks - 1, 0)], 0).astype(np.int64)
+        running = np.cumsum(gaps).astype(np.int64)
+        offset = running[starts] - gaps[starts].astype(np.int64) - base
+        return running - np.repeat(offset, counts), tfs.astype(np.float32)
+
+    def query_terms(self, query):
+        """Map a query string to {term_id: query term frequency}, dropping unknown terms."""
+        counts = Counter(tokenize(query))
+        return {self.vocab[t]: n for t, n in counts.items() if t in self.vocab}
+
+    def score(self, query, mask=None, allowed=None):
+        """Exhaustive BM25 scores for every chunk (term-at-a-time).
+
+        With a boolean mask, chunks outside it are left at 0. A narrow mask
+        is applied to each posting list before scoring; a mask that allows
+        most chunks is cheaper to apply once to the finished scores.
+        """
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        norm = self.norm
+        if mask is not None and allowed is None:
+            allowed = np.flatnonzero(mask)
+        narrow = allowed is not None and 2 * allowed.size <= self.n_docs
+        for term_id, qtf in self.query_terms(query).items():
+            if narrow:
+                docs, tfs = self.filtered_postings(term_id, mask, allowed)
+            else:
+                docs, tfs = self.postings(term_id)
+            weight = self.idf(term_id) * qtf
+            scores[docs] += weight * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        if mask is not None and not narrow:
+            np.multiply(scores, mask, out=scores)
+        return scores
+
+    def search(self, query, k=10, method='exhaustive', stats=None, filters=None):
+        """Top-k chunks for a query as hit dicts with document and page provenance.
+
+        method is 'exhaustive' (score every posting), 'maxscore' (vectorized
+        MaxScore with block skipping) or 'wand' (document-at-a-time Block-Max
+        WAND). All three return the same top-k; pass a dict as stats to collect
+        postings/blocks counters from the pruned methods. Run
+        scripts/bench_pruning.py to see which is fastest for the current corpus.
+
+        filters is a facet spec such as {"series": "diversity_speech",
+        "is_placeholder": False} (see corpus.filters). It is applied while
+        scoring, so the top-k is always filled from matching chunks.
+        """
+        mask, allowed = self.filters.compile(filters) if filters else (None, None)
+        if method == 'exhaustive':
+            return self.hits_from_scores(self.score(query, mask, allowed), k)
+        from . import pruning
+        if method == 'maxscore':
+            return pruning.maxscore_search(self, query, k, stats, mask, allowed)
+        if method == 'wand':
+            return pruning.block_max_wand_search(self, query, k, stats, mask, allowed)
+        raise ValueError(f"unknown search method: {method}")
+
+    def hits_from_scores(self, scores, k):
+        candidates = np.flatnonzero(scores > 0)
+        numbers, top_scores = top_k(candidates, scores[candidates], k)
+        return [self.hit(int(n), float(s)) for n, s in zip(numbers, top_scores)]
+
+    def hit(self, number, score):
+        chunk_id, doc_id, page, byte_start, byte_end = self.docs[number]
+        return {
+            "chunk_id": chunk_id,
+            "doc_id": doc_id,
+            "page": page,
+            "byte_start": byte_start,
+            "byte_end": byte_end,
+            "score": score,
+        }
+
+def _text_postings(chunks):
+    """Tokenize chunk texts: (docs, doc_len, terms, df, chunk numbers, tfs), postings grouped by term."""
+    postings = defaultdict(lambda: (array('I'), array('I')))
+    docs = []
+    doc_len = array('I')
+    for number, chunk in enumerate(chunks):
+        tokens = tokenize(chunk["text"])
+        doc_len.append(len(tokens))
+        docs.append([chunk["chunk_id"], chunk["doc_id"], chunk.get("page"),
+                     chunk.get("byte_start"), chunk.get("byte_end")])
+        for term, tf in Counter(tokens).items():
+            ids, tfs = postings[term]
+            ids.append(number)
+            tfs.append(tf)
+
+    terms = sorted(postings)
+    df = np.array([len(postings[t][0]) for t in terms], dtype=np.uint32)
+    if terms:
+        ids = np.concatenate([np.frombuffer(postings[t][0], dtype=np.uint32) for t in terms])
+        tfs = np.concatenate([np.frombuffer(postings[t][1], dtype=np.uint32) for t in terms])
+    else:
+        ids = tfs = np.zeros(0, dtype=np.uint32)
+    return docs, np.frombuffer(doc_len, dtype=np.uint32), terms, df, ids, tfs
+
+def _token_postings(chunks, tokens):
+    """Like _text_postings, but slicing each chunk's byte range out of a TokenStore.
+
+    Chunks whose document is not in the store are tokenized from their text.
+    """
+    docs = []
+    lows, highs = [], []
+    extra = {}
+    extra_terms, extra_chunks = [], []
+    for number, chunk in enumerate(chunks):
+        docs.append([chunk["chunk_id"], chunk["doc_id"], chunk.get("page"),
+                     chunk.get("byte_start"), chunk.get("byte_end")])
+        if chunk["doc_id"] in tokens and chunk.get("byte_start") is not None:
+            first, _ = tokens.token_range(chunk["doc_id"])
+            starts, _ = tokens.offsets(chunk["doc_id"])
+            lo, hi = np.searchsorted(starts, [chunk["byte_start"], chunk["byte_end"]])
+            lows.append(first + lo)
+            highs.append(first + hi)
+        else:
+            lows.append(0)
+            highs.append(0)
+            for term in tokenize(chunk["text"]):
+                term_id = tokens.vocab.get(term)
+                if term_id is None:
+                    term_id = len(tokens.terms) + extra.setdefault(term, len(extra))
+                extra_terms.append(term_id)
+                extra_chunks.append(number)
+
+    # Every (term, chunk) occurrence as one integer key; sorting the keys groups postings by term
+    lows = np.asarray(lows, dtype=np.int64)
+    highs = np.asarray(highs, dtype=np.int64)
+    n_docs = len(docs)
+    term_of = np.concatenate((_gather(tokens.ids, lows, highs).astype(np.int64),
+                              np.asarray(extra_terms, dtype=np.int64)))
+    chunk_of = np.concatenate((np.repeat(np.arange(n_docs), highs - lows), np.asarray(extra_chunks, dtype=np.int64)))
+    doc_len = np.bincount(chunk_of, minlength=n_docs).astype(np.uint32)
+    keys, tfs = np.unique(term_of * max(n_docs, 1) + chunk_of, return_counts=True)
+    term_of, ids = np.divmod(keys, max(n_docs, 1))
+
+    # Number the terms that occur alphabetically; store terms already are, extra ones are merged in
+    names = tokens.terms + list(extra)
+    used = np.unique(term_of)
+    terms = sorted(names[t] for t in used)
+    rank = np.zeros(len(names), dtype=np.int64)
+    rank[used] = np.searchsorted(terms, [names[t] for t in used]) if extra else np.arange(used.size)
+    term_of = rank[term_of]
+    if extra:
+        order = np.lexsort((ids, term_of))
+        term_of, ids, tfs = term_of[order], ids[order], tfs[order]
+    df = np.bincount(term_of, minlength=len(terms)).astype(np.uint32)
+    return docs, doc_len, terms, df, ids.astype(np.uint32), tfs.astype(np.uint32)
+
+def build_index(chunks, out_dir=INDEX_DIR, manifest_generated_at=None, tokens=None, sidecars=None):
+    """Build a BM25 index from an iterable of chunk dicts and write it to out_dir.
+
+    With a TokenStore (see corpus.tokens) the chunks' tokens are read from its
+    arrays by byte range instead of re-tokenizing their text. sidecars, if
+    given, is called as sidecars(index, index_dir) on the finished index
+    before it is swapped in, so files kept next to it (filter bitsets,
+    snippet offsets) are installed together with it.
+    """
+    out_dir = Path(out_dir)
+    if tokens is not None:
+        docs, doc_len, terms, df, ids, tfs = _token_postings(chunks, tokens)
+    else:
+        docs, doc_len, terms, df, ids, tfs = _text_postings(chunks)
+
+    n_docs = len(docs)
+    avgdl = float(doc_len.sum() / n_docs) if n_docs else 0.0
+    dl = doc_len.astype(np.float64)
+    norm = K1 * (1 - B + B * dl / (avgdl or 1.0))
+
+    # All terms' postings are encoded in one pass; term_ptr[i] is where term i starts
+    term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(df, out=term_ptr[1:])
+    gaps = delta_encode(ids)
+    gaps[term_ptr[:-1][df > 0]] = ids[term_ptr[:-1][df > 0]]
+    doc_bytes = np.concatenate(([0], np.cumsum(vbyte_lengths(gaps)))).astype(np.uint64)
+    tf_bytes = np.concatenate(([0], np.cumsum(vbyte_lengths(tfs)))).astype(np.uint64)
+    doc_ptr = doc_bytes[term_ptr]
+    tf_ptr = tf_bytes[term_ptr]
+
+    # Skip blocks of BLOCK_SIZE postings, never spanning two terms
+    n_blocks = (df.astype(np.int64) + BLOCK_SIZE - 1) // BLOCK_SIZE
+    block_ptr = np.zeros(len(terms) + 1, dtype=np.uint64)
+    np.cumsum(n_blocks, out=block_ptr[1:])
+    block_term = np.repeat(np.arange(len(terms)), n_blocks)
+    within = np.arange(block_term.size) - block_ptr[:-1].astype(np.int64)[block_term]
+    block_start = term_ptr[:-1][block_term] + within * BLOCK_SIZE
+    block_end = np.minimum(block_start + BLOCK_SIZE, term_ptr[1:][block_term])
+
+    # Score upper bounds for dynamic pruning, padded so float32 rounding at query time never exceeds them
+    df_values = df.astype(np.float64)
+    idf = np.log(1 + (n_docs - df_values + 0.5) / (df_values + 0.5))
+    tf_values = tfs.astype(np.float64)
+    scores = np.repeat(idf, df) * tf_values * (K1 + 1) / (tf_values + norm[ids])
+    if scores.size:
+        block_max = (np.maximum.reduceat(scores, block_start) * (1 + 1e-5)).astype(np.float32)
+        max_score = np.maximum.reduceat(block_max, block_ptr[:-1].astype(np.int64))
+    else:
+        block_max = max_score = np.zeros(0, dtype=np.float32)
+    block_last = ids[block_end - 1]
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    _save_array(tmp_dir, "df", df)
+    _save_array(tmp_dir, "doc_ptr", doc_ptr)
+    _save_array(tmp_dir, "tf_ptr", tf_ptr)
+    _save_array(tmp_dir, "doc_blob", vbyte_encode(gaps))
+    _save_array(tmp_dir, "tf_blob", vbyte_encode(tfs))
+    _save_array(tmp_dir, "doc_len", doc_len)
+    _save_array(tmp_dir, "max_score", max_score)
+    _save_array(tmp_dir, "block_ptr", block_ptr)
+    _save_array(tmp_dir, "block_last", block_last.astype(np.uint32))
+    _save_array(tmp_dir, "block_max", block_max)
+    _save_array(tmp_dir, "block_doc_off", doc_bytes[block_start])
+    _save_array(tmp_dir, "block_tf_off", tf_bytes[block_start])
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "manifest_generated_at": manifest_generated_at,
+        "n_docs": n_docs,
+        "n_terms": len(terms),
+        "avgdl": avgdl,
+        "k1": K1,
+        "b": B,
+        "block_size": BLOCK_SIZE,
+    }
+    with open(tmp_dir / "terms.json", 'w', encoding='utf-8') as f:
+        json.dump(terms, f, ensure_ascii=False)
+    with open(tmp_dir / "docs.json", 'w', encoding='utf-8') as f:
+        json.dump(docs, f, ensure_ascii=False)
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    if sidecars is not None:
+        sidecars(LexicalIndex.load(tmp_dir), tmp_dir)
+
+    _install_dir(tmp_dir, out_dir)
+    return meta
+
+def _remove_dir(path):
+    for child in path.iterdir():
+        child.unlink()
+    path.rmdir()
+
+def _install_dir(tmp_dir, out_dir):
+    """Swap a finished build directory into place so readers never see a half-written one."""
+    if out_dir.exists():
+        old_dir = out_dir.with_name(out_dir.name + ".old")
+        if old_dir.exists():
+            _remove_dir(old_dir)
+        os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        _remove_dir(old_dir)
+    else:
+        os.replace(tmp_dir, out_dir)
@@ -0,0 +1,370 @@
+"""
+Single-file corpus snapshot for fast cold start.
+
+build_pack() writes the manifest, the metadata sidecars, every extracted text
+with its page offsets, and the retrieval indexes (BM25 with its filters,
+snippet offsets and batch matrix; optionally the vector store and positional
+index) into one binary file:
+
+    header     magic, format version, offset/length/blake2b of the directory
+    sections   one per component, each aligned to SECTION_ALIGN bytes
+    directory  JSON: name -> offset, length, kind (array|json), dtype, shape,
+               blake2b checksum; plus what the pack was built from
+
+CorpusPack opens the file once and memory-maps it. Only the directory is
+parsed up front (its checksum is always checked); arrays are zero-copy
+np.frombuffer views into the mapping and JSON sections are decoded on first
+use, so opening a component costs its own JSON and nothing else. Section
+checksums are checked on demand with verify() (or verify=True at open).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from .documents import BUILD_DIR, Corpus, Document
+from .filters import FilterIndex
+from .lexical import INDEX_DIR, LexicalIndex
+from .positional import POSITIONAL_DIR, PositionalIndex
+from .snippets import ARRAYS as SNIPPET_ARRAYS
+from .snippets import Snippets
+from .sparse import BatchScorer
+from .vectors import VECTOR_DIR, VectorStore, store_embedder
+
+PACK_PATH = BUILD_DIR / "corpus.pack"
+MAGIC = b"CORTPACK"
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, directory offset, directory length, directory digest
+HEADER = struct.Struct("<8sIIQQ16s")
+HEADER_SIZE = 64
+# Sections start on cache-line boundaries so array views are aligned for any dtype
+SECTION_ALIGN = 64
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16)
+
+class PackWriter:
+    """Appends sections to a pack file and writes the directory on close."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.f = open(self.path, 'wb')
+        self.f.write(b"\0" * HEADER_SIZE)
+        self.entries = {}
+
+    def _section(self, name, data, **fields):
+        if name in self.entries:
+            raise ValueError(f"duplicate pack section: {name}")
+        offset = self.f.tell()
+        padding = -offset % SECTION_ALIGN
+        self.f.write(b"\0" * padding)
+        offset += padding
+        self.f.write(data)
+        self.entries[name] = dict(fields, offset=offset, length=len(data),
+                                  checksum=_digest(data).hexdigest())
+
+    def add_array(self, name, values):
+        values = np.ascontiguousarray(values)
+        self._section(name, memoryview(values).cast('B'), kind="array",
+                      dtype=values.dtype.str, shape=list(values.shape))
+
+    def add_json(self, name, value):
+        self._section(name, json.dumps(value, ensure_ascii=False).encode('utf-8'), kind="json")
+
+    def add_filters(self, prefix, filters):
+        """A FilterIndex as <prefix>/filters (meta and values) and <prefix>/filters_bits."""
+        self.add_json(f"{prefix}/filters", dict(filters.meta, values={
+            facet: [[value, row] for value, row in entries.items()] for facet, entries in filters.values.items()}))
+        self.add_array(f"{prefix}/filters_bits", filters.bits)
+
+    def close(self, info):
+        directory = json.dumps(dict(info, entries=self.entries), ensure_ascii=False).encode('utf-8')
+        offset = self.f.tell()
+        self.f.write(directory)
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, offset, len(directory), _digest(directory).digest()))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+
+def build_pack(out_path=PACK_PATH, corpus=None, index_dir=INDEX_DIR, vector_dir=VECTOR_DIR,
+               positional_dir=POSITIONAL_DIR):
+    """Snapshot the corpus and its built indexes into one pack file.
+
+    The BM25 index is required; the vector store and positional index are
+    included when their directories exist (pass None to leave one out).
+    Returns the pack's directory info.
+    """
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    writer = PackWriter(tmp_path)
+    components = {}
+
+    # Corpus: manifest, sidecars, and one text blob with a per-document table
+    writer.add_json("manifest", corpus.manifest)
+    sidecars = {}
+    table = []
+    pages = []
+    texts = bytearray()
+    for doc in corpus:
+        if doc.sidecar:
+            sidecars[doc.doc_id] = doc.sidecar
+        if not doc.has_text or not doc.path.exists():
+            continue
+        # doc_id, text offset, text length, first page row, page count
+        table.append([doc.doc_id, len(texts), doc.size, len(pages), len(doc.pages)])
+        texts += doc.buffer
+        pages.extend(doc.pages)
+        doc.close()
+    writer.add_json("sidecars", sidecars)
+    writer.add_json("documents", table)
+    writer.add_array("texts", np.frombuffer(bytes(texts), dtype=np.uint8))
+    writer.add_array("pages", np.asarray(pages, dtype=np.int64).reshape(-1, 4))
+    components["corpus"] = {"documents": len(table), "text_bytes": len(texts)}
+
+    # BM25 index with everything a server builds around it
+    index = LexicalIndex.load(index_dir)
+    writer.add_json("lexical/meta", index.meta)
+    writer.add_json("lexical/terms", index.terms)
+    writer.add_json("lexical/docs", index.docs)
+    for name in LexicalIndex.ARRAYS:
+        writer.add_array(f"lexical/{name}", index.arrays[name])
+    writer.add_filters("lexical", FilterIndex.load(index_dir, [d[1] for d in index.docs],
+                                                   index.meta.get("built_at"), corpus))
+    snippets = Snippets.load(index, corpus)
+    writer.add_json("lexical/snippets", snippets.meta)
+    for name in SNIPPET_ARRAYS:
+        writer.add_array(f"lexical/{name}", getattr(snippets, name.replace("snip_", "")))
+    matrix = BatchScorer.load(index).matrix
+    writer.add_json("lexical/matrix", {"shape": list(matrix.shape), "weighting": "bm25"})
+    writer.add_array("lexical/matrix_data", matrix.data)
+    writer.add_array("lexical/matrix_indices", matrix.indices)
+    writer.add_array("lexical/matrix_indptr", matrix.indptr)
+    components["lexical"] = {"built_at": index.meta.get("built_at"), "chunks": index.n_docs}
+
+    if vector_dir is not None and (Path(vector_dir) / "meta.json").exists():
+        store = VectorStore.load(vector_dir)
+        writer.add_json("vectors/meta", store.meta)
+        writer.add_json("vectors/ids", store.ids)
+        writer.add_array("vectors/vectors", store.vectors)
+        if store.scales is not None:
+            writer.add_array("vectors/scales", store.scales)
+        writer.add_filters("vectors", FilterIndex.load(vector_dir, [entry[1] for entry in store.ids],
+                                                       store.meta.get("built_at"), corpus))
+        components["vectors"] = {"built_at": store.meta.get("built_at"), "rows": len(store)}
+
+    if positional_dir is not None and (Path(positional_dir) / "meta.json").exists():
+        positional = PositionalIndex.load(positional_dir, corpus)
+        writer.add_json("positional/meta", positional.meta)
+        writer.add_json("positional/terms", positional.terms)
+        writer.add_json("positional/docs", positional.docs)
+        for name in PositionalIndex.ARRAYS:
+            writer.add_array(f"positional/{name}", positional.arrays[name])
+        components["positional"] = {"built_at": positional.meta.get("built_at")}
+
+    info = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "manifest_generated_at": corpus.generated_at,
+        "components": components,
+    }
+    writer.close(info)
+    os.replace(tmp_path, out_path)
+    return info
+
+class PackedDocument(Document):
+    """A Document whose text and page offsets come from a CorpusPack."""
+
+    def __init__(self, item, base_dir, pack):
+        super().__init__(item, base_dir)
+        self.pack = pack
+
+    @property
+    def sidecar(self):
+        if self._sidecar is None:
+            self._sidecar = self.pack.json("sidecars").get(self.doc_id, {})
+        return self._sidecar
+
+    def _row(self):
+        row = self.pack.document_table().get(self.doc_id)
+        if row is None:
+            raise ValueError(f"{self.doc_id} has no extracted text in {self.pack.path}")
+        return row
+
+    def _map(self):
+        if self._mmap is None:
+            _, offset, length, _, _ = self._row()
+            self._mmap = self.pack.view("texts")[offset:offset + length]
+        return self._mmap
+
+    def _scan_pages(self):
+        _, _, _, first, count = self._row()
+        self._pages = [tuple(p) for p in self.pack.array("pages")[first:first + count].tolist()]
+
+    def close(self):
+        # Slices of the pack mapping are released with the pack itself
+        self._mmap = None
+
+class PackedCorpus(Corpus):
+    """A Corpus read from a CorpusPack instead of manifest.json and extracted/."""
+
+    def __init__(self, pack):
+        self.pack = pack
+        super().__init__(pack.json("manifest"), pack.path.parent)
+
+    def _document(self, item):
+        return PackedDocument(item, self.base_dir, self.pack)
+
+class CorpusPack:
+    """Read side: one memory-mapped pack file with lazily opened components."""
+
+    def __init__(self, path=PACK_PATH, verify=False):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError(f"{self.path} is not a corpus pack")
+        magic, version, _, offset, length, digest = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a corpus pack")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported pack format in {self.path}: {version}")
+        directory = self._mmap[offset:offset + length]
+        if _digest(directory).digest() != digest:
+            raise ValueError(f"{self.path}: pack directory is corrupt")
+        self.info = json.loads(directory)
+        self.entries = self.info.pop("entries")
+        self._json = {}
+        self._table = None
+        self._components = {}
+        if verify:
+            bad = self.verify()
+            if bad:
+                raise ValueError(f"{self.path}: checksum mismatch in {', '.join(bad)}")
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self, prefix=""):
+        return [name for name in self.entries if name.startswith(prefix)]
+
+    def view(self, name):
+        """Zero-copy memoryview over a section's bytes."""
+        entry = self.entries[name]
+        return memoryview(self._mmap)[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def array(self, name):
+        """A read-only array view into the mapping."""
+        entry = self.entries[name]
+        if entry["kind"] != "array":
+            raise ValueError(f"pack section {name} is {entry['kind']}, not an array")
+        dtype = np.dtype(entry["dtype"])
+        count = entry["length"] // dtype.itemsize
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=entry["offset"]).reshape(entry["shape"])
+
+    def json(self, name):
+        """A JSON section, decoded once."""
+        if name not in self._json:
+            if self.entries[name]["kind"] != "json":
+                raise ValueError(f"pack section {name} is {self.entries[name]['kind']}, not JSON")
+            self._json[name] = json.loads(bytes(self.view(name)))
+        return self._json[name]
+
+    def verify(self, names=None):
+        """Names of sections whose bytes no longer match their checksum."""
+        names = names if names is not None else list(self.entries)
+        return [name for name in names if _digest(self.view(name)).hexdigest() != self.entries[name]["checksum"]]
+
+    def document_table(self):
+        """{doc_id: (doc_id, text offset, text length, first page row, page count)}."""
+        if self._table is None:
+            self._table = {row[0]: row for row in self.json("documents")}
+        return self._table
+
+    # ------------------------------------------------------------------
+    # Components, each opened on first access
+    # ------------------------------------------------------------------
+
+    def _component(self, name, opener):
+        if name not in self._components:
+            self._components[name] = opener()
+        return self._components[name]
+
+    @property
+    def corpus(self):
+        return self._component("corpus", lambda: PackedCorpus(self))
+
+    @property
+    def lexical(self):
+        return self._component("lexical", self._open_lexical)
+
+    def _open_lexical(self):
+        arrays = {name: self.array(f"lexical/{name}") for name in LexicalIndex.ARRAYS}
+        index = LexicalIndex(arrays, self.json("lexical/terms"), self.json("lexical/docs"), self.json("lexical/meta"))
+        index._filters = self._filters("lexical")
+        return index
+
+    def _filters(self, prefix):
+        return FilterIndex.from_saved(self.json(f"{prefix}/filters"), self.array(f"{prefix}/filters_bits"))
+
+    @property
+    def scorer(self):
+        return self._component("scorer", self._open_scorer)
+
+    def _open_scorer(self):
+        info = self.json("lexical/matrix")
+        matrix = sparse.csr_matrix((self.array("lexical/matrix_data"), self.array("lexical/matrix_indices"),
+                                    self.array("lexical/matrix_indptr")), shape=tuple(info["shape"]), copy=False)
+        return BatchScorer(self.lexical, matrix, info["weighting"])
+
+    @property
+    def snippets(self):
+        return self._component("snippets", lambda: Snippets(
+            self.lexical, {name: self.array(f"lexical/{name}") for name in SNIPPET_ARRAYS},
+            self.json("lexical/snippets"), self.corpus))
+
+    def vectors(self, embedder=None):
+        """The packed VectorStore (None if the pack has none)."""
+        if "vectors/meta" not in self:
+            return None
+        meta = self.json("vectors/meta")
+        scales = self.array("vectors/scales") if "vectors/scales" in self else None
+        store = VectorStore(self.array("vectors/vectors"), self.json("vectors/ids"), meta, scales,
+                            store_embedder(meta, embedder))
+        store._filters = self._filters("vectors")
+        return store
+
+    @property
+    def positional(self):
+        if "positional/meta" not in self:
+            return None
+        return self._component("positional", lambda: PositionalIndex(
+            {name: self.array(f"positional/{name}") for name in PositionalIndex.ARRAYS},
+            self.json("positional/terms"), self.json("positional/docs"), self.json("positional/meta"),
+            self.corpus))
+
+    def close(self):
+        """Drop the mapping; arrays and views handed out keep it alive until they go."""
+        self._components.clear()
+        self._json.clear()
+        self._table = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
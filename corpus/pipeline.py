@@ -0,0 +1,459 @@
+"""
+Dependency-aware build pipeline with content-hash freshness checks.
+
+A Pipeline is a set of Tasks, each an action (a module-level function and its
+arguments) with declared inputs and outputs, paths relative to the corpus
+root. Inputs may be glob patterns ("extracted/**/*.txt"); a task depends on
+every task that declares an output its inputs name or match, so the graph
+comes from the declarations alone.
+
+A task runs only when something it depends on changed:
+
+- its fingerprint (a hash of its params and of the content of every input,
+  missing inputs included) differs from the one recorded after its last
+  successful run, or
+- one of its recorded outputs was deleted or its content changed.
+
+File digests are cached by (size, mtime_ns), so checking an unchanged tree
+stats files instead of reading them. Because freshness is by content, a task
+that reruns but writes identical bytes does not invalidate what depends on
+it. A task with no record whose outputs all exist adopts them as built (so a
+checkout that already holds the corpus is not rebuilt from scratch) unless a
+task it depends on ran first in the same run; a failed task is not retried until its fingerprint changes or retry_failed is
+set, and what depends on it is blocked for the run (unless the task is
+non-blocking).
+
+Ready tasks run in parallel on per-kind pools: "network" and "local" tasks
+on threads, "cpu" tasks on processes.
+
+Every run adds to corpus.instrument.metrics: one "pipeline" call per task
+that ran (with its status and hash cache hits as counters), plus whatever
+the actions record themselves, collected back from worker processes. An
+action whose stage (the task name up to ":") is selected for profiling runs
+under the profiler.
+"""
+
+import fnmatch
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from .documents import BASE_DIR, BUILD_DIR
+from .instrument import metrics, worker_initializer
+
+PIPELINE_DIR = BUILD_DIR / "pipeline"
+STATE_PATH = PIPELINE_DIR / "state.json"
+FORMAT_VERSION = 1
+
+POOLS = ("local", "network", "cpu")
+READ_SIZE = 1 << 20
+GLOB_CHARS = set("*?[")
+
+def file_digest(path, algorithm="blake2b"):
+    """Hex digest of a file's content, read in READ_SIZE blocks."""
+    h = hashlib.new(algorithm)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+class HashCache:
+    """File digests keyed by relative path, reused while size and mtime are unchanged."""
+
+    def __init__(self, entries=None, algorithm="blake2b", base_dir=BASE_DIR):
+        self.entries = dict(entries or {})
+        self.algorithm = algorithm
+        self.base_dir = Path(base_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def stat(self, rel):
+        """(size, mtime_ns) of a file, or None if it does not exist."""
+        try:
+            st = os.stat(self.base_dir / rel)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def digest(self, rel, stat=None):
+        """Digest of base_dir/rel, or None if the file does not exist."""
+        stat = stat or self.stat(rel)
+        if stat is None:
+            self.entries.pop(rel, None)
+            return None
+        entry = self.entries.get(rel)
+        if entry is not None and entry[0] == stat[0] and entry[1] == stat[1]:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        digest = file_digest(self.base_dir / rel, self.algorithm)
+        self.entries[rel] = [stat[0], stat[1], digest]
+        return digest
+
+    def record(self, rel):
+        """[size, mtime_ns, digest] of a file as it is now, or None if it does not exist."""
+        stat = self.stat(rel)
+        if stat is None:
+            return None
+        return [stat[0], stat[1], self.digest(rel, stat)]
+
+    def digest_many(self, rels, workers=None):
+        """{rel: digest or None} for many files, hashing the uncached ones on parallel threads.
+
+        hashlib releases the GIL while it hashes large blocks, so reads and
+        digests of different files overlap.
+        """
+        digests = {}
+        todo = []
+        for rel in rels:
+            stat = self.stat(rel)
+            entry = self.entries.get(rel)
+            if stat is None:
+                self.entries.pop(rel, None)
+                digests[rel] = None
+            elif entry is not None and entry[0] == stat[0] and entry[1] == stat[1]:
+                self.hits += 1
+                digests[rel] = entry[2]
+            else:
+                todo.append((rel, stat))
+        self.misses += len(todo)
+        if todo:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+                hashed = executor.map(lambda job: file_digest(self.base_dir / job[0], self.algorithm), todo)
+                for (rel, stat), digest in zip(todo, hashed):
+                    self.entries[rel] = [stat[0], stat[1], digest]
+                    digests[rel] = digest
+        return digests
+
+class Task:
+    """One unit of work: action(*args) reading inputs and writing outputs.
+
+    params are any JSON-serialisable settings that should rebuild the task
+    when they change (a URL, a placeholder's text). pool is "local",
+    "network" or "cpu"; cpu actions and their arguments must be picklable.
+    A failed task blocks its dependents unless blocking is False (a failed
+    download leaves the previous files for later tasks to use).
+    """
+
+    def __init__(self, name, action, args=(), inputs=(), outputs=(), params=None, pool="local", blocking=True):
+        if pool not in POOLS:
+            raise ValueError(f"unknown pool: {pool}")
+        self.name = name
+        self.stage = name.split(":", 1)[0]
+        self.action = action
+        self.args = tuple(args)
+        self.inputs = [str(p) for p in inputs]
+        self.outputs = [str(p) for p in outputs]
+        self.params = params
+        self.pool = pool
+        self.blocking = blocking
+        self.deps = []
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+def _is_glob(pattern):
+    return bool(GLOB_CHARS & set(pattern))
+
+def _call(action, args, stage, name):
+    """Run an action and time it (in whichever process the pool uses).
+
+    Returns (result, seconds, metrics recorded in a worker process or None).
+    """
+    worker = multiprocessing.parent_process() is not None
+    if worker:
+        # Drop what the worker inherited or sent back already
+        metrics.take()
+    start = time.perf_counter()
+    with metrics.profile(stage, name):
+        result = action(*args)
+    seconds = time.perf_counter() - start
+    return result, seconds, metrics.take() if worker else None
+
+class Pipeline:
+    """A DAG of Tasks with recorded state in build/pipeline/state.json."""
+
+    def __init__(self, tasks, base_dir=BASE_DIR, state_path=STATE_PATH, workers=None):
+        self.base_dir = Path(base_dir)
+        self.state_path = Path(state_path)
+        self.workers = {"local": 1, "network": 4, "cpu": os.cpu_count() or 1}
+        self.workers.update(workers or {})
+        self.tasks = {}
+        producers = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"duplicate task: {task.name}")
+            self.tasks[task.name] = task
+            for out in task.outputs:
+                if out in producers:
+                    raise ValueError(f"{out} is an output of both {producers[out].name} and {task.name}")
+                producers[out] = task
+        for task in self.tasks.values():
+            deps = {}
+            for pattern in task.inputs:
+                if _is_glob(pattern):
+                    matched = [t for out, t in producers.items() if fnmatch.fnmatchcase(out, pattern)]
+                else:
+                    matched = [producers[pattern]] if pattern in producers else []
+                deps.update((t.name, t) for t in matched if t is not task)
+            task.deps = list(deps.values())
+        self.order = self._toposort()
+        self.state = self._load_state()
+        self.hashes = HashCache(self.state.get("hashes"), base_dir=self.base_dir)
+
+    def _toposort(self):
+        order, marks = [], {}
+        for root in self.tasks.values():
+            stack = [(root, iter(root.deps))]
+            if marks.get(root.name) == "done":
+                continue
+            marks[root.name] = "open"
+            while stack:
+                task, deps = stack[-1]
+                dep = next(deps, None)
+                if dep is None:
+                    stack.pop()
+                    marks[task.name] = "done"
+                    order.append(task)
+                elif marks.get(dep.name) == "open":
+                    raise ValueError(f"dependency cycle through {dep.name}")
+                elif dep.name not in marks:
+                    marks[dep.name] = "open"
+                    stack.append((dep, iter(dep.deps)))
+        return order
+
+    def _load_state(self):
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get("format_version") == FORMAT_VERSION:
+                return state
+        return {"format_version": FORMAT_VERSION, "tasks": {}, "hashes": {}}
+
+    def save_state(self):
+        self.state["hashes"] = self.hashes.entries
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+
+    def resolve_inputs(self, task):
+        """Relative paths of a task's inputs now: literal paths (present or not) and glob matches."""
+        paths = set()
+        for pattern in task.inputs:
+            if _is_glob(pattern):
+                paths.update(p.relative_to(self.base_dir).as_posix()
+                             for p in self.base_dir.glob(pattern) if p.is_file())
+            else:
+                paths.add(pattern)
+        return sorted(paths)
+
+    def fingerprint(self, task):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(task.params, sort_keys=True, default=str).encode('utf-8'))
+        for rel in self.resolve_inputs(task):
+            h.update(f"\0{rel}\0{self.hashes.digest(rel)}".encode('utf-8'))
+        return h.hexdigest()
+
+    def changed_output(self, record):
+        """First recorded output that is gone or whose content changed, else None."""
+        for rel, old in record.get("outputs", {}).items():
+            stat = self.hashes.stat(rel)
+            if old is None or stat is None:
+                if old is not None or stat is not None:
+                    return rel
+                continue
+            if (stat[0], stat[1]) != (old[0], old[1]) and self.hashes.digest(rel, stat) != old[2]:
+                return rel
+        return None
+
+    def check(self, task, force=False, retry_failed=False):
+        """(reason to run, fingerprint); reason is None when the task is fresh."""
+        fingerprint = self.fingerprint(task)
+        record = self.state["tasks"].get(task.name)
+        if force:
+            return "forced", fingerprint
+        if record is None:
+            missing = [out for out in task.outputs if not (self.base_dir / out).exists()]
+            if task.outputs and not missing:
+                return "adopt", fingerprint
+            return "new", fingerprint
+        if record.get("fingerprint") != fingerprint:
+            return "inputs changed", fingerprint
+        if record.get("status") == "failed":
+            return ("retry", fingerprint) if retry_failed else ("failed earlier", fingerprint)
+        changed = self.changed_output(record)
+        if changed is not None:
+            return f"output changed: {changed}", fingerprint
+        return None, fingerprint
+
+    def decide(self, task, upstream=(), force=False, retry_failed=False):
+        """check() for a task whose dependencies have been dealt with in this run (or dry run).
+
+        upstream names the dependencies that ran (or would run) first. A task
+        with no record is adopted only when none did: outputs that predate a
+        dependency's new run were not made from what it wrote, so the task
+        runs ("after <dep>") instead.
+        """
+        reason, fingerprint = self.check(task, force, retry_failed)
+        if reason == "adopt" and upstream:
+            reason = f"after {upstream[0]}"
+        return reason, fingerprint
+
+    def select(self, patterns=None):
+        """Tasks matching any fnmatch pattern (all when None), plus everything they depend on."""
+        if not patterns:
+            return list(self.order)
+        wanted = set()
+        stack = [t for t in self.order if any(fnmatch.fnmatchcase(t.name, p) for p in patterns)]
+        while stack:
+            task = stack.pop()
+            if task.name not in wanted:
+                wanted.add(task.name)
+                stack.extend(task.deps)
+        return [t for t in self.order if t.name in wanted]
+
+    def plan(self, only=None, force=(), retry_failed=False, skip_pools=()):
+        """[(task, reason)] in dependency order without running anything (a dry run).
+
+        reason is None for fresh tasks and "after <dep>" for fresh tasks
+        downstream of one that would run.
+        """
+        reasons = {}
+        for task in self.select(only):
+            forced = any(fnmatch.fnmatchcase(task.name, p) for p in force)
+            if task.pool in skip_pools and not forced:
+                reasons[task.name] = None
+                continue
+            upstream = [d.name for d in task.deps if reasons.get(d.name)]
+            reason, _ = self.decide(task, upstream, forced, retry_failed)
+            if reason in ("adopt", "failed earlier"):
+                reason = None
+            if reason is None and upstream:
+                reason = f"after {upstream[0]}"
+            reasons[task.name] = reason
+        return [(self.tasks[name], reason) for name, reason in reasons.items()]
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _executor(self, pools, pool):
+        if pool not in pools:
+            if pool == "cpu" and self.workers["cpu"] > 1:
+                initializer, initargs = worker_initializer()
+                pools[pool] = ProcessPoolExecutor(max_workers=self.workers["cpu"], initializer=initializer,
+                                                  initargs=initargs)
+            else:
+                pools[pool] = ThreadPoolExecutor(max_workers=self.workers[pool], thread_name_prefix=pool)
+        return pools[pool]
+
+    def _record(self, task, fingerprint, status, seconds=None, result=None, error=None):
+        self.state["tasks"][task.name] = {
+            "fingerprint": fingerprint,
+            "status": status,
+            "outputs": {out: self.hashes.record(out) for out in task.outputs},
+            "finished_at": datetime.now().isoformat(),
+            "seconds": seconds,
+            "result": result if isinstance(result, (dict, list, str, int, float, type(None))) else str(result),
+            "error": error,
+        }
+
+    def run(self, only=None, force=(), retry_failed=False, skip_pools=(), report=None):
+        """Run every stale task (dependencies first, independent ones in parallel).
+
+        Returns {task name: status} with status "ran", "fresh", "adopted",
+        "skipped" (its pool was skipped), "failed", "failed earlier" or
+        "blocked" (a dependency failed). report(event, task, info) is called as
+        tasks start and finish.
+        """
+        report = report or (lambda event, task, info: None)
+        hits, misses = self.hashes.hits, self.hashes.misses
+        tasks = self.select(only)
+        statuses = {}
+        pending = list(tasks)
+        running = {}
+        pools = {}
+        try:
+            while pending or running:
+                progressed = False
+                for task in list(pending):
+                    if any(d.name not in statuses for d in task.deps):
+                        continue
+                    pending.remove(task)
+                    progressed = True
+                    if any(d.blocking and statuses.get(d.name) in ("failed", "failed earlier", "blocked")
+                           for d in task.deps):
+                        statuses[task.name] = "blocked"
+                        report("blocked", task, None)
+                        continue
+                    forced = any(fnmatch.fnmatchcase(task.name, p) for p in force)
+                    if task.pool in skip_pools and not forced:
+                        statuses[task.name] = "skipped"
+                        continue
+                    upstream = [d.name for d in task.deps if statuses.get(d.name) == "ran"]
+                    reason, fingerprint = self.decide(task, upstream, forced, retry_failed)
+                    if reason is None:
+                        statuses[task.name] = "fresh"
+                    elif reason == "adopt":
+                        self._record(task, fingerprint, "ok", result="adopted")
+                        statuses[task.name] = "adopted"
+                    elif reason == "failed earlier":
+                        statuses[task.name] = "failed earlier"
+                        report("failed earlier", task, self.state["tasks"][task.name].get("error"))
+                    else:
+                        report("start", task, reason)
+                        future = self._executor(pools, task.pool).submit(_call, task.action, task.args,
+                                                                         task.stage, task.name)
+                        running[future] = (task, fingerprint)
+                if not running:
+                    if not progressed and pending:
+                        raise RuntimeError(f"cannot schedule {pending[0].name}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, fingerprint = running.pop(future)
+                    try:
+                        result, seconds, worker_metrics = future.result()
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        self._record(task, fingerprint, "failed", error=error)
+                        statuses[task.name] = "failed"
+                        report("failed", task, {"error": error, "traceback": traceback.format_exc()})
+                    else:
+                        if worker_metrics:
+                            metrics.merge(worker_metrics)
+                        metrics.record("pipeline", seconds, task.name)
+                        self._record(task, fingerprint, "ok", seconds, result)
+                        statuses[task.name] = "ran"
+                        report("done", task, {"seconds": seconds, "result": result})
+                    # Keep progress even if a later task is interrupted
+                    self.save_state()
+        finally:
+            for executor in pools.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+            # Later tasks may rewrite files an earlier one produced (sidecars): record what this run's tasks left.
+            # Outputs of tasks that did not run keep their record, so such an edit still shows up next time.
+            for task in tasks:
+                if statuses.get(task.name) == "ran":
+                    self.state["tasks"][task.name]["outputs"] = {out: self.hashes.record(out) for out in task.outputs}
+            self.save_state()
+            for status in statuses.values():
+                metrics.count("pipeline", status.replace(" ", "_"))
+            metrics.count("pipeline", "hash_cache_hits", self.hashes.hits - hits)
+            metrics.count("pipeline", "hash_cache_misses", self.hashes.misses - misses)
+        return statuses
@@ -0,0 +1,222 @@
+"""
+Positional index for exact-phrase and proximity lookups over whole documents.
+
+Every extracted text's tokens, read from the token store (see
+corpus.tokenizer), are laid end to end in one global stream,
+with one unused slot between documents so no phrase can span two of them.
+[Page N] marker lines are skipped, so a quotation that runs across a page
+break still matches. For each term the sorted global positions are stored
+delta-encoded and variable-byte compressed; per position, tok_start/tok_end
+hold the token's character offsets in its document.
+
+A phrase of n tokens then matches wherever positions(t_0), positions(t_1) - 1,
+..., positions(t_n-1) - (n - 1) intersect, which is a handful of sorted-array
+intersections rather than a regex pass over the corpus. Matches resolve to
+doc_id, page (from the [Page N] markers) and character offsets, plus the
+exact original text of the span.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import BUILD_DIR, Corpus
+from .lexical import _install_dir, _load_array, _save_array, delta_encode, vbyte_decode, vbyte_encode, vbyte_lengths
+from .tokenizer import tokenize
+from .tokens import byte_to_char, load_tokens
+
+POSITIONAL_DIR = BUILD_DIR / "positional"
+FORMAT_VERSION = 2
+
+def build_positional(corpus=None, out_dir=POSITIONAL_DIR, tokens=None):
+    """Index every document with extracted text and write the positional index to out_dir."""
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    tokens = tokens if tokens is not None else load_tokens(corpus)
+    out_dir = Path(out_dir)
+    term_ids, tok_start, tok_end = [], [], []
+    docs = []
+    base = 0
+    for doc in corpus.documents():
+        if not doc.path.exists() or doc.doc_id not in tokens:
+            continue
+        ids = tokens.tokens(doc.doc_id)
+        starts, ends = tokens.offsets(doc.doc_id)
+        # Drop the tokens of [Page N] marker lines
+        keep = np.ones(ids.size, dtype=bool)
+        for _, marker_start, body_start, _ in doc.pages:
+            keep[np.searchsorted(starts, marker_start):np.searchsorted(starts, body_start)] = False
+        data = doc.buffer
+        docs.append([doc.doc_id, base, int(keep.sum())])
+        # The trailing -1 is the slot that separates this document from the next
+        term_ids.extend((ids[keep].astype(np.int64), [-1]))
+        tok_start.extend((byte_to_char(data, starts[keep]), [0]))
+        tok_end.extend((byte_to_char(data, ends[keep]), [0]))
+        base += docs[-1][2] + 1
+        doc.close()
+
+    # Term ids are renumbered over the terms that occur, keeping the store's alphabetical order
+    ids = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int64)
+    positions = np.flatnonzero(ids >= 0)
+    used = np.unique(ids[positions])
+    terms = [tokens.terms[t] for t in used]
+    term_of = np.searchsorted(used, ids[positions])
+    # Group positions by term; order within a term stays ascending
+    order = np.argsort(term_of, kind='stable')
+    positions = positions[order]
+    counts = np.bincount(term_of, minlength=len(terms)).astype(np.uint32)
+
+    term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(counts, out=term_ptr[1:])
+    gaps = delta_encode(positions)
+    starts = term_ptr[:-1][counts > 0]
+    gaps[starts] = positions[starts]
+    byte_offsets = np.concatenate(([0], np.cumsum(vbyte_lengths(gaps)))).astype(np.uint64)
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    _save_array(tmp_dir, "count", counts)
+    _save_array(tmp_dir, "pos_ptr", byte_offsets[term_ptr])
+    _save_array(tmp_dir, "pos_blob", vbyte_encode(gaps))
+    _save_array(tmp_dir, "tok_start", np.concatenate(tok_start).astype(np.uint32) if tok_start else ids.astype(np.uint32))
+    _save_array(tmp_dir, "tok_end", np.concatenate(tok_end).astype(np.uint32) if tok_end else ids.astype(np.uint32))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "manifest_generated_at": corpus.generated_at,
+        "n_docs": len(docs),
+        "n_terms": len(terms),
+        "n_tokens": int(positions.size),
+    }
+    with open(tmp_dir / "terms.json", 'w', encoding='utf-8') as f:
+        json.dump(terms, f, ensure_ascii=False)
+    with open(tmp_dir / "docs.json", 'w', encoding='utf-8') as f:
+        json.dump(docs, f, ensure_ascii=False)
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    _install_dir(tmp_dir, out_dir)
+    return meta
+
+class PositionalIndex:
+    """Read side: phrase and proximity matches with page and character offsets."""
+
+    ARRAYS = ("count", "pos_ptr", "pos_blob", "tok_start", "tok_end")
+
+    def __init__(self, arrays, terms, docs, meta, corpus=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.docs = docs
+        self.doc_base = np.array([d[1] for d in docs], dtype=np.int64)
+        self.count = arrays["count"]
+        self.pos_ptr = arrays["pos_ptr"]
+        self.pos_blob = arrays["pos_blob"]
+        self.tok_start = arrays["tok_start"]
+        self.tok_end = arrays["tok_end"]
+        self.corpus = corpus if corpus is not None else Corpus.from_manifest()
+
+    @classmethod
+    def load(cls, index_dir=POSITIONAL_DIR, corpus=None):
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported positional index format in {index_dir}: {meta.get('format_version')}")
+        with open(index_dir / "terms.json", 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        with open(index_dir / "docs.json", 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+        arrays = {name: _load_array(index_dir, name) for name in cls.ARRAYS}
+        return cls(arrays, terms, docs, meta, corpus)
+
+    def positions(self, term):
+        """Sorted global token positions of a term (empty if it never occurs)."""
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            return np.zeros(0, dtype=np.int64)
+        gaps = vbyte_decode(self.pos_blob[self.pos_ptr[term_id]:self.pos_ptr[term_id + 1]])
+        return np.cumsum(gaps).astype(np.int64)
+
+    def phrase_starts(self, tokens):
+        """Global positions where the token sequence occurs contiguously."""
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+        # Intersect rarest first so the candidate set shrinks as fast as possible
+        order = sorted(range(len(tokens)), key=lambda i: int(self.count[self.vocab[tokens[i]]])
+                       if tokens[i] in self.vocab else 0)
+        starts = None
+        for i in order:
+            shifted = self.positions(tokens[i]) - i
+            starts = shifted if starts is None else np.intersect1d(starts, shifted, assume_unique=True)
+            if starts.size == 0:
+                break
+        return starts
+
+    def near_spans(self, tokens, window):
+        """(first, last) global positions where every distinct token occurs within `window`
+        tokens of an occurrence of the rarest one, in the same document."""
+        distinct = list(dict.fromkeys(tokens))
+        lists = [self.positions(t) for t in distinct]
+        if not lists or any(p.size == 0 for p in lists):
+            return []
+        rarest = min(range(len(lists)), key=lambda i: lists[i].size)
+        anchors = lists[rarest]
+        lows, highs = anchors.copy(), anchors.copy()
+        ok = np.ones(anchors.size, dtype=bool)
+        for i, positions in enumerate(lists):
+            if i == rarest:
+                continue
+            # Nearest occurrence on either side of each anchor
+            j = np.searchsorted(positions, anchors)
+            before = positions[np.maximum(j - 1, 0)]
+            after = positions[np.minimum(j, positions.size - 1)]
+            use_after = np.abs(after - anchors) < np.abs(anchors - before)
+            nearest = np.where(use_after, after, before)
+            ok &= np.abs(nearest - anchors) <= window
+            lows = np.minimum(lows, nearest)
+            highs = np.maximum(highs, nearest)
+        # Spans crossing a document boundary include its separator slot
+        same_doc = np.searchsorted(self.doc_base, lows, side='right') == np.searchsorted(self.doc_base, highs, side='right')
+        keep = ok & same_doc
+        return list(zip(lows[keep].tolist(), highs[keep].tolist()))
+
+    def hit(self, first, last):
+        """Resolve a span of global token positions to a citation dict."""
+        d = int(np.searchsorted(self.doc_base, first, side='right')) - 1
+        doc_id = self.docs[d][0]
+        char_start = int(self.tok_start[first])
+        char_end = int(self.tok_end[last])
+        doc = self.corpus.get(doc_id)
+        page = page_end = None
+        text = None
+        if doc is not None:
+            page = doc.page_at(doc.char_to_byte(char_start))
+            page_end = doc.page_at(doc.char_to_byte(char_end))
+            text = doc.text(char_start, char_end)
+        return {
+            "doc_id": doc_id,
+            "page": page,
+            "page_end": page_end,
+            "char_start": char_start,
+            "char_end": char_end,
+            "text": text,
+        }
+
+    def phrase(self, query, limit=None):
+        """Exact-phrase matches of a quotation, in corpus order."""
+        tokens = tokenize(query)
+        starts = self.phrase_starts(tokens)
+        if limit is not None:
+            starts = starts[:limit]
+        return [self.hit(int(s), int(s) + len(tokens) - 1) for s in starts]
+
+    def near(self, query, window=10, limit=None):
+        """Matches where all query words occur within `window` tokens of each other."""
+        spans = self.near_spans(tokenize(query), window)
+        if limit is not None:
+            spans = spans[:limit]
+        return [self.hit(first, last) for first, last in spans]
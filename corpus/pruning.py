@@ -0,0 +1,255 @@
+"""
+Dynamic pruning for top-k BM25 retrieval.
+
+Both strategies rely on the score upper bounds build_index() stores next to
+the postings: one maximum per term and one per BLOCK_SIZE-posting skip block.
+
+- maxscore_search() is term-at-a-time and vectorized. High-impact terms are
+  scored in full until no unseen chunk could still reach the top-k; the
+  remaining (frequent, low-idf) terms are then only probed for surviving
+  candidates, decoding just the blocks those candidates fall in.
+- block_max_wand_search() is the classic document-at-a-time Block-Max WAND,
+  moving per-term cursors and skipping whole blocks whose maxima cannot beat
+  the current k-th score.
+
+Both return the same top-k as LexicalIndex.score() (up to float rounding in
+the order scores are summed), and both accept a boolean chunk mask from a
+facet filter: chunks outside it are skipped before they are scored.
+"""
+
+import heapq
+from bisect import bisect_left
+
+import numpy as np
+
+from .lexical import top_k
+
+STAT_KEYS = ("postings_total", "postings_decoded", "postings_scored", "blocks_total", "blocks_decoded")
+
+def _init_stats(stats):
+    if stats is None:
+        stats = {}
+    for key in STAT_KEYS:
+        stats.setdefault(key, 0)
+    return stats
+
+def _query_plan(index, query, stats):
+    """[(term_id, qtf, weight, upper_bound)] for the query terms found in the index."""
+    plan = []
+    for term_id, qtf in index.query_terms(query).items():
+        plan.append((term_id, qtf, index.idf(term_id) * qtf, float(index.max_score[term_id]) * qtf))
+        stats["postings_total"] += int(index.df[term_id])
+        stats["blocks_total"] += int(index.block_ptr[term_id + 1] - index.block_ptr[term_id])
+    return plan
+
+def _kth_largest(values, k):
+    return float(np.partition(values, values.size - k)[values.size - k])
+
+def _top_hits(index, numbers, scores, k):
+    """Hit dicts for the k best (chunk number, score) pairs."""
+    numbers, scores = top_k(np.asarray(numbers, dtype=np.int64), np.asarray(scores, dtype=np.float32), k)
+    return [index.hit(int(n), float(s)) for n, s in zip(numbers, scores)]
+
+# ============================================================================
+# MaxScore
+# ============================================================================
+
+def maxscore_search(index, query, k=10, stats=None, mask=None, allowed=None):
+    """Top-k hits using vectorized MaxScore with block-max candidate probing."""
+    stats = _init_stats(stats)
+    plan = sorted(_query_plan(index, query, stats), key=lambda p: -p[3])
+    if not plan:
+        return []
+
+    # remaining[i] bounds what terms plan[i:] can still add to any chunk
+    remaining = np.concatenate((np.cumsum([p[3] for p in plan][::-1])[::-1], [0.0]))
+    norm = index.norm
+    k1 = index.k1
+    scores = np.zeros(index.n_docs, dtype=np.float32)
+    seen = np.zeros(index.n_docs, dtype=bool)
+    candidates = np.zeros(0, dtype=np.int64)
+    if mask is not None and allowed is None:
+        allowed = np.flatnonzero(mask)
+
+    # Scores only grow, so the k-th best partial score is a lower bound on the final k-th score
+    i = 0
+    while i < len(plan):
+        if candidates.size >= k and remaining[i] < _kth_largest(scores[candidates], k):
+            break
+        term_id, _, weight, _ = plan[i]
+        if mask is None:
+            docs, tfs = index.postings(term_id)
+        else:
+            # Later terms only probe these candidates, so the mask need not be applied again
+            docs, tfs = index.filtered_postings(term_id, mask, allowed)
+        scores[docs] += weight * tfs * (k1 + 1) / (tfs + norm[docs])
+        new = docs[~seen[docs]]
+        seen[new] = True
+        candidates = np.concatenate((candidates, new))
+        stats["postings_decoded"] += docs.size
+        stats["postings_scored"] += docs.size
+        stats["blocks_decoded"] += int(index.block_ptr[term_id + 1] - index.block_ptr[term_id])
+        i += 1
+
+    candidates.sort()
+    for j in range(i, len(plan)):
+        term_id, qtf, weight, _ = plan[j]
+        threshold = _kth_largest(scores[candidates], k)
+        first = int(index.block_ptr[term_id])
+        last = int(index.block_ptr[term_id + 1])
+        block_last = np.asarray(index.block_last[first:last])
+        block_max = np.asarray(index.block_max[first:last]) * qtf
+
+        # Which block each candidate would sit in, and the best it could still reach
+        in_block = np.searchsorted(block_last, candidates)
+        inside = in_block < block_last.size
+        bound = scores[candidates] + remaining[j + 1]
+        bound[inside] += block_max[in_block[inside]]
+        keep = bound >= threshold
+        candidates, in_block, inside = candidates[keep], in_block[keep], inside[keep]
+
+        blocks = np.unique(in_block[inside])
+        if blocks.size == 0:
+            continue
+        docs, tfs = index.decode_blocks(term_id, first + blocks)
+        stats["blocks_decoded"] += int(blocks.size)
+        stats["postings_decoded"] += int(docs.size)
+
+        probe = candidates[inside]
+        pos = np.minimum(np.searchsorted(docs, probe), docs.size - 1)
+        found = docs[pos] == probe
+        hit_docs = probe[found]
+        hit_tfs = tfs[pos[found]]
+        scores[hit_docs] += weight * hit_tfs * (k1 + 1) / (hit_tfs + norm[hit_docs])
+        stats["postings_scored"] += int(hit_docs.size)
+
+    return _top_hits(index, candidates, scores[candidates], k)
+
+# ============================================================================
+# Block-Max WAND
+# ============================================================================
+
+class _Cursor:
+    """Iterator over one term's postings that decodes blocks only when it lands in them."""
+
+    END = float('inf')
+
+    def __init__(self, index, term_id, qtf, weight, upper_bound, stats):
+        self.index = index
+        self.term_id = term_id
+        self.weight = weight
+        self.upper_bound = upper_bound
+        self.stats = stats
+        self.first = int(index.block_ptr[term_id])
+        self.block_last = index.block_last[self.first:int(index.block_ptr[term_id + 1])].tolist()
+        self.block_max = (index.block_max[self.first:int(index.block_ptr[term_id + 1])] * qtf).tolist()
+        self.block = -1
+        self.docs = []
+        self.tfs = []
+        self.pos = 0
+        self.doc = self.END
+        self._load(0)
+
+    def _load(self, block):
+        self.block = block
+        docs, tfs = self.index.decode_block(self.term_id, self.first + block)
+        self.docs = docs.tolist()
+        self.tfs = tfs.tolist()
+        self.pos = 0
+        self.doc = self.docs[0]
+        self.stats["blocks_decoded"] += 1
+        self.stats["postings_decoded"] += len(self.docs)
+
+    def block_for(self, target):
+        """Block that would hold target (without decoding it), or None past the end."""
+        block = bisect_left(self.block_last, target, self.block)
+        return block if block < len(self.block_last) else None
+
+    def advance(self, target):
+        """Move to the first posting >= target."""
+        if self.doc >= target:
+            return
+        if self.block_last[self.block] < target:
+            block = self.block_for(target)
+            if block is None:
+                self.doc = self.END
+                return
+            self._load(block)
+        self.pos = bisect_left(self.docs, target, self.pos)
+        self.doc = self.docs[self.pos]
+
+    def score(self, norm, k1):
+        tf = self.tfs[self.pos]
+        return self.weight * tf * (k1 + 1) / (tf + float(norm[self.doc]))
+
+def block_max_wand_search(index, query, k=10, stats=None, mask=None, allowed=None):
+    """Top-k hits using document-at-a-time Block-Max WAND."""
+    stats = _init_stats(stats)
+    if mask is not None and allowed is None:
+        allowed = np.flatnonzero(mask)
+
+    def next_allowed(doc):
+        """First chunk >= doc that the mask allows."""
+        if mask is None or mask[doc]:
+            return doc
+        i = int(np.searchsorted(allowed, doc))
+        return int(allowed[i]) if i < allowed.size else _Cursor.END
+
+    norm = index.norm
+    k1 = index.k1
+    cursors = [_Cursor(index, *entry, stats) for entry in _query_plan(index, query, stats)]
+    heap = []
+    threshold = 0.0
+
+    while cursors:
+        cursors.sort(key=lambda c: c.doc)
+
+        # Pivot: first cursor at which the summed term bounds could beat the threshold
+        total = 0.0
+        pivot = None
+        for p, cursor in enumerate(cursors):
+            total += cursor.upper_bound
+            if total > threshold:
+                pivot = p
+                break
+        if pivot is None:
+            break
+        pivot_doc = cursors[pivot].doc
+        while pivot + 1 < len(cursors) and cursors[pivot + 1].doc == pivot_doc:
+            pivot += 1
+        head = cursors[:pivot + 1]
+
+        # Block-max check: can the blocks around pivot_doc beat the threshold at all?
+        # (a cursor whose postings end before pivot_doc contributes nothing there)
+        live = [(c, c.block_for(pivot_doc)) for c in head]
+        live = [(c, b) for c, b in live if b is not None]
+        block_bound = sum(c.block_max[b] for c, b in live)
+        if block_bound <= threshold:
+            skip_to = min(c.block_last[b] for c, b in live) + 1
+            if pivot + 1 < len(cursors):
+                skip_to = min(skip_to, cursors[pivot + 1].doc)
+            for cursor in head:
+                cursor.advance(skip_to)
+        elif next_allowed(pivot_doc) != pivot_doc:
+            # Filtered out: no chunk before the next allowed one needs scoring
+            target = next_allowed(pivot_doc)
+            for cursor in cursors[:pivot + 1]:
+                cursor.advance(target)
+        elif cursors[0].doc == pivot_doc:
+            score = sum(c.score(norm, k1) for c in head)
+            stats["postings_scored"] += len(head)
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -pivot_doc))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -pivot_doc))
+            if len(heap) == k:
+                threshold = heap[0][0]
+            for cursor in head:
+                cursor.advance(pivot_doc + 1)
+        else:
+            for cursor in cursors[:pivot]:
+                cursor.advance(pivot_doc)
+
+        cursors = [c for c in cursors if c.doc != _Cursor.END]
+
+    return _top_hits(index, [-d for _, d in heap], [s for s, _ in heap], k)
@@ -0,0 +1,300 @@
+"""
+Incrementally maintained BM25 index made of segments.
+
+Each segment is an ordinary LexicalIndex directory (plus the chunks.jsonl it
+was built from) under build/segments/. state.json records, per document, the
+extracted path, content hash and segment holding its chunks, and per segment
+the doc_ids that have since been deleted (tombstones).
+
+update() diffs the current manifest against that state by path and content
+hash: removed or changed documents are tombstoned in their old segment, and
+added or changed ones are chunked into one new small segment. Segments whose
+chunks are mostly tombstoned, or the smallest ones once there are more than
+MAX_SEGMENTS, are merged by rebuilding from their live chunks.
+
+SegmentedIndex searches every segment with corpus-wide statistics (live chunk
+count, live document frequency, average length), so its scores equal those of
+a from-scratch build over the same chunks.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .chunking import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP, chunk_document, read_chunks, write_chunks
+from .documents import BUILD_DIR, Corpus
+from .lexical import LexicalIndex, _remove_dir, build_index, top_k
+from .tokenizer import tokenize
+
+SEGMENTS_DIR = BUILD_DIR / "segments"
+STATE_FILE = "state.json"
+FORMAT_VERSION = 2
+
+MAX_SEGMENTS = 8
+MAX_DELETED_RATIO = 0.5
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _empty_state(chunking):
+    return {
+        "format_version": FORMAT_VERSION,
+        "updated_at": None,
+        "manifest_generated_at": None,
+        "chunking": chunking,
+        "next_segment": 1,
+        "segments": [],
+        "documents": {},
+    }
+
+def load_state(segments_dir=SEGMENTS_DIR):
+    path = Path(segments_dir) / STATE_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported segment state format in {segments_dir}: {state.get('format_version')}")
+    return state
+
+def _save_state(state, segments_dir):
+    path = Path(segments_dir) / STATE_FILE
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def diff_manifest(state, corpus):
+    """Compare indexed documents with the manifest by extracted path and content hash.
+
+    Returns {"added", "changed", "removed", "unchanged"} lists of doc_ids plus
+    "fingerprints" {doc_id: (path, size, mtime_ns, content_hash)} for the
+    current documents. A file is only re-hashed when its size or mtime moved.
+    """
+    known = state["documents"]
+    current = {}
+    for doc in corpus.documents():
+        try:
+            st = os.stat(doc.path)
+        except OSError:
+            continue
+        old = known.get(doc.doc_id)
+        if old and old["path"] == doc.extracted_path and (old["size"], old["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            content_hash = old["content_hash"]
+        else:
+            content_hash = file_hash(doc.path)
+        current[doc.doc_id] = (doc.extracted_path, st.st_size, st.st_mtime_ns, content_hash)
+
+    diff = {"added": [], "changed": [], "removed": [], "unchanged": [], "fingerprints": current}
+    for doc_id, (path, _, _, content_hash) in current.items():
+        old = known.get(doc_id)
+        if old is None:
+            diff["added"].append(doc_id)
+        elif old["path"] != path or old["content_hash"] != content_hash:
+            diff["changed"].append(doc_id)
+        else:
+            diff["unchanged"].append(doc_id)
+    diff["removed"] = [doc_id for doc_id in known if doc_id not in current]
+    return diff
+
+def _segment_live_counts(state):
+    live = Counter()
+    for entry in state["documents"].values():
+        live[entry["segment"]] += entry["chunks"]
+    return live
+
+def _new_segment(state, segments_dir, chunks, generated_at):
+    """Build one segment from a list of chunk dicts; returns its state entry."""
+    name = f"seg-{state['next_segment']:06d}"
+    state["next_segment"] += 1
+    seg_dir = Path(segments_dir) / name
+    build_index(chunks, seg_dir, generated_at)
+    write_chunks(iter(chunks), seg_dir / "chunks.jsonl")
+    return {"name": name, "n_chunks": len(chunks), "deleted": []}
+
+def _merge(state, segments_dir, victims, generated_at):
+    """Rebuild the live chunks of the victim segments as one segment."""
+    names = {seg["name"] for seg in victims}
+    deleted = {seg["name"]: set(seg["deleted"]) for seg in victims}
+    chunks = []
+    for seg in victims:
+        for chunk in read_chunks(Path(segments_dir) / seg["name"] / "chunks.jsonl"):
+            if chunk["doc_id"] not in deleted[seg["name"]]:
+                chunks.append(chunk)
+    state["segments"] = [seg for seg in state["segments"] if seg["name"] not in names]
+    if chunks:
+        merged = _new_segment(state, segments_dir, chunks, generated_at)
+        state["segments"].append(merged)
+        for entry in state["documents"].values():
+            if entry["segment"] in names:
+                entry["segment"] = merged["name"]
+    return names
+
+def _merge_policy(state):
+    """Segments to merge: mostly-deleted ones, then the smallest while there are too many."""
+    live = _segment_live_counts(state)
+    dirty = [seg for seg in state["segments"]
+             if seg["deleted"] and 1 - live[seg["name"]] / max(seg["n_chunks"], 1) > MAX_DELETED_RATIO]
+    victims = {seg["name"] for seg in dirty}
+    remaining = [seg for seg in state["segments"] if seg["name"] not in victims]
+    if len(remaining) + (1 if victims else 0) > MAX_SEGMENTS:
+        by_size = sorted(remaining, key=lambda seg: live[seg["name"]])
+        excess = len(remaining) + (1 if victims else 0) - MAX_SEGMENTS + 1
+        victims.update(seg["name"] for seg in by_size[:excess])
+    return [seg for seg in state["segments"] if seg["name"] in victims]
+
+def update(corpus=None, segments_dir=SEGMENTS_DIR, max_tokens=DEFAULT_MAX_TOKENS,
+           overlap=DEFAULT_OVERLAP, unit='sentence'):
+    """Bring the segmented index in line with the manifest. Returns a report dict."""
+    start = time.perf_counter()
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    segments_dir = Path(segments_dir)
+    segments_dir.mkdir(parents=True, exist_ok=True)
+    chunking = {"max_tokens": max_tokens, "overlap": overlap, "unit": unit}
+
+    state = load_state(segments_dir)
+    if state is not None and state["chunking"] != chunking:
+        # Chunk boundaries changed for every document: start over
+        state = None
+    if state is None:
+        state = _empty_state(chunking)
+
+    diff = diff_manifest(state, corpus)
+    segments = {seg["name"]: seg for seg in state["segments"]}
+    for doc_id in diff["removed"] + diff["changed"]:
+        entry = state["documents"].pop(doc_id)
+        if entry["segment"]:
+            segments[entry["segment"]]["deleted"].append(doc_id)
+
+    new_chunks = []
+    for doc_id in diff["added"] + diff["changed"]:
+        doc = corpus[doc_id]
+        chunks = list(chunk_document(doc, max_tokens, overlap, unit))
+        path, size, mtime_ns, content_hash = diff["fingerprints"][doc_id]
+        state["documents"][doc_id] = {
+            "path": path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "content_hash": content_hash,
+            "segment": None,
+            "chunks": len(chunks),
+        }
+        new_chunks.extend(chunks)
+    # Refresh size/mtime of unchanged files that were merely touched
+    for doc_id in diff["unchanged"]:
+        path, size, mtime_ns, _ = diff["fingerprints"][doc_id]
+        state["documents"][doc_id].update(size=size, mtime_ns=mtime_ns)
+
+    if new_chunks:
+        seg = _new_segment(state, segments_dir, new_chunks, corpus.generated_at)
+        state["segments"].append(seg)
+        # Documents that produced no chunks stay tracked but live in no segment
+        for doc_id in diff["added"] + diff["changed"]:
+            if state["documents"][doc_id]["chunks"]:
+                state["documents"][doc_id]["segment"] = seg["name"]
+
+    merged = set()
+    victims = _merge_policy(state)
+    if victims:
+        merged = _merge(state, segments_dir, victims, corpus.generated_at)
+
+    state["updated_at"] = datetime.now().isoformat()
+    state["manifest_generated_at"] = corpus.generated_at
+    _save_state(state, segments_dir)
+
+    # Only now that state.json no longer refers to them can old segments go
+    keep = {seg["name"] for seg in state["segments"]}
+    for path in segments_dir.iterdir():
+        if path.is_dir() and path.name not in keep:
+            _remove_dir(path)
+
+    return {
+        "added": len(diff["added"]),
+        "changed": len(diff["changed"]),
+        "removed": len(diff["removed"]),
+        "unchanged": len(diff["unchanged"]),
+        "new_chunks": len(new_chunks),
+        "merged_segments": len(merged),
+        "segments": len(state["segments"]),
+        "seconds": time.perf_counter() - start,
+    }
+
+class SegmentedIndex:
+    """Read side: searches all segments as one BM25 index, skipping tombstoned chunks."""
+
+    def __init__(self, state, segments, segments_dir=None):
+        self.state = state
+        self.segments = segments
+        self.segments_dir = segments_dir
+        self.live = []
+        total_len = 0
+        for seg_state, index in zip(state["segments"], segments):
+            deleted = set(seg_state["deleted"])
+            live = np.array([doc[1] not in deleted for doc in index.docs], dtype=bool)
+            self.live.append(live)
+            total_len += int(np.asarray(index.doc_len, dtype=np.int64)[live].sum())
+        self.n_docs = int(sum(live.sum() for live in self.live))
+        self.avgdl = total_len / self.n_docs if self.n_docs else 1.0
+        self.k1 = segments[0].k1 if segments else 1.2
+        self.b = segments[0].b if segments else 0.75
+        # Length norms against the corpus-wide average, zero-weighted for dead chunks
+        self.norms = []
+        for index in segments:
+            dl = np.asarray(index.doc_len, dtype=np.float32)
+            self.norms.append((self.k1 * (1 - self.b + self.b * dl / self.avgdl)).astype(np.float32))
+
+    @classmethod
+    def load(cls, segments_dir=SEGMENTS_DIR):
+        segments_dir = Path(segments_dir)
+        state = load_state(segments_dir)
+        if state is None:
+            raise ValueError(f"No segmented index in {segments_dir}; run scripts/update_index.py")
+        segments = [LexicalIndex.load(segments_dir / seg["name"]) for seg in state["segments"]]
+        return cls(state, segments, segments_dir)
+
+    def __len__(self):
+        return self.n_docs
+
+    def score(self, query):
+        """Per-segment BM25 score arrays using live, corpus-wide statistics."""
+        scores = [np.zeros(index.n_docs, dtype=np.float32) for index in self.segments]
+        for term, qtf in Counter(tokenize(query)).items():
+            postings = []
+            df = 0
+            for i, index in enumerate(self.segments):
+                term_id = index.vocab.get(term)
+                if term_id is None:
+                    continue
+                docs, tfs = index.postings(term_id)
+                keep = self.live[i][docs]
+                docs, tfs = docs[keep], tfs[keep]
+                postings.append((i, docs, tfs))
+                df += docs.size
+            if not df:
+                continue
+            weight = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)) * qtf
+            for i, docs, tfs in postings:
+                scores[i][docs] += weight * tfs * (self.k1 + 1) / (tfs + self.norms[i][docs])
+        return scores
+
+    def search(self, query, k=10):
+        """Top-k chunks across all segments as LexicalIndex-style hit dicts."""
+        per_segment = self.score(query)
+        candidates = []
+        for i, scores in enumerate(per_segment):
+            numbers = np.flatnonzero(scores > 0)
+            numbers, top_scores = top_k(numbers, scores[numbers], k)
+            candidates.extend((float(s), i, int(n)) for n, s in zip(numbers, top_scores))
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+        return [self.segments[i].hit(n, score) for score, i, n in candidates[:k]]
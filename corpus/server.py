@@ -0,0 +1,411 @@
+"""
+Local HTTP/JSON retrieval server on asyncio.
+
+One process loads the corpus and its indexes once and serves them over a
+socket, so RAG workers stay small. Endpoints (GET, or POST with a JSON body
+carrying the same fields):
+
+    /search?q=...&k=10[&method=lexical|dense]   top-k chunk hits, optionally filtered by
+        [&resource_type=&series=&min_year=&max_year=&is_placeholder=&extraction_status=]
+        [&snippets=1]                           and with highlighted snippets
+        [&context=<tokens>[&pack=knapsack|greedy]]  and a cited context packed into a token budget
+    /document?id=<doc_id>[&start=&end=]         manifest fields, or a character range
+    /page?id=<doc_id>&n=<page>                  text of one [Page N] page
+    /health, /stats                             liveness, batching and load counters
+
+Concurrent /search requests are micro-batched: a MicroBatcher takes every
+request queued while the previous batch was scoring (up to max_batch, and
+optionally waiting max_wait_ms for more), scores them with one vectorized
+call (BatchScorer.search_batch for BM25, VectorStore.search_batch for dense)
+on a worker thread, and resolves each request's future (requests with
+different facet filters get one call each). Its queue is bounded: when
+max_pending requests are already waiting the server answers 503 with
+Retry-After instead of queueing without limit, so overload shows up as fast
+rejections rather than runaway latency.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from .context import METHODS as PACK_METHODS, ContextPacker
+from .documents import Corpus
+from .filters import FACETS, YEAR_BOUNDS
+from .lexical import LexicalIndex
+from .snippets import Snippets
+from .sparse import BatchScorer
+
+MAX_BATCH = 64
+# Batches form by themselves while the previous one is scoring; a positive
+# wait only adds latency at low load (measured with scripts/load_test.py)
+MAX_WAIT_MS = 0.0
+MAX_PENDING = 1024
+MAX_K = 100
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class Overloaded(Exception):
+    """Raised when a batcher's queue is full."""
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class MicroBatcher:
+    """Coalesces concurrent single-query calls into batched ones.
+
+    batch_fn(queries, k, filters=None) -> list of results runs on
+    `executor`, one batch at a time; each submit() waits for its own row of
+    the result.
+    """
+
+    def __init__(self, batch_fn, executor, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                 max_pending=MAX_PENDING):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(max_pending)
+        self.batches = 0
+        self.queries = 0
+        self.rejected = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, query, k, filters=None):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((query, k, future, filters))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded()
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            # Take whatever is already queued, then wait out the rest of the window
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, live):
+        """Score a batch on the executor thread, one batch_fn call per distinct filter."""
+        groups = {}
+        for entry in live:
+            groups.setdefault(repr(sorted(entry[3].items())) if entry[3] else None, []).append(entry)
+        results = []
+        for group in groups.values():
+            k = max(entry[1] for entry in group)
+            queries = [entry[0] for entry in group]
+            filters = group[0][3]
+            rows = self.batch_fn(queries, k, filters=filters) if filters else self.batch_fn(queries, k)
+            results.extend(zip(group, rows))
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            live = [entry for entry in batch if not entry[2].done()]
+            if not live:
+                continue
+            try:
+                results = await loop.run_in_executor(self.executor, self._score, live)
+            except Exception as e:
+                for entry in live:
+                    if not entry[2].done():
+                        entry[2].set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(live)
+            for (_, want, future, _), result in results:
+                if not future.done():
+                    future.set_result(result[:want])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch": self.queries / self.batches if self.batches else 0.0,
+            "pending": self.queue.qsize(),
+            "rejected": self.rejected,
+        }
+
+class RetrievalServer:
+    """Holds the corpus, the BM25 batch scorer and (optionally) a vector store."""
+
+    def __init__(self, corpus=None, lexical=None, vectors=None, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS, max_pending=MAX_PENDING, scorer=None, snippets=None):
+        self.corpus = corpus if corpus is not None else Corpus.from_manifest()
+        self.lexical = lexical or LexicalIndex.load()
+        self.scorer = scorer if scorer is not None else BatchScorer.load(self.lexical)
+        self.snippets = snippets if snippets is not None else Snippets.load(self.lexical, self.corpus)
+        self.packer = ContextPacker(self.lexical, self.corpus)
+        self.vectors = vectors
+        self.batch_options = {"max_batch": max_batch, "max_wait_ms": max_wait_ms, "max_pending": max_pending}
+        self.batchers = {}
+        # One scoring thread: batches already use NumPy/SciPy at full width
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scoring")
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.batchers["lexical"] = MicroBatcher(self.scorer.search_batch, self.executor, **self.batch_options)
+        if self.vectors is not None:
+            self.batchers["dense"] = MicroBatcher(self.vectors.search_batch, self.executor, **self.batch_options)
+        for batcher in self.batchers.values():
+            batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    # The body length is unknown, so answer and drop the connection
+                    self.errors += 1
+                    self._write_response(writer, e.status, {"error": str(e)}, False, {})
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload, extra = await self._dispatch(method, target, body)
+                # An oversized body was left unread, so the connection cannot be reused
+                keep_alive = body is not None and headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive, extra)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "invalid Content-Length")
+        if length > MAX_BODY:
+            return method, target, headers, None
+        body = await reader.readexactly(length) if length else b''
+        return method, target, headers, body
+
+    def _write_response(self, writer, status, payload, keep_alive, extra):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+
+    async def _dispatch(self, method, target, body):
+        self.requests += 1
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if method not in ('GET', 'POST'):
+                raise HTTPError(405, f"method {method} not allowed")
+            if body is None:
+                raise HTTPError(413, "request body too large")
+            if method == 'POST' and body:
+                try:
+                    parsed = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, "body is not valid JSON")
+                if not isinstance(parsed, dict):
+                    raise HTTPError(400, "body must be a JSON object")
+                params.update(parsed)
+            handler = self.ROUTES.get(url.path)
+            if handler is None:
+                raise HTTPError(404, f"no endpoint {url.path}")
+            return 200, await handler(self, params), {}
+        except Overloaded:
+            self.errors += 1
+            return 503, {"error": "server overloaded, retry later"}, {"Retry-After": "1"}
+        except HTTPError as e:
+            self.errors += 1
+            return e.status, {"error": str(e)}, {}
+        except Exception as e:
+            self.errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}, {}
+
+    # ------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------
+
+    def _document(self, params):
+        doc_id = params.get("id")
+        if not doc_id:
+            raise HTTPError(400, "missing id")
+        doc = self.corpus.get(doc_id)
+        if doc is None:
+            raise HTTPError(404, f"unknown document {doc_id}")
+        return doc
+
+    @staticmethod
+    def _int(params, name, default=None):
+        value = params.get(name, default)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{name} must be an integer")
+
+    def _filters(self, params):
+        """Facet filter spec from request fields (see corpus.filters)."""
+        filters = params.get("filters")
+        filters = dict(filters) if isinstance(filters, dict) else {}
+        for name in FACETS + YEAR_BOUNDS:
+            if name in params:
+                filters[name] = params[name]
+        for name in ("year",) + YEAR_BOUNDS:
+            if isinstance(filters.get(name), str):
+                filters[name] = self._int(filters, name)
+        if isinstance(filters.get("is_placeholder"), str):
+            filters["is_placeholder"] = filters["is_placeholder"].lower() in ("1", "true", "yes")
+        # JSON bodies can carry any type: reject what the bitsets cannot compare
+        for name in YEAR_BOUNDS:
+            value = filters.get(name)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise HTTPError(400, f"{name} must be an integer")
+        for name in FACETS:
+            value = filters.get(name)
+            values = value if isinstance(value, list) else [value]
+            if not all(v is None or isinstance(v, (str, int, float, bool)) for v in values):
+                raise HTTPError(400, f"{name} must be a value or a list of values")
+        return filters
+
+    async def search(self, params):
+        query = params.get("q") or params.get("query")
+        if not query:
+            raise HTTPError(400, "missing q")
+        k = self._int(params, "k", 10)
+        if not 1 <= k <= MAX_K:
+            raise HTTPError(400, f"k must be between 1 and {MAX_K}")
+        kind = params.get("method", "lexical")
+        batcher = self.batchers.get(kind)
+        if batcher is None:
+            raise HTTPError(400, f"method {kind} is not available")
+        filters = self._filters(params)
+        try:
+            self.lexical.filters.compile(filters)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        budget = self._int(params, "context")
+        pack = params.get("pack", "knapsack")
+        if budget is not None and budget <= 0:
+            raise HTTPError(400, "context must be a positive token budget")
+        if pack not in PACK_METHODS:
+            raise HTTPError(400, f"pack must be one of {', '.join(PACK_METHODS)}")
+        start = time.perf_counter()
+        hits = await batcher.submit(query, k, filters)
+        if str(params.get("snippets", "")).lower() in ("1", "true", "yes"):
+            hits = self.snippets.annotate([dict(hit) for hit in hits], query)
+        context = self.packer.pack(hits, budget, pack) if budget is not None else None
+        response = {"query": query, "k": k, "method": kind, "hits": hits,
+                    "ms": (time.perf_counter() - start) * 1000}
+        if context is not None:
+            response["context"] = context
+        if filters:
+            response["filters"] = filters
+        return response
+
+    async def document(self, params):
+        doc = self._document(params)
+        start, end = self._int(params, "start"), self._int(params, "end")
+        if start is None and end is None:
+            return dict(doc.item, doc_id=doc.doc_id, pages=doc.page_numbers if doc.has_text else [])
+        if not doc.has_text:
+            raise HTTPError(404, f"{doc.doc_id} has no extracted text")
+        return {"doc_id": doc.doc_id, "start": start or 0, "end": end, "text": doc.text(start or 0, end)}
+
+    async def page(self, params):
+        doc = self._document(params)
+        number = self._int(params, "n")
+        if number is None:
+            raise HTTPError(400, "missing n")
+        try:
+            text = doc.page_text(number)
+        except (KeyError, ValueError) as e:
+            raise HTTPError(404, str(e))
+        return {"doc_id": doc.doc_id, "page": number, "text": text}
+
+    async def health(self, params):
+        return {"status": "ok", "documents": len(self.corpus), "chunks": self.lexical.n_docs,
+                "manifest_generated_at": self.corpus.generated_at,
+                "methods": sorted(self.batchers)}
+
+    async def stats(self, params):
+        return {"uptime_s": time.time() - self.started, "requests": self.requests, "errors": self.errors,
+                "batchers": {name: b.stats() for name, b in self.batchers.items()}}
+
+    ROUTES = {
+        "/search": search,
+        "/document": document,
+        "/page": page,
+        "/health": health,
+        "/stats": stats,
+    }
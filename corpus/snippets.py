@@ -0,0 +1,187 @@
+"""
+Query-biased snippets cut straight from the memory-mapped extracted files.
+
+build_snippets() stores, next to the lexical index, each token of every
+indexed document (read from the token store) with its term id and byte
+offsets in the extracted file, plus the token range of every chunk.
+At query time a hit's tokens are compared with the query's term ids, the
+window of `size` tokens covering the most idf weight of distinct query terms
+is chosen, and the snippet is sliced from the document's mmap with the
+matched tokens wrapped in highlight markers. Nothing is re-read or
+re-tokenized per hit.
+"""
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import Corpus
+from .lexical import _load_array, _save_array
+from .tokens import load_tokens
+
+SNIPPETS_FILE = "snippets.json"
+FORMAT_VERSION = 1
+ARRAYS = ("snip_term", "snip_start", "snip_end", "snip_chunk")
+
+WINDOW = 30
+# Tokens of context kept before the first match in the window
+LEAD = 6
+ELLIPSIS = "…"
+
+SPACES = re.compile(r'\s+')
+
+def build_snippets(index, corpus=None, out_dir=None, tokens=None):
+    """Store token term ids, byte offsets and chunk token ranges for a LexicalIndex.
+
+    Tokens come from the token store (see corpus.tokens). Returns
+    (arrays, meta); with out_dir they are also written there.
+    """
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    tokens = tokens if tokens is not None else load_tokens(corpus)
+    unknown = len(index.terms)
+    lookup = tokens.lookup(index.vocab, unknown)
+    terms, starts, ends = [], [], []
+    doc_range = {}
+    base = 0
+    for doc_id in dict.fromkeys(d[1] for d in index.docs):
+        if doc_id not in tokens:
+            continue
+        tok_start, tok_end = tokens.offsets(doc_id)
+        terms.append(lookup[tokens.tokens(doc_id)].astype(np.uint32))
+        starts.append(tok_start)
+        ends.append(tok_end)
+        doc_range[doc_id] = (base, tok_start)
+        base += tok_start.size
+
+    # Each chunk covers the tokens that start inside its byte range
+    chunk = np.zeros((len(index.docs), 2), dtype=np.int64)
+    for number, (_, doc_id, _, byte_start, byte_end) in enumerate(index.docs):
+        if doc_id not in doc_range or byte_start is None:
+            continue
+        offset, tok_start = doc_range[doc_id]
+        chunk[number] = offset + np.searchsorted(tok_start, [byte_start, byte_end])
+
+    empty = np.zeros(0, dtype=np.uint32)
+    arrays = {
+        "snip_term": np.concatenate(terms) if terms else empty,
+        "snip_start": np.concatenate(starts).astype(np.uint32) if starts else empty,
+        "snip_end": np.concatenate(ends).astype(np.uint32) if ends else empty,
+        "snip_chunk": chunk,
+    }
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "index_built_at": index.meta.get("built_at"),
+        "manifest_generated_at": corpus.generated_at,
+        "n_tokens": int(base),
+    }
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        for name, values in arrays.items():
+            _save_array(out_dir, name, values)
+        with open(out_dir / SNIPPETS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+    return arrays, meta
+
+class Snippets:
+    """Snippet generator over a LexicalIndex's chunks (and anything with the same chunk_ids)."""
+
+    def __init__(self, index, arrays, meta, corpus=None):
+        self.index = index
+        self.meta = meta
+        self.corpus = corpus if corpus is not None else Corpus.from_manifest()
+        self.term = arrays["snip_term"]
+        self.start = arrays["snip_start"]
+        self.end = arrays["snip_end"]
+        self.chunk = arrays["snip_chunk"]
+        self.number = {d[0]: i for i, d in enumerate(index.docs)}
+
+    @classmethod
+    def load(cls, index, corpus=None):
+        """Open the offsets stored with an index, building them in memory if missing or stale."""
+        corpus = corpus if corpus is not None else Corpus.from_manifest()
+        index_dir = index.index_dir
+        if index_dir is not None and (Path(index_dir) / SNIPPETS_FILE).exists():
+            with open(Path(index_dir) / SNIPPETS_FILE, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get("format_version") == FORMAT_VERSION
+                    and meta.get("index_built_at") == index.meta.get("built_at")
+                    and meta.get("manifest_generated_at") == corpus.generated_at):
+                arrays = {name: _load_array(Path(index_dir), name) for name in ARRAYS}
+                return cls(index, arrays, meta, corpus)
+        arrays, meta = build_snippets(index, corpus)
+        return cls(index, arrays, meta, corpus)
+
+    def query_weights(self, query):
+        """{term_id: idf} for the query's terms."""
+        return {term_id: self.index.idf(term_id) for term_id in self.index.query_terms(query)}
+
+    def window(self, terms, weights, size):
+        """(first, last) token numbers of the best window, and the matched tokens in it."""
+        matches = np.flatnonzero(np.isin(terms, list(weights)))
+        if matches.size == 0:
+            return 0, min(size, terms.size), matches
+        best = None
+        ends = np.searchsorted(matches, matches + size)
+        for i, first in enumerate(matches.tolist()):
+            inside = terms[matches[i:ends[i]]].tolist()
+            # Distinct terms count fully, repeats only a little
+            score = sum(weights[t] for t in set(inside)) + 0.1 * len(inside)
+            if best is None or score > best[0]:
+                best = (score, first)
+        first = max(0, best[1] - LEAD)
+        last = min(terms.size, first + size)
+        first = max(0, last - size)
+        return first, last, matches[(matches >= first) & (matches < last)]
+
+    def snippet(self, hit, query, size=WINDOW, pre="**", post="**", weights=None):
+        """Snippet dict for one hit: text with highlights, and the byte range it covers."""
+        number = self.number.get(hit["chunk_id"])
+        doc = self.corpus.get(hit["doc_id"])
+        if number is None or doc is None:
+            return None
+        lo, hi = (int(x) for x in self.chunk[number])
+        if hi <= lo:
+            return None
+        weights = weights if weights is not None else self.query_weights(query)
+        first, last, matched = self.window(np.asarray(self.term[lo:hi]), weights, size)
+        byte_start = int(self.start[lo + first])
+        byte_end = int(self.end[lo + last - 1])
+        data = bytes(doc.view(byte_start, byte_end))
+
+        # Runs of consecutive matched tokens ("George Floyd") share one highlight
+        matched = matched.tolist()
+        runs = []
+        for t in matched:
+            if runs and runs[-1][1] == t - 1:
+                runs[-1][1] = t
+            else:
+                runs.append([t, t])
+
+        parts = [ELLIPSIS] if first > 0 else []
+        cursor = 0
+        for t, u in runs:
+            s = int(self.start[lo + t]) - byte_start
+            e = int(self.end[lo + u]) - byte_start
+            parts.append(SPACES.sub(' ', data[cursor:s].decode('utf-8', errors='replace')))
+            parts.append(pre + data[s:e].decode('utf-8', errors='replace') + post)
+            cursor = e
+        parts.append(SPACES.sub(' ', data[cursor:].decode('utf-8', errors='replace')))
+        if lo + last < hi:
+            parts.append(ELLIPSIS)
+        return {
+            "text": ''.join(parts),
+            "byte_start": byte_start,
+            "byte_end": byte_end,
+            "matches": len(matched),
+        }
+
+    def annotate(self, hits, query, size=WINDOW, pre="**", post="**"):
+        """Add a "snippet" entry to every hit dict (in place) and return the hits."""
+        weights = self.query_weights(query)
+        for hit in hits:
+            hit["snippet"] = self.snippet(hit, query, size, pre, post, weights)
+        return hits
@@ -0,0 +1,161 @@
+"""
+Batch query scoring with SciPy sparse matrices.
+
+The corpus is held as a CSR term-by-chunk matrix of precomputed term weights
+(BM25 saturation, or log-TF for TF-IDF). A batch of queries becomes a sparse
+query-by-term matrix of idf weights, so one sparse matrix product scores every
+query against every chunk, and top-k selection is a single argpartition over
+the result rows. A narrow facet filter restricts the product to the matching
+chunk columns (the column subset is cached per filter), so filtered batches
+do less work than unfiltered ones; a filter allowing most chunks just zeroes
+the others' scores.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from .lexical import LexicalIndex, top_k_rows
+from .tokenizer import tokenize
+
+MATRIX_FILE = "batch_matrix.npz"
+
+# Column-subset matrices kept per distinct filter
+SUBSET_CACHE_SIZE = 16
+
+class BatchScorer:
+    """Scores many queries at once against a LexicalIndex's chunks."""
+
+    def __init__(self, index, matrix, weighting='bm25'):
+        if weighting not in ('bm25', 'tfidf'):
+            raise ValueError(f"unknown weighting: {weighting}")
+        self.index = index
+        self.matrix = matrix
+        self.weighting = weighting
+        self._subsets = OrderedDict()
+        df = np.asarray(index.df, dtype=np.float64)
+        if weighting == 'bm25':
+            self.idf = np.log(1 + (index.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        else:
+            self.idf = (np.log((1 + index.n_docs) / (1 + df)) + 1).astype(np.float32)
+
+    @classmethod
+    def from_index(cls, index=None, weighting='bm25'):
+        """Build the term-by-chunk weight matrix from a LexicalIndex's postings."""
+        index = index or LexicalIndex.load()
+        n_terms = len(index.terms)
+        indptr, docs, tfs = index.all_postings()
+        if weighting == 'bm25':
+            data = tfs * (index.k1 + 1) / (tfs + index.norm[docs])
+        else:
+            data = 1 + np.log(tfs)
+        indices = docs.astype(np.int32)
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_terms, index.n_docs))
+        if weighting == 'tfidf':
+            matrix = cls._normalize_columns(matrix, index)
+        return cls(index, matrix, weighting)
+
+    @staticmethod
+    def _normalize_columns(matrix, index):
+        """L2-normalise each chunk's tf-idf vector (a column of the matrix)."""
+        df = np.asarray(index.df, dtype=np.float64)
+        idf = (np.log((1 + index.n_docs) / (1 + df)) + 1).astype(np.float32)
+        weighted = sparse.diags(idf) @ matrix
+        lengths = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=0))).ravel()
+        lengths[lengths == 0] = 1
+        return (matrix @ sparse.diags(1 / lengths).astype(np.float32)).tocsr()
+
+    @staticmethod
+    def matrix_path(index, weighting):
+        """Where the weight matrix of an index is cached: its own directory, or None if it was not loaded from one."""
+        if index.index_dir is None:
+            return None
+        return Path(index.index_dir) / f"{weighting}_{MATRIX_FILE}"
+
+    def save(self, path=None):
+        """Cache the weight matrix next to the index it was built from."""
+        path = path or self.matrix_path(self.index, self.weighting)
+        if path is None:
+            raise ValueError("index was not loaded from a directory; pass a path to save the matrix")
+        sparse.save_npz(path, self.matrix, compressed=False)
+        return path
+
+    @classmethod
+    def load(cls, index=None, path=None, weighting='bm25'):
+        """Load a saved matrix, falling back to building it from the index."""
+        index = index or LexicalIndex.load()
+        path = path or cls.matrix_path(index, weighting)
+        if path is None or not Path(path).exists():
+            return cls.from_index(index, weighting)
+        return cls(index, sparse.load_npz(path).tocsr(), weighting)
+
+    def query_matrix(self, queries):
+        """Sparse query-by-term matrix of idf * query term frequency."""
+        vocab = self.index.vocab
+        rows, cols = [], []
+        for row, query in enumerate(queries):
+            ids = [vocab[t] for t in tokenize(query) if t in vocab]
+            rows.extend([row] * len(ids))
+            cols.extend(ids)
+        cols = np.asarray(cols, dtype=np.int64)
+        # Repeated (row, term) entries are summed by csr_matrix, giving the query term frequency
+        data = self.idf[cols]
+        if self.weighting == 'tfidf':
+            # Chunk columns hold normalised log-TF only, so both idf factors sit on the query side
+            data = data * self.idf[cols]
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(queries), len(self.index.terms)))
+
+    def subset(self, mask):
+        """(chunk numbers, weight matrix restricted to those columns) for a chunk mask."""
+        key = np.packbits(mask).tobytes()
+        entry = self._subsets.get(key)
+        if entry is None:
+            columns = np.flatnonzero(mask)
+            entry = (columns, self.matrix[:, columns].tocsr())
+            self._subsets[key] = entry
+            if len(self._subsets) > SUBSET_CACHE_SIZE:
+                self._subsets.popitem(last=False)
+        else:
+            self._subsets.move_to_end(key)
+        return entry
+
+    def score_batch(self, queries, matrix=None):
+        """Dense (n_queries, n_chunks) score matrix for a batch of queries."""
+        return (self.query_matrix(queries) @ (matrix if matrix is not None else self.matrix)).toarray()
+
+    def top_k_batch(self, queries, k=10, batch_size=256, mask=None):
+        """Top-k chunk numbers and scores as (n_queries, k) arrays.
+
+        Rows are sorted by descending score; slots with no matching chunk hold
+        chunk number -1 and score 0. With a boolean chunk mask only the
+        chunks it allows can be returned.
+        """
+        narrow = mask is not None and 2 * np.count_nonzero(mask) <= mask.size
+        columns, matrix = self.subset(mask) if narrow else (None, self.matrix)
+        kk = max(min(k, matrix.shape[1]), 1)
+        numbers = np.full((len(queries), kk), -1, dtype=np.int64)
+        top_scores = np.zeros((len(queries), kk), dtype=np.float32)
+        for start in range(0, len(queries), batch_size):
+            scores = self.score_batch(queries[start:start + batch_size], matrix)
+            if scores.shape[1] == 0:
+                continue
+            if mask is not None and not narrow:
+                scores *= mask
+            chunks = columns if columns is not None else np.arange(scores.shape[1])
+            # Sorted by score, ties (the k-th included) broken on chunk number as in LexicalIndex.search
+            top, values = top_k_rows(np.broadcast_to(chunks, scores.shape), scores, kk, floor=0)
+            top = top.copy()
+            top[values <= 0] = -1
+            numbers[start:start + len(scores)] = top
+            top_scores[start:start + len(scores)] = values
+        return numbers, top_scores
+
+    def search_batch(self, queries, k=10, batch_size=256, filters=None):
+        """Top-k hit dicts for every query, as LexicalIndex.search() returns them."""
+        mask = self.index.filters.mask(filters) if filters else None
+        numbers, scores = self.top_k_batch(queries, k, batch_size, mask)
+        hit = self.index.hit
+        return [[hit(int(n), float(s)) for n, s in zip(row, row_scores) if n >= 0]
+                for row, row_scores in zip(numbers.tolist(), scores.tolist())]
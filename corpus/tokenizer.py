@@ -0,0 +1,76 @@
+"""
+The one tokenizer used for indexing and for queries.
+
+Tokens are runs of word characters, normalised so that spelling variants
+found in the corpus meet on one term:
+
+- Unicode folding: NFKD, combining marks dropped, casefolded, so "Cortés",
+  "CORTÉS" and "Cortes" are all "cortes" and ligatures like "ﬁ" become "fi".
+- Dehyphenation: a word broken across a line ("Span-\\nish", or "Span- ish"
+  once chunking has joined the lines) is one token, "spanish". Suspended
+  hyphens before and/or/to ("nineteenth- and twentieth-century") are kept apart.
+- Word-boundary repair: words glued by text extraction ("Concepts
+  andStrategies", "theUnited States") are split where a lowercase run of two
+  or more letters meets a capitalised word. Punctuation glue ("bestseller,The")
+  already splits at the comma.
+
+Normalisation is memoised per raw token (LRU tables of raw token ->
+normalised pieces), so each distinct spelling is folded once per process
+and tokenizing is one regex pass plus a cache hit per token.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from itertools import chain
+
+LOWER = "a-zß-öø-ÿ"
+UPPER = "A-ZÀ-ÖØ-Þ"
+# Word characters, plus combining marks of decomposed (NFD) input
+MARKS = r"\u0300-\u036f"
+WORD = rf"\w[\w{MARKS}]*"
+# A hyphen at a line break (or the single space chunking leaves in its place)
+LINE_HYPHEN = r"-(?:[ \t]*\r?\n[ \t]*| )"
+SUSPENDED = r"(?:and|or|nor|to)\b"
+
+TOKEN = re.compile(rf"[^\W\d_][\w{MARKS}]*(?:{LINE_HYPHEN}(?!{SUSPENDED})[{LOWER}][\w{MARKS}]*)+|{WORD}")
+HYPHEN_GAP = re.compile(LINE_HYPHEN)
+GLUE = re.compile(rf"(?<=[{LOWER}]{{2}})(?=[{UPPER}][{LOWER}]{{2}})")
+
+# Distinct raw tokens remembered by normalize(); the corpus has ~20k
+TERM_CACHE_SIZE = 1 << 17
+
+def fold(text):
+    """Casefolded text with accents and compatibility forms removed."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def normalize(raw):
+    """((start, end, term), ...) for one raw TOKEN match, offsets relative to it."""
+    if '-' in raw:
+        return ((0, len(raw), fold(HYPHEN_GAP.sub('', raw))),)
+    if raw.islower() or raw.isupper():
+        return ((0, len(raw), fold(raw)),)
+    cuts = [0] + [m.start() for m in GLUE.finditer(raw)] + [len(raw)]
+    return tuple((s, e, fold(raw[s:e])) for s, e in zip(cuts, cuts[1:]))
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def terms(raw):
+    """The normalised term(s) of one raw TOKEN match."""
+    return tuple(piece[2] for piece in normalize(raw))
+
+def tokenize(text):
+    """Normalised tokens of a text (documents and queries alike)."""
+    return list(chain.from_iterable(map(terms, TOKEN.findall(text))))
+
+def token_spans(text):
+    """(start, end, term) for every token, with character offsets into text."""
+    spans = []
+    for m in TOKEN.finditer(text):
+        start = m.start()
+        for s, e, term in normalize(m.group()):
+            spans.append((start + s, start + e, term))
+    return spans
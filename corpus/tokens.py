@@ -0,0 +1,258 @@
+"""
+Tokenize-once representation of the extracted texts.
+
+build_tokens() tokenizes every file under extracted/ with the shared tokenizer
+(see corpus.tokenizer) and stores one shared vocabulary plus, per document, a
+slice of one global uint32 token-id stream and each token's byte offsets in
+its file. Along with each document it records the file's size and mtime and its
+whitespace word count (the manifest's word_count). A rebuild only
+re-tokenizes files whose size or mtime changed.
+
+Index builds, snippet offsets, the positional index, manifest word counts and
+n-gram statistics then read memory-mapped integer arrays from build/tokens
+instead of each decoding and re-tokenizing the Unicode text themselves.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import BASE_DIR, BUILD_DIR, Corpus
+from .lexical import _install_dir, _load_array, _save_array
+from .tokenizer import token_spans
+
+TOKENS_DIR = BUILD_DIR / "tokens"
+FORMAT_VERSION = 2
+
+def document_token_offsets(text, data):
+    """Tokens of a document with their (start, end) byte offsets in its UTF-8 data."""
+    spans = token_spans(text)
+    tokens = [term for _, _, term in spans]
+    chars = np.asarray([span[:2] for span in spans], dtype=np.int64).reshape(-1, 2)
+    if len(text) == len(data):
+        return tokens, chars[:, 0], chars[:, 1]
+    # Byte offset of every character: the positions of non-continuation bytes
+    raw = np.frombuffer(data, dtype=np.uint8)
+    char_byte = np.append(np.flatnonzero((raw & 0xC0) != 0x80), len(data))
+    return tokens, char_byte[chars[:, 0]], char_byte[chars[:, 1]]
+
+def byte_to_char(data, offsets):
+    """Character offsets of byte offsets into UTF-8 data (any buffer, e.g. a Document's mmap)."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size == 0 or raw.max() < 0x80:
+        return offsets
+    chars_before = np.concatenate(([0], np.cumsum((raw & 0xC0) != 0x80)))
+    return chars_before[offsets]
+
+def build_tokens(out_dir=TOKENS_DIR, base_dir=BASE_DIR):
+    """Tokenize base_dir/extracted into out_dir, reusing unchanged files from the previous build."""
+    out_dir = Path(out_dir)
+    base_dir = Path(base_dir)
+    previous = None
+    if (out_dir / "meta.json").exists():
+        previous = TokenStore.load(out_dir)
+        if previous.meta.get("format_version") != FORMAT_VERSION:
+            previous = None
+
+    vocab = {}
+    remap = None
+    docs = []
+    ids, starts, ends = [], [], []
+    reused = 0
+    for path in sorted((base_dir / "extracted").rglob("*.txt")):
+        rel = path.relative_to(base_dir)
+        doc_id = f"{rel.parts[1]}/{path.stem}" if len(rel.parts) > 2 else path.stem
+        stat = path.stat()
+        if previous is not None and previous.is_fresh(doc_id, rel.as_posix(), stat):
+            if remap is None:
+                remap = np.array([vocab.setdefault(t, len(vocab)) for t in previous.terms], dtype=np.int64)
+            doc_ids = remap[previous.tokens(doc_id)]
+            doc_starts, doc_ends = (np.array(a) for a in previous.offsets(doc_id))
+            words = previous.word_count(doc_id)
+            reused += 1
+        else:
+            data = path.read_bytes()
+            text = data.decode('utf-8', errors='replace')
+            tokens, doc_starts, doc_ends = document_token_offsets(text, data)
+            doc_ids = np.array([vocab.setdefault(t, len(vocab)) for t in tokens], dtype=np.int64)
+            words = len(text.split())
+        # doc_id, extracted path, size, mtime_ns, tokens, whitespace words
+        docs.append([doc_id, rel.as_posix(), stat.st_size, stat.st_mtime_ns, int(doc_ids.size), words])
+        ids.append(doc_ids)
+        starts.append(doc_starts)
+        ends.append(doc_ends)
+    # The old arrays are memory-mapped from out_dir, which is about to be replaced
+    previous = None
+
+    # Keep only terms that still occur, numbered alphabetically
+    all_ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+    used = np.unique(all_ids)
+    names = list(vocab)
+    terms = sorted(names[u] for u in used)
+    position = {term: i for i, term in enumerate(terms)}
+    rank = np.zeros(len(vocab), dtype=np.int64)
+    rank[used] = [position[names[u]] for u in used]
+    doc_ptr = np.zeros(len(docs) + 1, dtype=np.int64)
+    np.cumsum([d[4] for d in docs], out=doc_ptr[1:])
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    empty = np.zeros(0, dtype=np.uint32)
+    _save_array(tmp_dir, "ids", rank[all_ids].astype(np.uint32))
+    _save_array(tmp_dir, "tok_start", np.concatenate(starts).astype(np.uint32) if starts else empty)
+    _save_array(tmp_dir, "tok_end", np.concatenate(ends).astype(np.uint32) if ends else empty)
+    _save_array(tmp_dir, "doc_ptr", doc_ptr)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "n_docs": len(docs),
+        "n_terms": len(terms),
+        "n_tokens": int(all_ids.size),
+        "reused_docs": reused,
+    }
+    with open(tmp_dir / "terms.json", 'w', encoding='utf-8') as f:
+        json.dump(terms, f, ensure_ascii=False)
+    with open(tmp_dir / "docs.json", 'w', encoding='utf-8') as f:
+        json.dump(docs, f, ensure_ascii=False)
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    _install_dir(tmp_dir, out_dir)
+    return meta
+
+def load_tokens(corpus=None, store_dir=TOKENS_DIR):
+    """The token store, rebuilt first if it is missing or any extracted file changed."""
+    corpus = corpus if corpus is not None else Corpus.from_manifest()
+    store_dir = Path(store_dir)
+    if (store_dir / "meta.json").exists():
+        store = TokenStore.load(store_dir)
+        if store.meta.get("format_version") == FORMAT_VERSION and not store.stale(corpus):
+            return store
+    build_tokens(store_dir, corpus.base_dir)
+    return TokenStore.load(store_dir)
+
+class TokenStore:
+    """Read side: per-document token-id arrays over one shared vocabulary."""
+
+    ARRAYS = ("ids", "tok_start", "tok_end", "doc_ptr")
+
+    def __init__(self, arrays, terms, docs, meta, store_dir=None):
+        self.arrays = arrays
+        self.terms = terms
+        self.docs = docs
+        self.meta = meta
+        self.store_dir = store_dir
+        self.ids = arrays["ids"]
+        self.tok_start = arrays["tok_start"]
+        self.tok_end = arrays["tok_end"]
+        self.doc_ptr = arrays["doc_ptr"]
+        self.number = {d[0]: i for i, d in enumerate(docs)}
+        self.by_path = {d[1]: i for i, d in enumerate(docs)}
+        self._vocab = None
+
+    @classmethod
+    def load(cls, store_dir=TOKENS_DIR):
+        store_dir = Path(store_dir)
+        with open(store_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(store_dir / "terms.json", 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        with open(store_dir / "docs.json", 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+        arrays = {name: _load_array(store_dir, name) for name in cls.ARRAYS}
+        return cls(arrays, terms, docs, meta, store_dir)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.number
+
+    @property
+    def vocab(self):
+        if self._vocab is None:
+            self._vocab = {term: i for i, term in enumerate(self.terms)}
+        return self._vocab
+
+    def token_range(self, doc_id):
+        """(first, end) positions of a document's tokens in the global stream."""
+        d = self.number[doc_id]
+        return int(self.doc_ptr[d]), int(self.doc_ptr[d + 1])
+
+    def tokens(self, doc_id):
+        """A document's token ids (a view into the memory-mapped stream)."""
+        first, end = self.token_range(doc_id)
+        return self.ids[first:end]
+
+    def offsets(self, doc_id):
+        """(start, end) byte offsets of a document's tokens in its extracted file."""
+        first, end = self.token_range(doc_id)
+        return self.tok_start[first:end], self.tok_end[first:end]
+
+    def word_count(self, doc_id):
+        """Whitespace-separated words in the document, as the manifest counts them."""
+        return self.docs[self.number[doc_id]][5]
+
+    def is_fresh(self, doc_id, extracted_path, stat):
+        """Whether the stored tokens still describe a file with this os.stat() result."""
+        d = self.number.get(doc_id)
+        if d is None:
+            return False
+        _, path, size, mtime_ns, _, _ = self.docs[d]
+        return path == extracted_path and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+    def word_count_for(self, path, base_dir=BASE_DIR):
+        """Stored word count of an extracted file, or None if it is not stored or has changed."""
+        path = Path(path)
+        try:
+            rel = path.resolve().relative_to(Path(base_dir).resolve()).as_posix()
+        except ValueError:
+            return None
+        d = self.by_path.get(rel)
+        if d is None or not self.is_fresh(self.docs[d][0], rel, path.stat()):
+            return None
+        return self.docs[d][5]
+
+    def stale(self, corpus):
+        """doc_ids of the corpus's extracted documents that are missing or out of date here."""
+        out = []
+        for doc in corpus.documents():
+            if not doc.path.exists():
+                continue
+            if not self.is_fresh(doc.doc_id, doc.extracted_path, doc.path.stat()):
+                out.append(doc.doc_id)
+        return out
+
+    def lookup(self, vocab, missing):
+        """Array mapping this store's term ids to ids in another {term: id} vocabulary."""
+        return np.array([vocab.get(t, missing) for t in self.terms], dtype=np.int64)
+
+    def ngram_counts(self, n, doc_ids=None):
+        """(grams, counts): every distinct run of n token ids within one document and its count."""
+        doc_ids = doc_ids if doc_ids is not None else [d[0] for d in self.docs]
+        windows = [np.lib.stride_tricks.sliding_window_view(self.tokens(doc_id), n)
+                   for doc_id in doc_ids if self.token_range(doc_id)[1] - self.token_range(doc_id)[0] >= n]
+        if not windows:
+            return np.zeros((0, n), dtype=np.uint32), np.zeros(0, dtype=np.int64)
+        windows = np.concatenate(windows)
+        size = max(len(self.terms), 1)
+        if size ** n >= 2 ** 63:
+            return np.unique(windows, axis=0, return_counts=True)
+        # Pack each n-gram into one integer so counting is a flat sort
+        keys = np.zeros(len(windows), dtype=np.int64)
+        for i in range(n):
+            keys = keys * size + windows[:, i]
+        keys, counts = np.unique(keys, return_counts=True)
+        grams = np.empty((keys.size, n), dtype=np.uint32)
+        for i in range(n - 1, -1, -1):
+            keys, grams[:, i] = np.divmod(keys, size)
+        return grams, counts
+
+    def top_ngrams(self, n, k=20, doc_ids=None):
+        """The k most frequent n-grams as (tuple of terms, count)."""
+        grams, counts = self.ngram_counts(n, doc_ids)
+        order = np.argsort(-counts, kind='stable')[:k]
+        return [(tuple(self.terms[t] for t in grams[i]), int(counts[i])) for i in order]
@@ -0,0 +1,313 @@
+"""
+Dense vector store for chunk embeddings.
+
+Embeddings are written as one raw row-major matrix (float16, or int8 with a
+float32 scale per row) plus a JSON table mapping each row back to its chunk
+and manifest item. Loading is an np.memmap of that file, and exact top-k
+search is a batched matrix product over it.
+
+The embedder is any callable mapping a list of strings to a (n, dim) float
+array. HashingEmbedder is the offline default: signed feature hashing of
+words and word bigrams, which is a random projection of the bag-of-words and
+needs no model download.
+"""
+
+import importlib
+import json
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .documents import BUILD_DIR
+from .lexical import _install_dir, _remove_dir, top_k_rows
+from .tokenizer import tokenize
+
+VECTOR_DIR = BUILD_DIR / "vectors"
+DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# float16 -> float32 conversion has no SIMD path on many CPUs and dominates a
+# scan, so stores up to this size keep a float32 working copy after first use
+FLOAT32_CACHE_BYTES = 256 * 1024 * 1024
+HASHING_ID = re.compile(r"hashing-d(\d+)-s(\d+)-(bi|uni)-v2")
+
+class HashingEmbedder:
+    """Signed feature hashing of unigrams and bigrams into `dim` buckets, L2-normalised."""
+
+    def __init__(self, dim=256, seed=0, bigrams=True):
+        self.dim = dim
+        self.seed = seed
+        self.bigrams = bigrams
+        self.embedder_id = f"hashing-d{dim}-s{seed}-{'bi' if bigrams else 'uni'}-v2"
+        self._cache = {}
+
+    @classmethod
+    def from_id(cls, embedder_id):
+        """The HashingEmbedder an embedder_id was made by, or None if the id is not one of this version's."""
+        match = HASHING_ID.fullmatch(str(embedder_id or ""))
+        if match is None:
+            return None
+        return cls(dim=int(match[1]), seed=int(match[2]), bigrams=match[3] == "bi")
+
+    def _bucket(self, feature):
+        slot = self._cache.get(feature)
+        if slot is None:
+            h = zlib.crc32(feature.encode('utf-8'), self.seed)
+            slot = (h % self.dim, 1.0 if (h >> 31) & 1 else -1.0)
+            if len(self._cache) < 500_000:
+                self._cache[feature] = slot
+        return slot
+
+    def __call__(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens
+            if self.bigrams:
+                features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            vec = out[row]
+            for feature in features:
+                bucket, sign = self._bucket(feature)
+                vec[bucket] += sign
+        # Sublinear term weighting, then unit length so dot product = cosine
+        np.copysign(np.log1p(np.abs(out)), out, out=out)
+        lengths = np.linalg.norm(out, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        return out / lengths
+
+def load_embedder(spec=None):
+    """Instantiate an embedder from "package.module:callable" (HashingEmbedder by default)."""
+    if not spec:
+        return HashingEmbedder()
+    module_name, _, attr = spec.partition(':')
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+def embedder_id(embedder):
+    return getattr(embedder, "embedder_id", None) or getattr(embedder, "__name__", type(embedder).__name__)
+
+def quantize_int8(vectors):
+    """Symmetric per-row int8 quantisation; returns (codes, scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_vector_store(rows, out_dir=VECTOR_DIR, dtype="float16", embedder_name=None,
+                       manifest_generated_at=None):
+    """Write (chunk, vector) batches to a vector store directory.
+
+    rows yields (list of chunk dicts, float32 array) pairs; the matrix is
+    appended to disk batch by batch, so memory holds one batch at a time.
+    The store is written to a sibling .tmp directory and swapped in whole.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"unsupported vector dtype: {dtype}")
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        _remove_dir(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    data_path = tmp_dir / f"vectors.{dtype}"
+    scales_path = tmp_dir / "scales.f32"
+    ids = []
+    dim = None
+    with open(data_path, 'wb') as data_file, open(scales_path, 'wb') as scales_file:
+        for chunks, vectors in rows:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if dim is None:
+                dim = vectors.shape[1]
+            elif vectors.shape[1] != dim:
+                raise ValueError(f"embedding width changed from {dim} to {vectors.shape[1]}")
+            if dtype == "int8":
+                codes, scales = quantize_int8(vectors)
+                data_file.write(codes.tobytes())
+                scales_file.write(scales.tobytes())
+            else:
+                data_file.write(vectors.astype(np.float16).tobytes())
+            for chunk in chunks:
+                ids.append([chunk["chunk_id"], chunk["doc_id"], chunk.get("page"),
+                            chunk.get("byte_start"), chunk.get("byte_end")])
+
+    meta = {
+        "built_at": datetime.now().isoformat(),
+        "manifest_generated_at": manifest_generated_at,
+        "embedder_id": embedder_name,
+        "dtype": dtype,
+        "dim": dim or 0,
+        "count": len(ids),
+    }
+    with open(tmp_dir / "ids.json", 'w', encoding='utf-8') as f:
+        json.dump(ids, f)
+    if dtype != "int8":
+        scales_path.unlink()
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    _install_dir(tmp_dir, out_dir)
+    return meta
+
+def build_vector_store(chunks, embedder=None, out_dir=VECTOR_DIR, dtype="float16", batch_size=256,
+                       manifest_generated_at=None):
+    """Embed a stream of chunk dicts and write the vector store."""
+    embedder = embedder or HashingEmbedder()
+    rows = ((batch, embedder([c["text"] for c in batch])) for batch in _batches(chunks, batch_size))
+    return write_vector_store(rows, out_dir, dtype, embedder_id(embedder), manifest_generated_at)
+
+def store_embedder(meta, embedder=None):
+    """The embedder to query a store with: the given one (checked against the
+    store's embedder_id and width) or, for hashing stores, the HashingEmbedder
+    their embedder_id names."""
+    if embedder is None:
+        embedder = HashingEmbedder.from_id(meta.get("embedder_id"))
+    if embedder is not None and embedder_id(embedder) != meta.get("embedder_id"):
+        raise ValueError(f"store was built with {meta.get('embedder_id')}, not {embedder_id(embedder)}")
+    dim = getattr(embedder, "dim", None)
+    if dim is not None and meta.get("dim") and dim != meta["dim"]:
+        raise ValueError(f"store holds {meta['dim']}-wide vectors, {embedder_id(embedder)} makes {dim}")
+    return embedder
+
+class VectorStore:
+    """Read side: memory-mapped embedding matrix with exact top-k search."""
+
+    def __init__(self, vectors, ids, meta, scales=None, embedder=None, store_dir=None):
+        self.vectors = vectors
+        self.ids = ids
+        self.meta = meta
+        self.scales = scales
+        self.embedder = embedder
+        self.dim = meta["dim"]
+        self.store_dir = store_dir
+        self._float32 = None
+        self._filters = None
+
+    @classmethod
+    def load(cls, store_dir=VECTOR_DIR, embedder=None):
+        store_dir = Path(store_dir)
+        with open(store_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(store_dir / "ids.json", 'r', encoding='utf-8') as f:
+            ids = json.load(f)
+        dtype = meta["dtype"]
+        shape = (meta["count"], meta["dim"])
+        if meta["count"]:
+            vectors = np.memmap(store_dir / f"vectors.{dtype}", dtype=DTYPES[dtype], mode='r', shape=shape)
+        else:
+            vectors = np.zeros(shape, dtype=DTYPES[dtype])
+        scales = None
+        if dtype == "int8" and meta["count"]:
+            scales = np.memmap(store_dir / "scales.f32", dtype=np.float32, mode='r', shape=(meta["count"],))
+        return cls(vectors, ids, meta, scales, store_embedder(meta, embedder), store_dir)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def filters(self):
+        """FilterIndex of facet bitsets over the stored rows (see corpus.filters)."""
+        if self._filters is None:
+            from .filters import FilterIndex
+            self._filters = FilterIndex.load(self.store_dir, [entry[1] for entry in self.ids],
+                                             self.meta.get("built_at"))
+        return self._filters
+
+    def embed(self, texts):
+        if self.embedder is None:
+            raise ValueError("no embedder configured for this store; pass one to VectorStore.load()")
+        return np.asarray(self.embedder(texts), dtype=np.float32)
+
+    def rows_float32(self, start, end):
+        if self._float32 is None and self.scales is None and self.vectors.nbytes * 2 <= FLOAT32_CACHE_BYTES:
+            self._float32 = np.asarray(self.vectors, dtype=np.float32)
+        if self._float32 is not None:
+            return self._float32[start:end]
+        return np.asarray(self.vectors[start:end], dtype=np.float32)
+
+    def score_rows(self, start, end, queries):
+        """Scores of rows [start, end) against (n_queries, dim) float32 queries."""
+        block = self.rows_float32(start, end)
+        scores = block @ queries.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[start:end])[:, None]
+        return scores
+
+    def score_selected(self, rows, queries):
+        """Scores of the given row numbers against (n_queries, dim) float32 queries."""
+        # Fills the float32 working copy when the store is small enough to keep one
+        self.rows_float32(0, 0)
+        source = self._float32 if self._float32 is not None else self.vectors
+        scores = np.asarray(source[rows], dtype=np.float32) @ queries.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[rows])[:, None]
+        return scores
+
+    def top_k(self, queries, k=10, block_rows=65536, mask=None):
+        """Exact top-k row numbers and scores for (n_queries, dim) query vectors.
+
+        Rows are scored block_rows at a time so the float32 working copy stays
+        bounded regardless of store size. With a boolean row mask only the
+        rows it allows are scored; a mask allowing most rows is cheaper to
+        apply to the scores (as -inf) than to gather the rows, and rows it
+        excludes can then only come back when fewer than k rows are allowed.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        selected = np.flatnonzero(mask) if mask is not None else None
+        if selected is not None and 2 * selected.size > len(self.ids):
+            selected = None
+        else:
+            mask = None
+        n = len(self.ids) if selected is None else selected.size
+        kk = min(k, n)
+        best_rows = np.zeros((queries.shape[0], 0), dtype=np.int64)
+        best_scores = np.zeros((queries.shape[0], 0), dtype=np.float32)
+        for start in range(0, n, block_rows):
+            end = min(start + block_rows, n)
+            if selected is None:
+                scores = self.score_rows(start, end, queries).T
+                if mask is not None:
+                    scores[:, ~mask[start:end]] = -np.inf
+                rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            else:
+                scores = self.score_selected(selected[start:end], queries).T
+                rows = np.broadcast_to(selected[start:end], scores.shape)
+            scores = np.concatenate((best_scores, scores), axis=1)
+            rows = np.concatenate((best_rows, rows), axis=1)
+            # Ties at the k-th score go to the lower row number, so the result does not depend on block_rows
+            best_rows, best_scores = top_k_rows(rows, scores, kk)
+        return best_rows, best_scores
+
+    def hit(self, row, score):
+        chunk_id, doc_id, page, byte_start, byte_end = self.ids[row]
+        return {
+            "chunk_id": chunk_id,
+            "doc_id": doc_id,
+            "page": page,
+            "byte_start": byte_start,
+            "byte_end": byte_end,
+            "score": score,
+        }
+
+    def search_vectors(self, queries, k=10, filters=None):
+        mask = self.filters.mask(filters) if filters else None
+        rows, scores = self.top_k(queries, k, mask=mask)
+        return [[self.hit(int(r), float(s)) for r, s in zip(row, row_scores) if s != -np.inf]
+                for row, row_scores in zip(rows.tolist(), scores.tolist())]
+
+    def search_batch(self, texts, k=10, filters=None):
+        """Top-k hits for each query string."""
+        return self.search_vectors(self.embed(texts), k, filters)
+
+    def search(self, query, k=10, filters=None):
+        """Top-k hits for one query string."""
+        return self.search_batch([query], k, filters)[0]
@@ -0,0 +1,180 @@
+"""
+Integrity checks between sources/, extracted/, metadata/ and manifest.json.
+
+verify_corpus() walks the manifest and the three directories and returns
+findings, each {"check", "level", "doc_id", "path", "detail"}:
+
+- source mismatch (error): a source file's size or MD5 differs from the
+  source_md5 / source_size_bytes its sidecar recorded at download time.
+- stale extraction (error): the extracted text was made from a different
+  version of its source (the source_md5 recorded under "extraction").
+- missing extraction (error): the manifest lists extracted text that is not
+  there.
+- bad sidecar (error): a sidecar is not valid JSON.
+- missing source / missing sidecar (warning): a source file the manifest
+  names, or a downloaded item's source file or sidecar, is absent.
+- word_count drift (warning): the manifest's or the sidecar's word_count no
+  longer matches the extracted text.
+- orphan (warning): a file under sources/, extracted/ or metadata/ that no
+  manifest item refers to.
+
+Every source file is hashed with MD5 (the sidecars' algorithm) on parallel
+threads in large reads. Digests are cached in build/verify/md5.json and
+reused while a file's size and mtime are unchanged, so re-verifying an
+unchanged tree reads no source bytes.
+"""
+
+import json
+import time
+from pathlib import Path
+
+from .documents import BASE_DIR, BUILD_DIR, Document, load_manifest, normalize_path
+from .pipeline import HashCache
+from .tokens import TOKENS_DIR, TokenStore
+
+VERIFY_DIR = BUILD_DIR / "verify"
+CACHE_PATH = VERIFY_DIR / "md5.json"
+FORMAT_VERSION = 1
+
+ERROR = "error"
+WARNING = "warning"
+CHECKS = {
+    "source mismatch": ERROR,
+    "stale extraction": ERROR,
+    "missing extraction": ERROR,
+    "bad sidecar": ERROR,
+    "missing source": WARNING,
+    "missing sidecar": WARNING,
+    "word_count drift": WARNING,
+    "orphan": WARNING,
+}
+CORPUS_DIRS = ("sources", "extracted", "metadata")
+
+def load_hash_cache(path=CACHE_PATH, base_dir=BASE_DIR):
+    """MD5 HashCache with the digests saved by the last run (empty if none or outdated)."""
+    entries = None
+    if path is not None and path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get("format_version") == FORMAT_VERSION:
+            entries = saved["hashes"]
+    return HashCache(entries, algorithm="md5", base_dir=base_dir)
+
+def save_hash_cache(cache, path=CACHE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"format_version": FORMAT_VERSION, "hashes": cache.entries}, f)
+    tmp.replace(path)
+
+def corpus_files(base_dir, top):
+    """Relative POSIX paths of every file under base_dir/top (dotfiles skipped)."""
+    root = Path(base_dir) / top
+    if not root.exists():
+        return []
+    return sorted(p.relative_to(base_dir).as_posix() for p in root.rglob("*")
+                  if p.is_file() and not p.name.startswith("."))
+
+def sidecar_word_count(sidecar):
+    """Word count a sidecar records: extraction.word_count, else file_info.word_count."""
+    words = sidecar.get("extraction", {}).get("word_count")
+    if words is None:
+        words = sidecar.get("file_info", {}).get("word_count")
+    return words
+
+def verify_corpus(manifest=None, base_dir=BASE_DIR, cache=None, workers=None, tokens=None):
+    """Check the corpus and return {"findings", "counts", "errors", "warnings", "files", "hashed", "cached", "seconds"}."""
+    start = time.perf_counter()
+    base_dir = Path(base_dir)
+    manifest = manifest if manifest is not None else load_manifest(base_dir / "manifest.json")
+    cache = cache if cache is not None else HashCache(algorithm="md5", base_dir=base_dir)
+    if tokens is None and (TOKENS_DIR / "meta.json").exists() and base_dir == BASE_DIR:
+        tokens = TokenStore.load(TOKENS_DIR)
+    hits, misses = cache.hits, cache.misses
+
+    findings = []
+
+    def report(check, path, detail, doc_id=None):
+        findings.append({"check": check, "level": CHECKS[check], "doc_id": doc_id, "path": path, "detail": detail})
+
+    files = {top: corpus_files(base_dir, top) for top in CORPUS_DIRS}
+    digests = cache.digest_many(files["sources"], workers)
+    referenced = set()
+
+    for item in manifest["items"]:
+        doc_id = Document(item, base_dir).doc_id
+        source = normalize_path(item.get("source_path"))
+        extracted = normalize_path(item.get("extracted_path"))
+        meta_path = normalize_path(item.get("metadata_path"))
+        referenced.update(p for p in (source, extracted, meta_path) if p)
+        downloaded = item.get("download_status") == "downloaded"
+
+        sidecar = None
+        if meta_path:
+            try:
+                with open(base_dir / meta_path, 'r', encoding='utf-8') as f:
+                    sidecar = json.load(f)
+            except FileNotFoundError:
+                report("missing sidecar", meta_path, "listed in manifest.json but missing", doc_id)
+            except ValueError as e:
+                report("bad sidecar", meta_path, f"unreadable: {e}", doc_id)
+        elif downloaded:
+            report("missing sidecar", source or extracted, "downloaded item has no metadata sidecar", doc_id)
+
+        source_exists = bool(source) and (base_dir / source).exists()
+        if (source and not source_exists) or (downloaded and not source):
+            recorded = " (its sidecar records source_md5)" if (sidecar or {}).get("file_info", {}).get("source_md5") else ""
+            state = "downloaded source file" if downloaded else "source file named in manifest.json"
+            report("missing source", source, f"{state} is missing{recorded}", doc_id)
+        elif source_exists and sidecar:
+            digest = digests.get(source) or cache.digest(source)
+            file_info = sidecar.get("file_info", {})
+            recorded_size = file_info.get("source_size_bytes")
+            size = (base_dir / source).stat().st_size
+            if recorded_size is not None and recorded_size != size:
+                report("source mismatch", source, f"{size:,} bytes, sidecar recorded {recorded_size:,}", doc_id)
+            elif file_info.get("source_md5") and file_info["source_md5"] != digest:
+                report("source mismatch", source, f"md5 {digest}, sidecar recorded {file_info['source_md5']}", doc_id)
+            extracted_from = sidecar.get("extraction", {}).get("source_md5")
+            if extracted_from and extracted_from != digest:
+                report("stale extraction", extracted or source,
+                       f"extracted from a different version of {source} (md5 {extracted_from})", doc_id)
+
+        if extracted:
+            path = base_dir / extracted
+            if not path.exists():
+                report("missing extraction", extracted, "listed in manifest.json but missing", doc_id)
+                continue
+            words = tokens.word_count_for(path, base_dir) if tokens is not None else None
+            if words is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    words = len(f.read().split())
+            if item.get("word_count") is not None and item["word_count"] != words:
+                report("word_count drift", extracted, f"{words:,} words, manifest.json says {item['word_count']:,}",
+                       doc_id)
+            recorded = sidecar_word_count(sidecar) if sidecar else None
+            if recorded is not None and recorded != words:
+                report("word_count drift", meta_path, f"sidecar says {recorded:,} words, text has {words:,}", doc_id)
+        elif item.get("extraction_status") in ("completed", "placeholder"):
+            report("missing extraction", source, f"extraction_status is {item['extraction_status']} but no "
+                   "extracted_path", doc_id)
+
+    for top in CORPUS_DIRS:
+        for rel in files[top]:
+            if rel not in referenced:
+                report("orphan", rel, "not referenced by manifest.json")
+
+    findings.sort(key=lambda f: (f["level"] != ERROR, f["check"], f["path"] or ""))
+    counts = {}
+    for finding in findings:
+        counts[finding["check"]] = counts.get(finding["check"], 0) + 1
+    return {
+        "findings": findings,
+        "counts": counts,
+        "errors": sum(1 for f in findings if f["level"] == ERROR),
+        "warnings": sum(1 for f in findings if f["level"] == WARNING),
+        "files": sum(len(rels) for rels in files.values()),
+        "hashed": cache.misses - misses,
+        "cached": cache.hits - hits,
+        "seconds": time.perf_counter() - start,
+    }
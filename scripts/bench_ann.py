@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the IVF index against exact vector search.
+
+For each nprobe setting, reports mean/p95 query latency, the share of
+vectors scanned and recall@k against the exact top-k. --scale N builds a
+temporary store with the corpus vectors repeated N times (each copy slightly
+jittered so copies are distinct neighbours) to see how latency grows with
+corpus size.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.ann import IVFIndex, build_ivf
+from corpus.vectors import VECTOR_DIR, VectorStore, write_vector_store
+
+from bench_batch import sample_queries
+from bench_pruning import DEFAULT_QUERIES
+
+def scaled_rows(store, scale, noise, seed=0, batch_rows=4096):
+    """(chunks, vectors) batches of the store repeated `scale` times with Gaussian jitter."""
+    rng = np.random.default_rng(seed)
+    keys = ("chunk_id", "doc_id", "page", "byte_start", "byte_end")
+    for copy in range(scale):
+        for start in range(0, len(store), batch_rows):
+            vectors = np.asarray(store.vectors[start:start + batch_rows], dtype=np.float32)
+            if store.scales is not None:
+                vectors *= np.asarray(store.scales[start:start + batch_rows])[:, None]
+            chunks = [dict(zip(keys, row)) for row in store.ids[start:start + batch_rows]]
+            if copy:
+                vectors = vectors + rng.normal(0, noise / np.sqrt(store.dim), vectors.shape)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                chunks = [dict(c, chunk_id=f"{c['chunk_id']}-{copy}") for c in chunks]
+            yield chunks, vectors
+
+def timed(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run(store, ivf, queries, k, nprobes):
+    vectors = store.embed(queries)
+    exact_rows, _ = store.top_k(vectors, k)
+    exact_ms = [t for q in vectors for t in timed(lambda: store.top_k(q, k), 3)]
+    exact_ms.sort()
+    results = {"exact": {"mean_ms": statistics.fmean(exact_ms), "p95_ms": exact_ms[int(0.95 * (len(exact_ms) - 1))],
+                         "scanned": 1.0, "recall": 1.0}}
+    for nprobe in nprobes:
+        stats = {}
+        rows, _ = ivf.top_k(vectors, k, nprobe, stats)
+        recall = statistics.fmean(len(set(a) & set(b)) / len(a) for a, b in zip(exact_rows.tolist(), rows.tolist()))
+        latencies = sorted(t for q in vectors for t in timed(lambda: ivf.top_k(q, k, nprobe), 3))
+        results[f"nprobe={nprobe}"] = {
+            "mean_ms": statistics.fmean(latencies),
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+            "scanned": stats["vectors_scanned"] / stats["vectors_total"],
+            "recall": recall,
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('-n', type=int, default=200, help="Number of queries")
+    parser.add_argument('--nprobe', default="1,2,4,8,16,32", help="Comma-separated nprobe values")
+    parser.add_argument('--scale', type=int, default=1, help="Repeat the corpus N times (temporary store)")
+    parser.add_argument('--noise', type=float, default=0.3, help="Jitter applied to repeated copies")
+    parser.add_argument('--vectors', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--json', type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    queries = (DEFAULT_QUERIES + sample_queries(args.n))[:args.n]
+    nprobes = [int(p) for p in args.nprobe.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore.load(args.vectors)
+        if args.scale > 1:
+            write_vector_store(scaled_rows(store, args.scale, args.noise), Path(tmp) / "vectors",
+                               store.meta["dtype"], store.meta["embedder_id"])
+            store = VectorStore.load(Path(tmp) / "vectors")
+        start = time.perf_counter()
+        meta = build_ivf(store, Path(tmp) / "ivf")
+        build_s = time.perf_counter() - start
+        ivf = IVFIndex.load(Path(tmp) / "ivf", store)
+        results = run(store, ivf, queries, args.k, nprobes)
+
+    print(f"{len(store):,} vectors, {meta['n_lists']} cells (built in {build_s:.2f}s), "
+          f"{len(queries)} queries, k={args.k}\n")
+    print(f"{'search':<14}{'mean ms':>10}{'p95 ms':>10}{'speedup':>10}{'scanned':>10}{'recall':>10}")
+    base = results["exact"]["mean_ms"]
+    for name, r in results.items():
+        print(f"{name:<14}{r['mean_ms']:>10.3f}{r['p95_ms']:>10.3f}{base / r['mean_ms']:>9.1f}x"
+              f"{r['scanned']:>10.1%}{r['recall']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"n_vectors": len(store), "n_lists": meta["n_lists"], "k": args.k,
+                       "scale": args.scale, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
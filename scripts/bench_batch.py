@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compare batched sparse-matrix scoring with one-query-at-a-time BM25 search.
+
+Queries are the pruning benchmark set plus synthetic ones sampled from chunk
+text. Reports throughput for both paths and checks they agree on the top-k.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.chunking import CHUNKS_PATH, read_chunks
+from corpus.lexical import INDEX_DIR, LexicalIndex
+from corpus.sparse import BatchScorer
+
+from bench_pruning import DEFAULT_QUERIES
+
+def sample_queries(n, seed=0):
+    """Synthetic queries: short word runs taken from random chunks."""
+    rng = random.Random(seed)
+    texts = [c["text"].split() for c in read_chunks(CHUNKS_PATH)]
+    texts = [t for t in texts if len(t) >= 8]
+    queries = []
+    while len(queries) < n:
+        words = rng.choice(texts)
+        length = rng.randint(2, 6)
+        start = rng.randrange(len(words) - length)
+        queries.append(' '.join(words[start:start + length]))
+    return queries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=500, help="Number of queries")
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--index', type=Path, default=INDEX_DIR)
+    args = parser.parse_args()
+
+    index = LexicalIndex.load(args.index)
+    queries = (DEFAULT_QUERIES + sample_queries(args.n))[:args.n]
+
+    start = time.perf_counter()
+    scorer = BatchScorer.from_index(index)
+    build_s = time.perf_counter() - start
+
+    # Top-k selection alone (chunk numbers and scores), one query at a time vs batched
+    start = time.perf_counter()
+    for q in queries:
+        scores = index.score(q)
+        top = np.argpartition(-scores, args.k - 1)[:args.k]
+        top[np.argsort(-scores[top])]
+    single_topk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer.top_k_batch(queries, args.k, args.batch_size)
+    batch_topk_s = time.perf_counter() - start
+
+    # End to end, including building the hit dicts
+    start = time.perf_counter()
+    single = [index.search(q, args.k) for q in queries]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = scorer.search_batch(queries, args.k, args.batch_size)
+    batch_s = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for a, b in zip(single, batched)
+        if len(a) != len(b) or any(abs(x["score"] - y["score"]) > 1e-3 for x, y in zip(a, b))
+    )
+
+    print(f"{index.n_docs:,} chunks x {len(index.terms):,} terms, {len(queries)} queries, k={args.k}")
+    print(f"Matrix build:      {build_s * 1000:8.1f} ms ({scorer.matrix.nnz:,} non-zeros)")
+    print(f"{'':19}{'per-query q/s':>15}{'batched q/s':>15}{'speedup':>10}")
+    for label, one, many in (("Top-k scoring", single_topk_s, batch_topk_s), ("With hit dicts", single_s, batch_s)):
+        print(f"{label:19}{len(queries) / one:>15,.0f}{len(queries) / many:>15,.0f}{one / many:>9.1f}x")
+    print(f"Top-k mismatches:  {mismatches}")
+
+if __name__ == "__main__":
+    main()
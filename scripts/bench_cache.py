@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Size the query result cache by replaying a skewed query stream.
+
+Queries are drawn from the benchmark set plus synthetic ones with Zipf-like
+popularity (a few questions asked over and over, a long tail asked once), and
+replayed through CachedSearcher at several cache sizes. Reports hit rate,
+cache memory and mean latency for each size.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.cache import CachedSearcher, DataVersion, QueryCache
+from corpus.hybrid import HybridSearcher
+from corpus.lexical import INDEX_DIR, LexicalIndex
+from corpus.vectors import VECTOR_DIR
+
+from bench_batch import sample_queries
+from bench_pruning import DEFAULT_QUERIES
+
+def query_stream(n, distinct, skew, seed=0):
+    pool = (DEFAULT_QUERIES + sample_queries(distinct, seed))[:distinct]
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(pool) + 1) ** skew
+    picks = rng.choice(len(pool), n, p=weights / weights.sum())
+    return [pool[i] for i in picks]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=5000, help="Queries to replay")
+    parser.add_argument('--distinct', type=int, default=2000, help="Distinct queries in the pool")
+    parser.add_argument('--skew', type=float, default=1.0, help="Zipf exponent of query popularity")
+    parser.add_argument('--sizes', default="16,64,256,1024", help="Comma-separated cache sizes (entries)")
+    parser.add_argument('--method', choices=['lexical', 'hybrid'], default='lexical')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--json', type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    if args.method == 'hybrid':
+        searcher = HybridSearcher()
+        meta_paths = [INDEX_DIR / "meta.json", VECTOR_DIR / "meta.json"]
+    else:
+        searcher = LexicalIndex.load()
+        meta_paths = [INDEX_DIR / "meta.json"]
+    stream = query_stream(args.n, args.distinct, args.skew)
+
+    start = time.perf_counter()
+    for q in stream:
+        searcher.search(q, args.k)
+    uncached_ms = (time.perf_counter() - start) * 1000 / len(stream)
+
+    print(f"{len(stream):,} queries ({len(set(stream)):,} distinct, skew {args.skew}), "
+          f"{args.method}, uncached {uncached_ms:.3f} ms/query\n")
+    print(f"{'entries':>8}{'hit rate':>10}{'memory':>12}{'ms/query':>10}{'speedup':>10}")
+    results = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        cached = CachedSearcher(searcher, QueryCache(max_entries=size), DataVersion(meta_paths))
+        start = time.perf_counter()
+        for q in stream:
+            cached.search(q, args.k)
+        ms = (time.perf_counter() - start) * 1000 / len(stream)
+        stats = cached.cache.stats()
+        results.append(dict(stats, max_entries=size, ms_per_query=ms))
+        print(f"{size:>8,}{stats['hit_rate']:>10.1%}{stats['bytes'] / 1024:>10,.0f}KB{ms:>10.3f}{uncached_ms / ms:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"queries": len(stream), "uncached_ms": uncached_ms, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark facet-filtered BM25 retrieval against unfiltered and post-filtered search.
+
+For each filter, every method runs three ways: unfiltered, post-filtered
+(search a list POST_FILTER_DEPTH times deeper, then drop non-matching chunks,
+as a caller without filter support would) and filtered inside the scorer.
+Reports mean latency and how full the top-k comes back, and checks that the
+in-scorer results match exhaustive scores with the filter applied. --scale N
+builds a temporary index with the chunks repeated N times.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.chunking import CHUNKS_PATH
+from corpus.filters import FilterIndex
+from corpus.lexical import INDEX_DIR, LexicalIndex, build_index
+from corpus.sparse import BatchScorer
+
+from bench_pruning import DEFAULT_QUERIES, METHODS, scaled_chunks
+
+FILTERS = [
+    {"is_placeholder": False},
+    {"max_year": 1989},
+    {"series": "diversity_speech"},
+    {"series": "renewing_diversity"},
+]
+
+# How much deeper the post-filtered baseline searches before dropping chunks
+POST_FILTER_DEPTH = 5
+
+def mean_ms(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, statistics.fmean(latencies)
+
+def run(index, scorer, queries, spec, k, repeats):
+    mask = index.filters.mask(spec)
+    number = {d[0]: i for i, d in enumerate(index.docs)}
+    references = {}
+    for q in queries:
+        scores = index.score(q)
+        scores[~mask] = 0
+        references[q] = index.hits_from_scores(scores, k)
+
+    results = {}
+    for method in METHODS + ['batch']:
+        if method == 'batch':
+            search = lambda q, depth, filters=None: scorer.search_batch([q], depth, filters=filters)[0]
+        else:
+            search = lambda q, depth, filters=None, m=method: index.search(q, depth, method=m, filters=filters)
+        post_filter = lambda q: [h for h in search(q, k * POST_FILTER_DEPTH) if mask[number[h["chunk_id"]]]][:k]
+
+        totals = dict.fromkeys(("unfiltered", "post_filter", "filtered", "post_fill", "fill"), 0.0)
+        mismatches = 0
+        for q in queries:
+            totals["unfiltered"] += mean_ms(lambda: search(q, k), repeats)[1]
+            hits, ms = mean_ms(lambda: post_filter(q), repeats)
+            totals["post_filter"] += ms
+            totals["post_fill"] += len(hits)
+            hits, ms = mean_ms(lambda: search(q, k, spec), repeats)
+            totals["filtered"] += ms
+            totals["fill"] += len(hits)
+            reference = references[q]
+            if len(reference) != len(hits) or any(abs(a["score"] - b["score"]) > 1e-3
+                                                  for a, b in zip(reference, hits)):
+                mismatches += 1
+        n = len(queries)
+        results[method] = {
+            "unfiltered_ms": totals["unfiltered"] / n,
+            "post_filter_ms": totals["post_filter"] / n,
+            "filtered_ms": totals["filtered"] / n,
+            # Share of the k slots filled, relative to what the filter can return at all
+            "post_filter_fill": totals["post_fill"] / max(sum(len(r) for r in references.values()), 1),
+            "mismatched_queries": mismatches,
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--scale', type=int, default=1, help="Repeat the corpus N times (temporary index)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.scale > 1:
+            index_dir = Path(tmp) / "lexical"
+            build_index(scaled_chunks(CHUNKS_PATH, args.scale), index_dir)
+        else:
+            index_dir = INDEX_DIR
+        index = LexicalIndex.load(index_dir)
+        if args.scale > 1:
+            index._filters = FilterIndex.build([d[1] for d in index.docs])
+        scorer = BatchScorer.from_index(index)
+
+        print(f"{index.n_docs:,} chunks, {len(DEFAULT_QUERIES)} queries, k={args.k}")
+        for spec in FILTERS:
+            results = run(index, scorer, DEFAULT_QUERIES, spec, args.k, args.repeats)
+            print(f"\n{spec}: {index.filters.count(spec):,} chunks")
+            print(f"{'method':<12}{'unfiltered':>12}{'post-filter':>13}{'filtered':>10}"
+                  f"{'post fill':>11}{'mismatch':>10}")
+            for method, r in results.items():
+                print(f"{method:<12}{r['unfiltered_ms']:>10.3f}ms{r['post_filter_ms']:>11.3f}ms"
+                      f"{r['filtered_ms']:>8.3f}ms{r['post_filter_fill']:>11.0%}{r['mismatched_queries']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark dynamic pruning (MaxScore, Block-Max WAND) against exhaustive BM25.
+
+Reports, per method, mean/p95 latency, postings decoded and scored, and
+checks that every pruned top-k matches the exhaustive one. --scale N builds a
+temporary index with the chunks repeated N times to see how pruning behaves
+as the corpus grows.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.chunking import CHUNKS_PATH, read_chunks
+from corpus.lexical import INDEX_DIR, LexicalIndex, build_index
+from corpus.pruning import STAT_KEYS
+
+METHODS = ['exhaustive', 'maxscore', 'wand']
+
+DEFAULT_QUERIES = [
+    "diversity",
+    "cultural diversity education",
+    "multicultural education for teachers",
+    "ethnic studies curriculum",
+    "Chicano history in the social studies",
+    "Lau v. Nichols bilingual education",
+    "microaggressions",
+    "health equity",
+    "hate speech on campus",
+    "George Floyd anti-racism",
+    "the role of the school in American society",
+    "Mexican American students and their culture",
+]
+
+def scaled_chunks(path, scale):
+    """Repeat every chunk `scale` times with distinct chunk_ids."""
+    for copy in range(scale):
+        for chunk in read_chunks(path):
+            if copy:
+                chunk = dict(chunk, chunk_id=f"{chunk['chunk_id']}-{copy}")
+            yield chunk
+
+def same_top_k(reference, hits, tolerance=1e-3):
+    if len(reference) != len(hits):
+        return False
+    return all(abs(a["score"] - b["score"]) <= tolerance for a, b in zip(reference, hits))
+
+def run(index, queries, k, repeats):
+    results = {}
+    reference = {q: index.search(q, k, method='exhaustive') for q in queries}
+    for method in METHODS:
+        latencies = []
+        totals = dict.fromkeys(STAT_KEYS, 0)
+        mismatches = 0
+        for q in queries:
+            stats = {}
+            hits = index.search(q, k, method=method, stats=stats)
+            if not same_top_k(reference[q], hits):
+                mismatches += 1
+            for key in STAT_KEYS:
+                totals[key] += stats.get(key, 0)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                index.search(q, k, method=method)
+                latencies.append((time.perf_counter() - start) * 1000)
+        if method == 'exhaustive':
+            # Exhaustive decodes and scores every posting of every query term
+            totals = None
+        latencies.sort()
+        results[method] = {
+            "mean_ms": statistics.fmean(latencies),
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+            "mismatched_queries": mismatches,
+            "stats": totals,
+        }
+    postings_total = results['maxscore']["stats"]["postings_total"]
+    results['exhaustive']["stats"] = {
+        "postings_total": postings_total,
+        "postings_decoded": postings_total,
+        "postings_scored": postings_total,
+    }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--scale', type=int, default=1, help="Repeat the corpus N times (temporary index)")
+    parser.add_argument('--queries', type=Path, help="File with one query per line")
+    parser.add_argument('--json', type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [q.strip() for q in args.queries.read_text(encoding='utf-8').splitlines() if q.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.scale > 1:
+            index_dir = Path(tmp) / "lexical"
+            build_index(scaled_chunks(CHUNKS_PATH, args.scale), index_dir)
+        else:
+            index_dir = INDEX_DIR
+        index = LexicalIndex.load(index_dir)
+        results = run(index, queries, args.k, args.repeats)
+
+    base = results['exhaustive']
+    print(f"{index.n_docs:,} chunks, {len(queries)} queries, k={args.k}\n")
+    print(f"{'method':<12}{'mean ms':>10}{'p95 ms':>10}{'speedup':>10}{'decoded':>12}{'scored':>12}{'skipped':>10}{'mismatch':>10}")
+    for method, r in results.items():
+        s = r["stats"]
+        skipped = 1 - s["postings_decoded"] / max(s["postings_total"], 1)
+        print(f"{method:<12}{r['mean_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+              f"{base['mean_ms'] / r['mean_ms']:>9.2f}x{s['postings_decoded']:>12,}"
+              f"{s['postings_scored']:>12,}{skipped:>10.1%}{r['mismatched_queries']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"n_chunks": index.n_docs, "k": args.k, "scale": args.scale, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
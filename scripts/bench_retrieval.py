@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark retrieval speed and quality end to end on the current corpus.
+
+Chunks extracted/ afresh and builds every index (BM25, vector store, IVF)
+into a temporary directory, or with --reuse loads the ones in build/. Then
+replays the gold queries in benchmarks/gold_queries.json plus synthetic
+queries sampled from chunk text against each method and reports p50/p95/p99
+latency, QPS at several concurrency levels, index size and process memory,
+and recall@k/MRR per query set. Results are written as JSON (--output);
+--compare prints the change against an earlier results file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.ann import DEFAULT_NPROBE, IVF_DIR, IVFIndex, build_ivf
+from corpus.chunking import CHUNKS_PATH, chunk_corpus, read_chunks, write_chunks
+from corpus.documents import BUILD_DIR
+from corpus.evaluation import (GOLD_PATH, dir_bytes, latency, load_gold, quality, rss_bytes,
+                               synthetic_queries, throughput)
+from corpus.hybrid import HybridSearcher
+from corpus.lexical import INDEX_DIR, LexicalIndex, build_index
+from corpus.vectors import VECTOR_DIR, VectorStore, build_vector_store
+
+METHODS = ['exhaustive', 'maxscore', 'wand', 'dense', 'ivf', 'hybrid']
+RESULTS_DIR = BUILD_DIR / "bench"
+
+# Headline numbers shown by --compare (higher is better for the last three)
+COMPARE_KEYS = [("latency", "p50_ms"), ("latency", "p95_ms"), ("latency", "p99_ms"),
+                ("throughput", "qps"), ("gold", "mrr"), ("synthetic", "mrr")]
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_all(corpus, work_dir, build):
+    """Chunk the corpus and build all indexes under work_dir, recording time and size in `build`."""
+    paths = {
+        "chunks": work_dir / "chunks.jsonl",
+        "lexical": work_dir / "lexical",
+        "vectors": work_dir / "vectors",
+        "ivf": work_dir / "ivf",
+    }
+    steps = [
+        ("chunks", lambda: write_chunks(chunk_corpus(corpus), paths["chunks"])),
+        ("lexical", lambda: build_index(read_chunks(paths["chunks"]), paths["lexical"], corpus.generated_at)),
+        ("vectors", lambda: build_vector_store(read_chunks(paths["chunks"]), out_dir=paths["vectors"],
+                                               manifest_generated_at=corpus.generated_at)),
+        ("ivf", lambda: build_ivf(VectorStore.load(paths["vectors"]), paths["ivf"])),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        build[name] = {"seconds": time.perf_counter() - start, "bytes": dir_bytes(paths[name])}
+        log(f"Built {name} in {build[name]['seconds']:.2f}s ({build[name]['bytes'] / 1024:,.0f} KB)")
+    return paths
+
+def load_searchers(paths, methods, corpus, nprobe, memory):
+    """{method: search(query, k)} plus the RSS growth of loading each component."""
+    loaded = {}
+
+    def component(name, loader):
+        if name not in loaded:
+            before = rss_bytes()
+            loaded[name] = loader()
+            after = rss_bytes()
+            memory[name] = {"bytes_on_disk": dir_bytes(paths[name]),
+                            "rss_delta": after - before if before is not None else None}
+        return loaded[name]
+
+    searchers = {}
+    for method in methods:
+        if method in ('exhaustive', 'maxscore', 'wand'):
+            index = component("lexical", lambda: LexicalIndex.load(paths["lexical"]))
+            searchers[method] = lambda q, k, index=index, method=method: index.search(q, k, method=method)
+        elif method == 'dense':
+            searchers[method] = component("vectors", lambda: VectorStore.load(paths["vectors"])).search
+        elif method == 'ivf':
+            store = component("vectors", lambda: VectorStore.load(paths["vectors"]))
+            ivf = component("ivf", lambda: IVFIndex.load(paths["ivf"], store))
+            searchers[method] = lambda q, k, ivf=ivf: ivf.search(q, k, nprobe)
+        elif method == 'hybrid':
+            index = component("lexical", lambda: LexicalIndex.load(paths["lexical"]))
+            store = component("vectors", lambda: VectorStore.load(paths["vectors"]))
+            searchers[method] = HybridSearcher(index, store, corpus).search
+    return searchers
+
+def compare(old, new):
+    print(f"\nChange against {old.get('run_at', '?')} ({old.get('git_commit') or 'unknown commit'}):")
+    print(f"{'method':<12}{'metric':<18}{'before':>12}{'after':>12}{'change':>10}")
+    for method, result in new["methods"].items():
+        before = old.get("methods", {}).get(method)
+        if before is None:
+            continue
+        for section, key in COMPARE_KEYS:
+            a = before.get(section, {}).get(key)
+            b = result.get(section, {}).get(key)
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a:+.1%}" if a else "-"
+            print(f"{method:<12}{section + '.' + key:<18}{a:>12.4f}{b:>12.4f}{change:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--methods', default=','.join(METHODS), help="Comma-separated subset of " + ','.join(METHODS))
+    parser.add_argument('--gold', type=Path, default=GOLD_PATH)
+    parser.add_argument('--synthetic', type=int, default=200, help="Synthetic queries sampled from chunk text")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3, help="Latency passes over the query set")
+    parser.add_argument('--concurrency', default="1,2,4,8", help="Comma-separated thread counts for QPS")
+    parser.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE)
+    parser.add_argument('--reuse', action='store_true', help="Benchmark the indexes already in build/")
+    parser.add_argument('--output', type=Path, help="Results JSON (default build/bench/retrieval-<time>.json)")
+    parser.add_argument('--compare', type=Path, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    methods = [m for m in args.methods.split(',') if m]
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        parser.error(f"unknown methods: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    log("=== Retrieval Benchmark ===")
+    corpus = Corpus.from_manifest()
+    build = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.reuse:
+            paths = {"chunks": CHUNKS_PATH, "lexical": INDEX_DIR, "vectors": VECTOR_DIR, "ivf": IVF_DIR}
+        else:
+            paths = build_all(corpus, Path(tmp), build)
+
+        chunks = list(read_chunks(paths["chunks"]))
+        query_sets = {
+            "gold": load_gold(args.gold, corpus),
+            "synthetic": synthetic_queries(chunks, args.synthetic, args.seed),
+        }
+        all_queries = query_sets["gold"] + query_sets["synthetic"]
+        log(f"{len(chunks):,} chunks, {len(query_sets['gold'])} gold + {len(query_sets['synthetic'])} synthetic queries")
+
+        memory = {}
+        rss_start = rss_bytes()
+        searchers = load_searchers(paths, methods, corpus, args.nprobe, memory)
+
+        results = {}
+        for method, search in searchers.items():
+            result = {
+                "latency": latency(search, all_queries, args.k, args.repeats),
+                "concurrency": [throughput(search, all_queries, args.k, c) for c in levels],
+            }
+            result["throughput"] = max(result["concurrency"], key=lambda r: r["qps"])
+            for name, queries in query_sets.items():
+                result[name] = quality(search, queries, args.k)
+            results[method] = result
+            lat = result["latency"]
+            log(f"{method}: p50 {lat['p50_ms']:.3f} ms, p99 {lat['p99_ms']:.3f} ms, "
+                f"{result['throughput']['qps']:,.0f} QPS, gold MRR {result['gold']['mrr']:.3f}")
+        rss_end = rss_bytes()
+
+    report = {
+        "run_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "corpus": {"manifest_generated_at": corpus.generated_at, "documents": len(corpus), "chunks": len(chunks)},
+        "settings": {"k": args.k, "repeats": args.repeats, "concurrency": levels, "nprobe": args.nprobe,
+                     "synthetic": args.synthetic, "seed": args.seed, "reused_indexes": args.reuse},
+        "build": build,
+        "memory": dict(memory, rss_start=rss_start, rss_end=rss_end),
+        "methods": results,
+    }
+
+    k = args.k
+    print(f"\n{'method':<12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'QPS':>9}{'threads':>8}"
+          f"{'gold R@' + str(k):>11}{'gold MRR':>10}{'syn R@' + str(k):>10}{'syn MRR':>9}")
+    for method, r in results.items():
+        lat = r["latency"]
+        print(f"{method:<12}{lat['p50_ms']:>9.3f}{lat['p95_ms']:>9.3f}{lat['p99_ms']:>9.3f}"
+              f"{r['throughput']['qps']:>9,.0f}{r['throughput']['concurrency']:>8}"
+              f"{r['gold'][f'recall@{k}']:>11.3f}{r['gold']['mrr']:>10.3f}"
+              f"{r['synthetic'][f'recall@{k}']:>10.3f}{r['synthetic']['mrr']:>9.3f}")
+    for name, m in memory.items():
+        rss = f", +{m['rss_delta'] / 1024:,.0f} KB RSS on load" if m["rss_delta"] is not None else ""
+        print(f"{name}: {m['bytes_on_disk'] / 1024:,.0f} KB on disk{rss}")
+
+    output = args.output or RESULTS_DIR / f"retrieval-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    log(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Build the BM25 index in build/lexical from build/chunks.jsonl (reading chunk
+tokens from the build/tokens store), plus the facet filter bitsets over its
+chunks and the token offsets used for snippets.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.chunking import CHUNKS_PATH, chunk_corpus, read_chunks, write_chunks
+from corpus.filters import FilterIndex
+from corpus.lexical import INDEX_DIR, build_index
+from corpus.snippets import build_snippets
+from corpus.tokens import load_tokens
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=Path, default=CHUNKS_PATH)
+    parser.add_argument('--output', type=Path, default=INDEX_DIR)
+    args = parser.parse_args()
+
+    log("=== Building BM25 Index ===")
+    corpus = Corpus.from_manifest()
+    if not args.chunks.exists():
+        log(f"No chunks at {args.chunks}, chunking the corpus first")
+        write_chunks(chunk_corpus(corpus), args.chunks)
+
+    start = time.time()
+    tokens = load_tokens(corpus)
+
+    def write_sidecars(index, index_dir):
+        # Written into the new index's directory before it replaces the old one
+        filters = FilterIndex.build([d[1] for d in index.docs], corpus)
+        filters.save(index_dir, index.meta["built_at"])
+        log(f"Filter bitsets: {filters.bits.shape[0]} facet values over {filters.n_rows:,} chunks")
+        _, snippet_meta = build_snippets(index, corpus, index_dir, tokens)
+        log(f"Snippet offsets: {snippet_meta['n_tokens']:,} tokens")
+
+    meta = build_index(read_chunks(args.chunks), args.output, corpus.generated_at, tokens, write_sidecars)
+    log(f"Indexed {meta['n_docs']:,} chunks, {meta['n_terms']:,} terms in {time.time() - start:.2f}s")
+    log(f"Index written to {args.output}")
+
+if __name__ == "__main__":
+    main()
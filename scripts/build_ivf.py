@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Build the IVF approximate nearest-neighbour index in build/ivf from build/vectors.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.ann import IVF_DIR, build_ivf
+from corpus.vectors import VECTOR_DIR, VectorStore
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vectors', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--output', type=Path, default=IVF_DIR)
+    parser.add_argument('--lists', type=int, help="Number of cells (default: 4 * sqrt(n))")
+    parser.add_argument('--iters', type=int, default=20)
+    args = parser.parse_args()
+
+    log("=== Building IVF Index ===")
+    store = VectorStore.load(args.vectors)
+    start = time.time()
+    meta = build_ivf(store, args.output, args.lists, args.iters)
+    log(f"Filed {meta['count']:,} vectors into {meta['n_lists']:,} cells "
+        f"(largest {meta['largest_list']:,}) in {time.time() - start:.2f}s")
+    log(f"Index written to {args.output}")
+
+if __name__ == "__main__":
+    main()
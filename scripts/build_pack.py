@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Snapshot the corpus and its built indexes into one file (see corpus/pack.py).
+
+Packs the manifest, sidecars, extracted texts with page offsets, the BM25
+index (with filters, snippet offsets and batch matrix) and, when built, the
+vector store and positional index into build/corpus.pack. Run build_index.py
+(and optionally build_vectors.py / find_quote.py --build) first.
+--verify checks every section of an existing pack against its checksum.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.lexical import INDEX_DIR
+from corpus.pack import PACK_PATH, CorpusPack, build_pack
+from corpus.positional import POSITIONAL_DIR
+from corpus.vectors import VECTOR_DIR
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', type=Path, default=PACK_PATH)
+    parser.add_argument('--index', type=Path, default=INDEX_DIR)
+    parser.add_argument('--vectors', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--positional', type=Path, default=POSITIONAL_DIR)
+    parser.add_argument('--no-vectors', action='store_true', help="Leave the vector store out")
+    parser.add_argument('--no-positional', action='store_true', help="Leave the positional index out")
+    parser.add_argument('--verify', action='store_true', help="Only verify the checksums of an existing pack")
+    args = parser.parse_args()
+
+    if not args.verify:
+        start = time.time()
+        info = build_pack(args.output, index_dir=args.index,
+                          vector_dir=None if args.no_vectors else args.vectors,
+                          positional_dir=None if args.no_positional else args.positional)
+        size = args.output.stat().st_size
+        log(f"Packed {', '.join(info['components'])} ({size / 1024 / 1024:.1f} MB) "
+            f"in {time.time() - start:.2f}s -> {args.output}")
+
+    start = time.perf_counter()
+    with CorpusPack(args.output) as pack:
+        bad = pack.verify()
+        log(f"Verified {len(pack.entries)} sections in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if bad:
+        log(f"Checksum mismatch: {', '.join(bad)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Refresh the token store in build/tokens (see corpus/tokens.py) and print
+corpus n-gram statistics from it.
+
+Only files under extracted/ whose size or mtime changed are re-tokenized.
+extract_text.py runs this step itself; use this script after editing or
+adding extracted texts by other means. --ngrams N --top K prints the K most
+frequent N-grams.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.tokens import TOKENS_DIR, TokenStore, build_tokens
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', type=Path, default=TOKENS_DIR)
+    parser.add_argument('--ngrams', type=int, metavar='N', help="Print the most frequent N-grams")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.time()
+    meta = build_tokens(args.output, BASE_DIR)
+    log(f"{meta['n_tokens']:,} tokens, {meta['n_terms']:,} terms over {meta['n_docs']} files "
+        f"({meta['reused_docs']} unchanged) in {time.time() - start:.2f}s -> {args.output}")
+
+    if args.ngrams:
+        store = TokenStore.load(args.output)
+        start = time.perf_counter()
+        top = store.top_ngrams(args.ngrams, args.top)
+        elapsed = (time.perf_counter() - start) * 1000
+        for rank, (gram, count) in enumerate(top, 1):
+            print(f"{rank:3}. {' '.join(gram):<40} {count:,}")
+        print(f"\n{args.ngrams}-grams counted in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
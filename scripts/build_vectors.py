@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Embed build/chunks.jsonl into the dense vector store in build/vectors.
+
+Vectors are cached per embedder under build/embed_cache keyed by chunk
+content hash, so re-runs only embed new or changed chunks, and an
+interrupted run picks up from the last finished batch.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.chunking import CHUNKS_PATH, chunk_corpus, write_chunks
+from corpus.embedding import CACHE_DIR, embed_corpus
+from corpus.vectors import VECTOR_DIR, embedder_id, load_embedder
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=Path, default=CHUNKS_PATH)
+    parser.add_argument('--output', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--dtype', choices=['float16', 'int8'], default='float16')
+    parser.add_argument('--embedder', help="module:callable returning an embedder (default: offline hashing)")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, help="Embedding processes (default: CPU count, 0 = in-process)")
+    parser.add_argument('--cache', type=Path, default=CACHE_DIR)
+    args = parser.parse_args()
+
+    log("=== Building Vector Store ===")
+    corpus = Corpus.from_manifest()
+    if not args.chunks.exists():
+        log(f"No chunks at {args.chunks}, chunking the corpus first")
+        write_chunks(chunk_corpus(corpus), args.chunks)
+
+    embedder = load_embedder(args.embedder)
+    log(f"Embedder: {embedder_id(embedder)}")
+    last_report = 0
+
+    def progress(done, seconds):
+        nonlocal last_report
+        if seconds - last_report >= 5:
+            last_report = seconds
+            log(f"  embedded {done:,} chunks ({done / seconds:,.0f} chunks/sec)")
+
+    start = time.time()
+    meta = embed_corpus(args.chunks, embedder, args.output, args.dtype, args.workers, args.batch_size,
+                        args.cache, corpus.generated_at, progress)
+    elapsed = time.time() - start
+    stats = meta["embedding"]
+    rate = f", {stats['embedded'] / elapsed:,.0f} chunks/sec" if stats["embedded"] else ""
+    log(f"Embedded {stats['embedded']:,} new chunks, {stats['cached']:,} from cache{rate}")
+    log(f"Stored {meta['count']:,} vectors ({meta['dim']} dims, {meta['dtype']}) in {elapsed:.2f}s")
+    log(f"Vectors written to {args.output}")
+
+if __name__ == "__main__":
+    main()
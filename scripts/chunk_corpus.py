@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Chunk all extracted texts into build/chunks.jsonl for RAG ingestion.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.chunking import CHUNKS_PATH, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP, chunk_corpus, write_chunks
+from corpus.dedup import THRESHOLD, drop_near_duplicate_chunks
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP)
+    parser.add_argument('--unit', choices=['sentence', 'token'], default='sentence')
+    parser.add_argument('--no-placeholders', action='store_true', help="Skip placeholder summaries")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Skip documents marked duplicate_of in the manifest and near-duplicate chunks")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Jaccard threshold for --dedup")
+    parser.add_argument('--output', type=Path, default=CHUNKS_PATH)
+    args = parser.parse_args()
+
+    log("=== Chunking Extracted Texts ===")
+    corpus = Corpus.from_manifest()
+    start = time.time()
+    chunks = chunk_corpus(corpus, args.max_tokens, args.overlap, args.unit,
+                          placeholder=False if args.no_placeholders else None,
+                          duplicates=not args.dedup)
+    stats = {}
+    if args.dedup:
+        chunks = drop_near_duplicate_chunks(chunks, args.threshold, stats=stats)
+    count = write_chunks(chunks, args.output)
+    log(f"Wrote {count:,} chunks to {args.output} in {time.time() - start:.2f}s")
+    if args.dedup:
+        skipped = sum(1 for doc in corpus.documents() if doc.duplicate_of)
+        log(f"Skipped {skipped} duplicate documents and {stats['dropped']:,} near-duplicate chunks")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Re-extract blog post text from the saved HTML with cross-page boilerplate removed.
+
+Block frequencies are learned per site (from each page's canonical link) over
+every page in sources/blog_posts, then extracted/blog_posts and the word
+counts in metadata/blog_posts are rewritten. Run scripts/generate_manifest.py
+afterwards.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.boilerplate import MIN_PAGES, MIN_RATIO, extract_blog_text, learn_from_html, pages_by_site
+from corpus.instrument import metrics
+from corpus.pipeline import file_digest
+
+HTML_DIR = BASE_DIR / "sources" / "blog_posts"
+TXT_DIR = BASE_DIR / "extracted" / "blog_posts"
+META_DIR = BASE_DIR / "metadata" / "blog_posts"
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def clean_page(html_path, boilerplate, stats=None, dry_run=False):
+    """Re-extract one saved page and update its sidecar word count; True if the text changed."""
+    txt_path = TXT_DIR / f"{html_path.stem}.txt"
+    with metrics.timer("extract", html_path.name):
+        clean_text = extract_blog_text(html_path.read_text(encoding='utf-8'), boilerplate, stats)
+    metrics.count("extract", "pages", 1, html_path.name)
+    metrics.count("extract", "words", len(clean_text.split()), html_path.name)
+    old_text = txt_path.read_text(encoding='utf-8') if txt_path.exists() else None
+    if clean_text == old_text:
+        return False
+    if dry_run:
+        return True
+    txt_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(clean_text)
+    meta_path = META_DIR / f"{html_path.stem}.json"
+    if meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta.setdefault("file_info", {})["word_count"] = len(clean_text.split())
+        meta.setdefault("extraction", {})["source_md5"] = file_digest(html_path, "md5")
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-pages', type=int, default=MIN_PAGES,
+                        help="A block is boilerplate once it occurs on this many pages")
+    parser.add_argument('--min-ratio', type=float, default=MIN_RATIO,
+                        help="... and on at least this fraction of the site's pages")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be stripped without writing")
+    args = parser.parse_args()
+
+    log("=== Stripping Blog Boilerplate ===")
+    by_site = pages_by_site(sorted(HTML_DIR.glob("*.html")))
+
+    total = {}
+    changed = 0
+    for site, pages in sorted(by_site.items()):
+        boilerplate = learn_from_html(pages, min_pages=args.min_pages, min_ratio=args.min_ratio)
+        stats = {}
+        for html_path in pages:
+            changed += clean_page(html_path, boilerplate, stats, args.dry_run)
+        log(f"{site or '(unknown site)'}: {len(pages)} pages, threshold {boilerplate.threshold}, "
+            f"{stats.get('stripped', 0)} blocks stripped, {stats.get('kept', 0)} kept")
+        for key, value in stats.items():
+            total[key] = total.get(key, 0) + value
+
+    action = "Would rewrite" if args.dry_run else "Rewrote"
+    log(f"{action} {changed} text files ({total.get('stripped', 0)} boilerplate blocks)")
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,21 @@ Download all available resources from Dr. Carlos Cortés bibliography.
 """
 
 import os
+import sys
 import json
 import time
 import hashlib
 import requests
 from datetime import datetime
 from pathlib import Path
-from bs4 import BeautifulSoup
 
 # Configuration
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.boilerplate import extract_blog_text, learn_by_site, page_site
+from corpus.instrument import get_logger, metrics, setup_logging
+
 SOURCES_DIR = BASE_DIR / "sources"
 EXTRACTED_DIR = BASE_DIR / "extracted"
 METADATA_DIR = BASE_DIR / "metadata"
@@ -29,33 +34,32 @@ session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 })
 
-# Logging
-log_file = LOGS_DIR / f"download_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+# Logging (buffered to logs/download_<time>.log once main() sets it up)
+logger = get_logger("download")
 
 def log(msg):
     """Log to file and console."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    line = f"[{timestamp}] {msg}"
-    print(line)
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write(line + '\n')
+    logger.info(msg)
 
 def download_file(url, dest_path, timeout=60):
     """Download a file from URL."""
-    try:
-        response = session.get(url, timeout=timeout, stream=True)
-        response.raise_for_status()
-
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        size = os.path.getsize(dest_path)
-        log(f"  Downloaded: {dest_path.name} ({size:,} bytes)")
-        return True
-    except Exception as e:
-        log(f"  FAILED: {url} - {e}")
-        return False
+    with metrics.timer("download", dest_path.name):
+        try:
+            response = session.get(url, timeout=timeout, stream=True)
+            response.raise_for_status()
+
+            with open(dest_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+
+            size = os.path.getsize(dest_path)
+            metrics.count("download", "bytes", size, dest_path.name)
+            log(f"  Downloaded: {dest_path.name} ({size:,} bytes)")
+            return True
+        except Exception as e:
+            metrics.count("download", "failed", 1, dest_path.name)
+            log(f"  FAILED: {url} - {e}")
+            return False
 
 def get_md5(filepath):
     """Calculate MD5 hash of file."""
@@ -106,42 +110,44 @@ ERIC_DOCS = [
     }
 ]
 
+def download_eric_doc(doc):
+    """Download one ERIC document and write its sidecar."""
+    dest_dir = SOURCES_DIR / "eric_docs"
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    filename = f"{doc['year']}-Cortes-{doc['id']}.pdf"
+    dest_path = dest_dir / filename
+
+    log(f"Downloading {doc['id']}: {doc['title']}")
+    success = download_file(doc['url'], dest_path)
+
+    if success:
+        # Create metadata
+        meta = create_metadata(
+            item_id=doc['id'].lower(),
+            title=doc['title'],
+            resource_type="eric_document",
+            source_url=doc['url'],
+            source_path=dest_path,
+            year=doc['year'],
+            eric_id=doc['id']
+        )
+
+        meta_path = METADATA_DIR / "eric_docs" / f"{filename.replace('.pdf', '.json')}"
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        return {"id": doc['id'], "status": "downloaded", "path": str(dest_path)}
+    return {"id": doc['id'], "status": "failed"}
+
 def download_eric_docs():
     """Download ERIC documents."""
     log("\n=== Downloading ERIC Documents ===")
     results = []
 
     for doc in ERIC_DOCS:
-        dest_dir = SOURCES_DIR / "eric_docs"
-        dest_dir.mkdir(parents=True, exist_ok=True)
-
-        filename = f"{doc['year']}-Cortes-{doc['id']}.pdf"
-        dest_path = dest_dir / filename
-
-        log(f"Downloading {doc['id']}: {doc['title']}")
-        success = download_file(doc['url'], dest_path)
-
-        if success:
-            # Create metadata
-            meta = create_metadata(
-                item_id=doc['id'].lower(),
-                title=doc['title'],
-                resource_type="eric_document",
-                source_url=doc['url'],
-                source_path=dest_path,
-                year=doc['year'],
-                eric_id=doc['id']
-            )
-
-            meta_path = METADATA_DIR / "eric_docs" / f"{filename.replace('.pdf', '.json')}"
-            meta_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, indent=2)
-
-            results.append({"id": doc['id'], "status": "downloaded", "path": str(dest_path)})
-        else:
-            results.append({"id": doc['id'], "status": "failed"})
-
+        results.append(download_eric_doc(doc))
         time.sleep(1)  # Be respectful
 
     return results
@@ -150,17 +156,20 @@ def download_eric_docs():
 # Archive.org Book
 # ============================================================================
 
+# The Making—and Remaking—of a Multiculturalist
+ARCHIVE_BOOK_URL = "https://archive.org/download/makingremakingof0000cort/makingremakingof0000cort.pdf"
+ARCHIVE_BOOK_FILE = "2002-Cortes-Making-Remaking-Multiculturalist.pdf"
+
 def download_archive_org_book():
     """Download the Archive.org book."""
     log("\n=== Downloading Archive.org Book ===")
 
-    # The Making—and Remaking—of a Multiculturalist
-    url = "https://archive.org/download/makingremakingof0000cort/makingremakingof0000cort.pdf"
+    url = ARCHIVE_BOOK_URL
 
     dest_dir = SOURCES_DIR / "books"
     dest_dir.mkdir(parents=True, exist_ok=True)
 
-    filename = "2002-Cortes-Making-Remaking-Multiculturalist.pdf"
+    filename = ARCHIVE_BOOK_FILE
     dest_path = dest_dir / filename
 
     log(f"Downloading: The Making—and Remaking—of a Multiculturalist")
@@ -211,112 +220,97 @@ BLOG_POSTS = [
     {"slug": "from-conditional-to-equitable-inclusion-by-carlos-cortes", "title": "From Conditional to Equitable Inclusion", "series": "standalone"},
 ]
 
-def scrape_blog_post(url, dest_html_path, dest_txt_path):
-    """Scrape a blog post, save HTML and extracted text."""
-    try:
-        response = session.get(url, timeout=30)
-        response.raise_for_status()
-
-        # Save raw HTML
-        with open(dest_html_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
-
-        # Extract text
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        # Remove scripts and styles
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-            element.decompose()
-
-        # Try to find main content
-        article = soup.find('article') or soup.find('main') or soup.find(class_='post-content') or soup.find(class_='entry-content')
-
-        if article:
-            # Get title
-            title_elem = soup.find('h1')
-            title = title_elem.get_text(strip=True) if title_elem else "Unknown"
-
-            # Get content
-            paragraphs = article.find_all(['p', 'h2', 'h3', 'h4', 'blockquote', 'li'])
-            content_lines = [title, "=" * len(title), ""]
-
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 10:  # Skip tiny fragments
-                    content_lines.append(text)
-                    content_lines.append("")
-
-            clean_text = "\n".join(content_lines)
-        else:
-            # Fallback: get all text
-            clean_text = soup.get_text(separator='\n', strip=True)
-
-        # Save extracted text
-        with open(dest_txt_path, 'w', encoding='utf-8') as f:
-            f.write(clean_text)
-
-        word_count = len(clean_text.split())
-        return True, word_count
-
-    except Exception as e:
-        log(f"  FAILED: {url} - {e}")
-        return False, 0
+def blog_post_paths(post):
+    """(html, txt, metadata) paths of a blog post."""
+    filename_base = post['slug'][:80]  # Truncate long slugs
+    return (SOURCES_DIR / "blog_posts" / f"{filename_base}.html",
+            EXTRACTED_DIR / "blog_posts" / f"{filename_base}.txt",
+            METADATA_DIR / "blog_posts" / f"{filename_base}.json")
+
+def fetch_blog_post(post):
+    """Save a blog post's HTML and its sidecar; the text is extracted afterwards."""
+    url = f"https://americandiversityreport.com/{post['slug']}/"
+    html_path, txt_path, meta_path = blog_post_paths(post)
+    for path in (html_path, meta_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    log(f"Scraping: {post['title'][:60]}...")
+    with metrics.timer("download", html_path.name):
+        try:
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            metrics.count("download", "failed", 1, html_path.name)
+            log(f"  FAILED: {url} - {e}")
+            return False
+    metrics.count("download", "bytes", len(response.content), html_path.name)
+
+    # Save raw HTML
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+
+    meta = {
+        "id": f"blog_{post['slug'][:50]}",
+        "title": post["title"],
+        "resource_type": "blog_post",
+        "series": post["series"],
+        "source_info": {
+            "url": url,
+            "downloaded_at": datetime.now().isoformat()
+        },
+        "file_info": {
+            "html_path": str(html_path),
+            "txt_path": str(txt_path),
+            "word_count": 0
+        },
+        "extraction": {
+            "status": "completed",
+            "method": "beautifulsoup"
+        }
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return True
 
 def download_blog_posts():
     """Download all blog posts."""
     log("\n=== Downloading Blog Posts ===")
     results = []
-
-    html_dir = SOURCES_DIR / "blog_posts"
-    txt_dir = EXTRACTED_DIR / "blog_posts"
-    meta_dir = METADATA_DIR / "blog_posts"
-
-    html_dir.mkdir(parents=True, exist_ok=True)
-    txt_dir.mkdir(parents=True, exist_ok=True)
-    meta_dir.mkdir(parents=True, exist_ok=True)
+    scraped = []
 
     for post in BLOG_POSTS:
-        url = f"https://americandiversityreport.com/{post['slug']}/"
-
-        # Clean filename from slug
-        filename_base = post['slug'][:80]  # Truncate long slugs
-        html_path = html_dir / f"{filename_base}.html"
-        txt_path = txt_dir / f"{filename_base}.txt"
-
-        log(f"Scraping: {post['title'][:60]}...")
-        success, word_count = scrape_blog_post(url, html_path, txt_path)
-
-        if success:
-            meta = {
-                "id": f"blog_{post['slug'][:50]}",
-                "title": post["title"],
-                "resource_type": "blog_post",
-                "series": post["series"],
-                "source_info": {
-                    "url": url,
-                    "downloaded_at": datetime.now().isoformat()
-                },
-                "file_info": {
-                    "html_path": str(html_path),
-                    "txt_path": str(txt_path),
-                    "word_count": word_count
-                },
-                "extraction": {
-                    "status": "completed",
-                    "method": "beautifulsoup"
-                }
-            }
-
-            meta_path = meta_dir / f"{filename_base}.json"
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, indent=2)
-
-            results.append({"title": post['title'], "status": "downloaded", "words": word_count})
+        if fetch_blog_post(post):
+            results.append({"title": post['title'], "status": "downloaded", "words": 0})
+            scraped.append(blog_post_paths(post) + (results[-1],))
         else:
             results.append({"title": post['title'], "status": "failed"})
 
         time.sleep(2)  # Be respectful to the server
 
+    # Site chrome repeated across pages is learned per site from every saved page, this run's included
+    if scraped:
+        html_dir = SOURCES_DIR / "blog_posts"
+        filters = learn_by_site(sorted(html_dir.glob("*.html")))
+        stats = {}
+        for html_path, txt_path, meta_path, result in scraped:
+            txt_path.parent.mkdir(parents=True, exist_ok=True)
+            with metrics.timer("extract", html_path.name):
+                html = html_path.read_text(encoding='utf-8')
+                clean_text = extract_blog_text(html, filters[page_site(html)], stats)
+                with open(txt_path, 'w', encoding='utf-8') as f:
+                    f.write(clean_text)
+            result["words"] = len(clean_text.split())
+            metrics.count("extract", "pages", 1, html_path.name)
+            metrics.count("extract", "words", result["words"], html_path.name)
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta["file_info"]["word_count"] = result["words"]
+            meta["extraction"]["source_md5"] = get_md5(html_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+        log(f"Stripped {stats['stripped']} boilerplate blocks (learned from "
+            f"{sum(f.n_pages for f in filters.values())} pages of {len(filters)} sites)")
+
     return results
 
 # ============================================================================
@@ -324,6 +318,7 @@ def download_blog_posts():
 # ============================================================================
 
 def main():
+    log_file = setup_logging("download")
     log("=" * 60)
     log("Dr. Carlos Cortés RAG Corpus Downloader")
     log("=" * 60)
@@ -368,7 +363,10 @@ def main():
     total_words = sum(r.get("words", 0) for r in all_results["blog_posts"])
     log(f"Total words from blogs: {total_words:,}")
 
+    log("\nTimings:")
+    metrics.log_summary(log)
     log(f"\nResults saved to: {results_path}")
+    log(f"Metrics: {metrics.dump('download')}")
     log(f"Log file: {log_file}")
 
 if __name__ == "__main__":
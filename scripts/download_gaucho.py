@@ -12,6 +12,9 @@ BASE_DIR = Path(__file__).parent.parent
 SOURCES_DIR = BASE_DIR / "sources" / "books"
 METADATA_DIR = BASE_DIR / "metadata" / "books"
 
+IDENTIFIER = "gachopoliticsinb0000cort"
+FILENAME = "1974-Cortes-Gaucho-Politics-Brazil"
+
 SOURCES_DIR.mkdir(parents=True, exist_ok=True)
 METADATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -21,7 +24,7 @@ session.headers.update({
 })
 
 def main():
-    identifier = "gachopoliticsinb0000cort"
+    identifier = IDENTIFIER
 
     # Get metadata first
     print(f"Fetching metadata for {identifier}...")
@@ -46,7 +49,7 @@ def main():
             pdf_response = session.get(pdf_url, timeout=120, stream=True)
             pdf_response.raise_for_status()
 
-            dest_path = SOURCES_DIR / "1974-Cortes-Gaucho-Politics-Brazil.pdf"
+            dest_path = SOURCES_DIR / f"{FILENAME}.pdf"
             with open(dest_path, 'wb') as f:
                 for chunk in pdf_response.iter_content(chunk_size=8192):
                     f.write(chunk)
@@ -69,7 +72,7 @@ def main():
                 }
             }
 
-            meta_path = METADATA_DIR / "1974-Cortes-Gaucho-Politics-Brazil.json"
+            meta_path = METADATA_DIR / f"{FILENAME}.json"
             with open(meta_path, 'w', encoding='utf-8') as f:
                 json.dump(meta, f, indent=2)
 
@@ -4,14 +4,18 @@ Download additional blog posts by searching the site.
 """
 
 import os
+import sys
 import json
 import time
 import requests
-from datetime import datetime
 from pathlib import Path
-from bs4 import BeautifulSoup
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.boilerplate import extract_blog_text, learn_by_site, page_site
+from corpus.instrument import get_logger, metrics, setup_logging
+
 SOURCES_DIR = BASE_DIR / "sources" / "blog_posts"
 EXTRACTED_DIR = BASE_DIR / "extracted" / "blog_posts"
 METADATA_DIR = BASE_DIR / "metadata" / "blog_posts"
@@ -25,50 +29,38 @@ session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 })
 
+logger = get_logger("download")
+
 def log(msg):
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+    logger.info(msg)
 
-def scrape_blog_post(url, dest_html_path, dest_txt_path):
-    """Scrape a blog post."""
+def scrape_blog_post(url, dest_html_path):
+    """Save a blog post's HTML; the text is extracted afterwards (extract_post)."""
     try:
         response = session.get(url, timeout=30)
         response.raise_for_status()
-
-        with open(dest_html_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
-
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-            element.decompose()
-
-        article = soup.find('article') or soup.find('main') or soup.find(class_='entry-content')
-
-        if article:
-            title_elem = soup.find('h1')
-            title = title_elem.get_text(strip=True) if title_elem else "Unknown"
-
-            paragraphs = article.find_all(['p', 'h2', 'h3', 'h4', 'blockquote', 'li'])
-            content_lines = [title, "=" * len(title), ""]
-
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 10:
-                    content_lines.append(text)
-                    content_lines.append("")
-
-            clean_text = "\n".join(content_lines)
-        else:
-            clean_text = soup.get_text(separator='\n', strip=True)
-
-        with open(dest_txt_path, 'w', encoding='utf-8') as f:
-            f.write(clean_text)
-
-        return True, len(clean_text.split())
-
     except Exception as e:
         log(f"  FAILED: {e}")
-        return False, 0
+        return False
+
+    with open(dest_html_path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    metrics.count("download", "bytes", len(response.content), dest_html_path.name)
+    return True
+
+def extract_post(html_path, filters):
+    """Write a saved page's text with its site's chrome stripped (filters from learn_by_site, as download_all.py
+    does); returns its word count."""
+    txt_path = EXTRACTED_DIR / html_path.with_suffix('.txt').name
+    with metrics.timer("extract", html_path.name):
+        html = html_path.read_text(encoding='utf-8')
+        clean_text = extract_blog_text(html, filters[page_site(html)])
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write(clean_text)
+    words = len(clean_text.split())
+    metrics.count("extract", "pages", 1, html_path.name)
+    metrics.count("extract", "words", words, html_path.name)
+    return words
 
 # Additional blog post URLs to try (reconstructed patterns)
 ADDITIONAL_POSTS = [
@@ -100,41 +92,62 @@ ADDITIONAL_POSTS = [
     {"slug": "renewing-diversity-11-the-mysterious-world-of-diversity-and-economics-by-carlos-cortes", "title": "Renewing Diversity Part 11: Diversity and Economics (alt)"},
 ]
 
+def post_html_path(post):
+    return SOURCES_DIR / f"{post['slug'][:80]}.html"
+
+def try_post(post):
+    """Probe one candidate URL and scrape it if it exists; result dict, or None if not found."""
+    url = f"https://americandiversityreport.com/{post['slug']}/"
+    html_path = post_html_path(post)
+
+    log(f"Trying: {post['title'][:50]}...")
+
+    with metrics.timer("probe", html_path.name):
+        response = session.head(url, timeout=10, allow_redirects=True)
+    if response.status_code != 200:
+        metrics.count("probe", "not_found", 1, html_path.name)
+        log(f"  Not found (HTTP {response.status_code})")
+        return None
+    with metrics.timer("download", html_path.name):
+        success = scrape_blog_post(url, html_path)
+    if not success:
+        return None
+    log("  FOUND!")
+    return {"title": post['title'], "status": "found", "words": 0}
+
 def main():
+    setup_logging("download_more_blogs")
     log("=== Searching for Additional Blog Posts ===")
     results = []
     found = 0
 
     for post in ADDITIONAL_POSTS:
-        url = f"https://americandiversityreport.com/{post['slug']}/"
-
-        filename_base = post['slug'][:80]
-        html_path = SOURCES_DIR / f"{filename_base}.html"
-        txt_path = EXTRACTED_DIR / f"{filename_base}.txt"
-
         # Skip if already exists
-        if html_path.exists():
+        if post_html_path(post).exists():
             log(f"Already exists: {post['title'][:50]}...")
             continue
 
-        log(f"Trying: {post['title'][:50]}...")
-
         try:
-            response = session.head(url, timeout=10, allow_redirects=True)
-            if response.status_code == 200:
-                success, word_count = scrape_blog_post(url, html_path, txt_path)
-                if success:
-                    log(f"  FOUND! {word_count} words")
-                    found += 1
-                    results.append({"title": post['title'], "status": "found", "words": word_count})
-            else:
-                log(f"  Not found (HTTP {response.status_code})")
+            result = try_post(post)
+            if result:
+                found += 1
+                results.append((post_html_path(post), result))
         except Exception as e:
             log(f"  Error: {e}")
 
         time.sleep(1)
 
+    # Site chrome repeated across pages is learned per site from every saved page, the new ones included
+    if results:
+        filters = learn_by_site(sorted(SOURCES_DIR.glob("*.html")))
+        for html_path, result in results:
+            result["words"] = extract_post(html_path, filters)
+            log(f"Extracted {result['words']} words: {html_path.name}")
+    results = [result for _, result in results]
+
     log(f"\n=== Summary: Found {found} additional posts ===")
+    metrics.log_summary(log)
+    log(f"Metrics: {metrics.dump('download_more_blogs')}")
     return results
 
 if __name__ == "__main__":
@@ -1,21 +1,31 @@
 #!/usr/bin/env python3
 """
-Extract text from all downloaded PDFs.
+Extract text from all downloaded PDFs, then refresh the token store
+(build/tokens) for every extracted file.
 """
 
 import os
+import sys
 import json
 from datetime import datetime
 from pathlib import Path
 from pypdf import PdfReader
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.instrument import get_logger, metrics, setup_logging
+from corpus.pipeline import file_digest
+from corpus.tokens import TOKENS_DIR, build_tokens
+
 SOURCES_DIR = BASE_DIR / "sources"
 EXTRACTED_DIR = BASE_DIR / "extracted"
 METADATA_DIR = BASE_DIR / "metadata"
 
+logger = get_logger("extract")
+
 def log(msg):
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+    logger.info(msg)
 
 def extract_pdf(pdf_path, txt_path):
     """Extract text from a PDF file."""
@@ -42,7 +52,66 @@ def extract_pdf(pdf_path, txt_path):
         log(f"  FAILED: {e}")
         return False, 0, 0
 
+def extract_document(pdf_path):
+    """Extract one PDF under sources/ into extracted/ and record it in its sidecar."""
+    # Determine output path
+    rel_path = pdf_path.relative_to(SOURCES_DIR)
+    txt_path = EXTRACTED_DIR / rel_path.with_suffix('.txt')
+    txt_path.parent.mkdir(parents=True, exist_ok=True)
+
+    log(f"Extracting: {pdf_path.name}")
+    with metrics.timer("extract", pdf_path.name):
+        success, word_count, page_count = extract_pdf(pdf_path, txt_path)
+
+    if not success:
+        metrics.count("extract", "failed", 1, pdf_path.name)
+        return {'file': pdf_path.name, 'status': 'failed'}
+    metrics.count("extract", "pages", page_count, pdf_path.name)
+    metrics.count("extract", "words", word_count, pdf_path.name)
+    log(f"  Extracted {word_count:,} words from {page_count} pages")
+
+    # Update metadata
+    meta_path = METADATA_DIR / rel_path.with_suffix('.json')
+    if meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    else:
+        meta = {}
+
+    meta['extraction'] = {
+        'status': 'completed',
+        'method': 'pypdf',
+        'extracted_at': datetime.now().isoformat(),
+        'word_count': word_count,
+        'page_count': page_count,
+        # Which version of the PDF this text came from (checked by verify_corpus.py)
+        'source_md5': file_digest(pdf_path, 'md5')
+    }
+    meta['file_info'] = meta.get('file_info', {})
+    meta['file_info']['extracted_path'] = str(txt_path)
+
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    return {
+        'file': pdf_path.name,
+        'status': 'extracted',
+        'words': word_count,
+        'pages': page_count
+    }
+
+def refresh_tokens():
+    """Update the token store for every extracted file; files left unchanged count as cache hits."""
+    with metrics.timer("tokens"):
+        meta = build_tokens(TOKENS_DIR, BASE_DIR)
+    metrics.count("tokens", "tokens", meta['n_tokens'])
+    metrics.count("tokens", "cache_hits", meta['reused_docs'])
+    metrics.count("tokens", "cache_misses", meta['n_docs'] - meta['reused_docs'])
+    return meta
+
 def main():
+    setup_logging("extract")
     log("=== Extracting Text from PDFs ===")
 
     # Find all PDFs in sources
@@ -54,51 +123,16 @@ def main():
 
     log(f"Found {len(pdf_files)} PDF files")
 
-    results = []
-    for pdf_path in pdf_files:
-        # Determine output path
-        rel_path = pdf_path.relative_to(SOURCES_DIR)
-        txt_path = EXTRACTED_DIR / rel_path.with_suffix('.txt')
-        txt_path.parent.mkdir(parents=True, exist_ok=True)
-
-        log(f"Extracting: {pdf_path.name}")
-        success, word_count, page_count = extract_pdf(pdf_path, txt_path)
-
-        if success:
-            log(f"  Extracted {word_count:,} words from {page_count} pages")
-
-            # Update metadata
-            meta_path = METADATA_DIR / rel_path.with_suffix('.json')
-            if meta_path.exists():
-                with open(meta_path, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-            else:
-                meta = {}
-
-            meta['extraction'] = {
-                'status': 'completed',
-                'method': 'pypdf',
-                'extracted_at': datetime.now().isoformat(),
-                'word_count': word_count,
-                'page_count': page_count
-            }
-            meta['file_info'] = meta.get('file_info', {})
-            meta['file_info']['extracted_path'] = str(txt_path)
-
-            meta_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, indent=2)
-
-            results.append({
-                'file': pdf_path.name,
-                'status': 'extracted',
-                'words': word_count,
-                'pages': page_count
-            })
-        else:
-            results.append({'file': pdf_path.name, 'status': 'failed'})
+    results = [extract_document(pdf_path) for pdf_path in pdf_files]
 
     log(f"\n=== Extracted {len([r for r in results if r['status'] == 'extracted'])} PDFs ===")
+
+    # Tokenize once here; word counts and index builds read the arrays instead
+    meta = refresh_tokens()
+    log(f"Token store: {meta['n_tokens']:,} tokens, {meta['n_terms']:,} terms over {meta['n_docs']} files "
+        f"({meta['reused_docs']} unchanged) -> {TOKENS_DIR}")
+    metrics.log_summary(log)
+    log(f"Metrics: {metrics.dump('extract')}")
     return results
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Look up an exact quotation (or, with --near N, words within N tokens of each
+other) in the positional index and print where it occurs: document, page and
+character offsets. --build (re)builds build/positional from extracted/ first.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.positional import POSITIONAL_DIR, PositionalIndex, build_positional
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('quote', nargs='?')
+    parser.add_argument('--near', type=int, metavar='N', help="Match the words in any order within N tokens")
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--index', type=Path, default=POSITIONAL_DIR)
+    parser.add_argument('--build', action='store_true', help="Rebuild the positional index first")
+    args = parser.parse_args()
+    if not args.quote and not args.build:
+        parser.error("a quote (or --build) is required")
+
+    corpus = Corpus.from_manifest()
+    if args.build:
+        start = time.time()
+        meta = build_positional(corpus, args.index)
+        log(f"Indexed {meta['n_tokens']:,} tokens ({meta['n_terms']:,} terms) from {meta['n_docs']} documents "
+            f"in {time.time() - start:.2f}s -> {args.index}")
+        if not args.quote:
+            return
+
+    index = PositionalIndex.load(args.index, corpus)
+    start = time.perf_counter()
+    if args.near is not None:
+        hits = index.near(args.quote, args.near, args.limit)
+    else:
+        hits = index.phrase(args.quote, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for rank, hit in enumerate(hits, 1):
+        doc = corpus.get(hit["doc_id"])
+        title = doc.title if doc else hit["doc_id"]
+        page = ""
+        if hit["page"] is not None:
+            page = f", page {hit['page']}" if hit["page_end"] == hit["page"] else f", pages {hit['page']}-{hit['page_end']}"
+        print(f"{rank:2}. {title}{page}  [chars {hit['char_start']}-{hit['char_end']}]")
+        if hit["text"] is not None:
+            print(f"    {' '.join(hit['text'].split())[:160]}")
+    print(f"\n{len(hits)} matches in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
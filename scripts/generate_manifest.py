@@ -4,17 +4,31 @@ Generate manifest.json from all downloaded resources.
 """
 
 import os
+import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.dedup import annotate_manifest
+from corpus.instrument import metrics
+from corpus.tokens import TOKENS_DIR, TokenStore
+
 SOURCES_DIR = BASE_DIR / "sources"
 EXTRACTED_DIR = BASE_DIR / "extracted"
 METADATA_DIR = BASE_DIR / "metadata"
 
-def count_words_in_file(filepath):
-    """Count words in a text file."""
+def count_words_in_file(filepath, tokens=None):
+    """Count words in a text file (from the token store when it is current for the file)."""
+    if tokens is not None:
+        words = tokens.word_count_for(filepath, BASE_DIR)
+        if words is not None:
+            metrics.count("manifest", "cache_hits")
+            return words
+    metrics.count("manifest", "cache_misses")
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return len(f.read().split())
@@ -38,6 +52,9 @@ def generate_manifest():
         "items": []
     }
 
+    start = time.perf_counter()
+    tokens = TokenStore.load(TOKENS_DIR) if (TOKENS_DIR / "meta.json").exists() else None
+
     total_words = 0
     items_downloaded = 0
     items_extracted = 0
@@ -81,7 +98,7 @@ def generate_manifest():
                     if txt_file and txt_file.exists():
                         item["extraction_status"] = "completed"
                         item["extracted_path"] = str(txt_file.relative_to(BASE_DIR))
-                        item["word_count"] = count_words_in_file(txt_file)
+                        item["word_count"] = count_words_in_file(txt_file, tokens)
                         total_words += item["word_count"]
                         items_extracted += 1
 
@@ -119,7 +136,7 @@ def generate_manifest():
                         except:
                             pass
 
-                    word_count = count_words_in_file(txt_file)
+                    word_count = count_words_in_file(txt_file, tokens)
                     item = {
                         "resource_type": resource_type,
                         "title": meta.get("title", stem),
@@ -157,6 +174,14 @@ def generate_manifest():
 
     # Sort items by type then name
     manifest["items"].sort(key=lambda x: (x["resource_type"], x.get("source_file") or x.get("title", "")))
+    metrics.record("manifest", time.perf_counter() - start)
+    metrics.count("manifest", "items", len(manifest["items"]))
+    metrics.count("manifest", "words", total_words + placeholder_words)
+
+    # Group near-duplicate texts (alternate slugs, placeholder vs. full text)
+    with metrics.timer("dedup"):
+        clusters = annotate_manifest(manifest, BASE_DIR)
+    manifest["statistics"]["duplicate_items"] = sum(len(c["members"]) - 1 for c in clusters)
 
     # Save manifest
     manifest_path = BASE_DIR / "manifest.json"
@@ -171,6 +196,10 @@ def generate_manifest():
     print(f"  Total word count: {total_words + placeholder_words:,}")
     print(f"    - From downloads: {total_words:,}")
     print(f"    - From placeholders: {placeholder_words:,}")
+    print(f"  Near-duplicate clusters: {len(clusters)}")
+    for cluster in clusters:
+        others = ", ".join(m for m in cluster["members"] if m != cluster["canonical"])
+        print(f"    - {cluster['canonical']} (duplicates: {others}, similarity {cluster['similarity']:.2f})")
     print(f"\nBy type:")
     for rtype, stats in by_type.items():
         print(f"  {rtype}: {stats['count']} items, {stats['word_count']:,} words")
@@ -179,3 +208,4 @@ def generate_manifest():
 
 if __name__ == "__main__":
     generate_manifest()
+    print(f"Metrics: {metrics.dump('manifest')}")
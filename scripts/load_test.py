@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Load generator for scripts/serve.py.
+
+Replays the gold and synthetic benchmark queries against /search over
+keep-alive connections and reports throughput, latency percentiles and how
+many requests the server shed with 503. By default every connection sends
+its next query as soon as the previous one returns (closed loop); --rate
+instead schedules requests at a fixed arrival rate (open loop) and measures
+latency from the scheduled send time, so queueing delay is not hidden when
+the server falls behind.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.chunking import CHUNKS_PATH, read_chunks
+from corpus.evaluation import load_gold, percentile, synthetic_queries
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection that sends GETs and reads JSON replies."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode('latin-1'))
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() == 'connection' and value.strip().lower() == 'close':
+                close = True
+        body = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+def search_path(query, k, method):
+    return "/search?" + urlencode({"q": query, "k": k, "method": method})
+
+async def closed_loop(args, paths, record):
+    deadline = time.perf_counter() + args.duration
+    counter = iter(range(args.requests or sys.maxsize))
+
+    async def worker():
+        conn = Connection(args.host, args.port)
+        try:
+            for i in counter:
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                await record(conn, paths[i % len(paths)], start)
+        finally:
+            conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(args.connections)))
+
+async def open_loop(args, paths, record):
+    pool = asyncio.Queue()
+    for _ in range(args.connections):
+        pool.put_nowait(Connection(args.host, args.port))
+    rng = random.Random(args.seed)
+    tasks = []
+
+    async def one(path, scheduled):
+        conn = await pool.get()
+        try:
+            await record(conn, path, scheduled)
+        finally:
+            pool.put_nowait(conn)
+
+    start = time.perf_counter()
+    scheduled = start
+    i = 0
+    while scheduled - start < args.duration and (not args.requests or i < args.requests):
+        # Poisson arrivals at the requested mean rate
+        scheduled += rng.expovariate(args.rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(paths[i % len(paths)], scheduled)))
+        i += 1
+    await asyncio.gather(*tasks)
+    while not pool.empty():
+        pool.get_nowait().close()
+
+async def run(args):
+    queries = load_gold() + synthetic_queries(read_chunks(args.chunks), args.synthetic, args.seed)
+    random.Random(args.seed).shuffle(queries)
+    paths = [search_path(q["query"], args.k, args.method) for q in queries]
+
+    latencies = []
+    statuses = {}
+
+    async def record(conn, path, start):
+        try:
+            status, _ = await conn.get(path)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            conn.close()
+            status = "connection error"
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    probe = Connection(args.host, args.port)
+    _, body = await probe.get("/stats")
+    before = json.loads(body)["batchers"].get(args.method, {})
+
+    start = time.perf_counter()
+    if args.rate:
+        await open_loop(args, paths, record)
+    else:
+        await closed_loop(args, paths, record)
+    elapsed = time.perf_counter() - start
+
+    _, body = await probe.get("/stats")
+    after = json.loads(body)["batchers"].get(args.method, {})
+    probe.close()
+
+    latencies.sort()
+    batches = after.get("batches", 0) - before.get("batches", 0)
+    batched = after.get("queries", 0) - before.get("queries", 0)
+    return {
+        "mode": f"open loop at {args.rate:g}/s" if args.rate else "closed loop",
+        "connections": args.connections,
+        "method": args.method,
+        "k": args.k,
+        "seconds": elapsed,
+        "requests": sum(statuses.values()),
+        "ok": statuses.get(200, 0),
+        "rejected": statuses.get(503, 0),
+        "statuses": {str(code): n for code, n in statuses.items()},
+        "qps": statuses.get(200, 0) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "mean_batch": batched / batches if batches else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-c', '--connections', type=int, default=32)
+    parser.add_argument('-n', '--requests', type=int, default=0, help="Stop after this many requests (0: no limit)")
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help="Stop after this many seconds")
+    parser.add_argument('--rate', type=float, default=0, help="Open-loop arrival rate in requests/s")
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--method', default='lexical')
+    parser.add_argument('--synthetic', type=int, default=500)
+    parser.add_argument('--chunks', type=Path, default=CHUNKS_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"{result['mode']}, {result['connections']} connections, {result['method']} k={result['k']}: "
+          f"{result['requests']:,} requests in {result['seconds']:.1f}s")
+    print(f"  {result['qps']:,.0f} QPS, p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+    print(f"  {result['rejected']:,} rejected (503), mean server batch {result['mean_batch']:.1f}, "
+          f"statuses {result['statuses']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Build the corpus end to end: downloads, text extraction, placeholders, the
+token store and manifest.json, rebuilding only what changed.
+
+Every download, PDF or blog page extraction and placeholder is its own task
+with declared inputs and outputs (see corpus/pipeline.py), in place of running
+download_all.py, download_more_blogs.py, download_gaucho.py, extract_text.py,
+create_placeholders.py and generate_manifest.py by hand. A task reruns only
+when the content of its inputs or its own outputs changed; independent tasks
+run in parallel (--downloads requests in flight, --jobs extraction processes).
+
+--dry-run lists what would run and why. --only and --force take task name
+patterns ("extract:*", "download:blog/*"); --offline leaves out the downloads.
+
+Each run logs to logs/pipeline_<time>.log and writes per-stage timings and
+counters to logs/metrics_pipeline_<time>.json; --profile STAGE runs that
+stage's tasks (or timed blocks, e.g. "tokens") under the profiler.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.boilerplate import BoilerplateFilter, learn_by_site, page_site
+from corpus.instrument import get_logger, metrics, setup_logging
+from corpus.pipeline import PIPELINE_DIR, STATE_PATH, Pipeline, Task
+
+import clean_blog_posts
+import create_placeholders
+import download_all
+import download_gaucho
+import download_more_blogs
+
+BOILERPLATE_PATH = PIPELINE_DIR / "boilerplate.json"
+# Seconds each download task waits after its request, to stay polite with --downloads in flight
+PAUSE = 1.0
+
+logger = get_logger("pipeline")
+
+def log(msg):
+    logger.info(msg)
+
+def rel(path):
+    return Path(path).relative_to(BASE_DIR).as_posix()
+
+# ============================================================================
+# Actions (module level, so cpu tasks can be sent to worker processes)
+# ============================================================================
+
+def fetch_eric(doc):
+    result = download_all.download_eric_doc(doc)
+    time.sleep(PAUSE)
+    if result["status"] != "downloaded":
+        raise RuntimeError(f"download failed: {doc['url']}")
+    return result
+
+def fetch_archive_book():
+    result = download_all.download_archive_org_book()
+    time.sleep(PAUSE)
+    if result["status"] != "downloaded":
+        raise RuntimeError(f"download failed: {download_all.ARCHIVE_BOOK_URL}")
+    return result
+
+def fetch_gaucho():
+    if not download_gaucho.main():
+        raise RuntimeError(f"download failed: archive.org item {download_gaucho.IDENTIFIER}")
+
+def fetch_blog(post):
+    ok = download_all.fetch_blog_post(post)
+    time.sleep(PAUSE)
+    if not ok:
+        raise RuntimeError(f"download failed: {post['slug']}")
+
+def probe_blog(post):
+    result = download_more_blogs.try_post(post)
+    time.sleep(PAUSE)
+    return result or {"title": post["title"], "status": "not found"}
+
+def learn_boilerplate(out_path):
+    """Save the boilerplate block hashes of every site's saved pages."""
+    pages = sorted((BASE_DIR / "sources" / "blog_posts").glob("*.html"))
+    model = {site: boilerplate.boilerplate_hashes() for site, boilerplate in sorted(learn_by_site(pages).items())}
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, indent=1, sort_keys=True)
+    return {site: len(hashes) for site, hashes in model.items()}
+
+def extract_blog(html_path, model_path):
+    if not html_path.exists():
+        return {"status": "no page"}
+    with open(model_path, 'r', encoding='utf-8') as f:
+        model = json.load(f)
+    boilerplate = BoilerplateFilter.from_hashes(model.get(page_site(html_path.read_text(encoding='utf-8')), []))
+    return {"changed": clean_blog_posts.clean_page(html_path, boilerplate)}
+
+def extract_or_placeholder(pdf_path, placeholder):
+    """Extract the PDF if it was downloaded, otherwise write the item's placeholder summary."""
+    if pdf_path.exists():
+        import extract_text
+        result = extract_text.extract_document(pdf_path)
+        if result["status"] != "extracted":
+            raise RuntimeError(f"extraction failed: {pdf_path.name}")
+        return result
+    if placeholder is not None:
+        words = create_placeholders.create_placeholder(placeholder)
+        metrics.count("placeholder", "words", words, placeholder["filename"])
+        return {"status": "placeholder", "words": words}
+    return {"status": "no source"}
+
+def build_token_store():
+    import extract_text
+    return extract_text.refresh_tokens()
+
+def write_manifest():
+    import generate_manifest
+    return generate_manifest.generate_manifest()["statistics"]
+
+# ============================================================================
+# Tasks
+# ============================================================================
+
+def build_tasks():
+    tasks = []
+    books = BASE_DIR / "sources" / "books"
+
+    for doc in download_all.ERIC_DOCS:
+        stem = f"{doc['year']}-Cortes-{doc['id']}"
+        tasks.append(Task(f"download:eric/{doc['id']}", fetch_eric, (doc,), params=doc, pool="network",
+                          outputs=[f"sources/eric_docs/{stem}.pdf", f"metadata/eric_docs/{stem}.json"],
+                          blocking=False))
+    stem = Path(download_all.ARCHIVE_BOOK_FILE).stem
+    tasks.append(Task("download:archive-book", fetch_archive_book, params=download_all.ARCHIVE_BOOK_URL,
+                      outputs=[rel(books / f"{stem}.pdf"), f"metadata/books/{stem}.json"],
+                      pool="network", blocking=False))
+    tasks.append(Task("download:gaucho", fetch_gaucho, params=download_gaucho.IDENTIFIER, pool="network",
+                      outputs=[rel(books / f"{download_gaucho.FILENAME}.pdf"),
+                               f"metadata/books/{download_gaucho.FILENAME}.json"],
+                      blocking=False))
+    for post in download_all.BLOG_POSTS:
+        html_path, _, meta_path = download_all.blog_post_paths(post)
+        tasks.append(Task(f"download:blog/{html_path.stem}", fetch_blog, (post,), params=post, pool="network",
+                          outputs=[rel(html_path), rel(meta_path)], blocking=False))
+    for post in download_more_blogs.ADDITIONAL_POSTS:
+        html_path = download_more_blogs.post_html_path(post)
+        tasks.append(Task(f"download:blog/{html_path.stem}", probe_blog, (post,), params=post, pool="network",
+                          outputs=[rel(html_path)], blocking=False))
+    declared = {out for task in tasks for out in task.outputs}
+
+    # Blog pages: one boilerplate model over all of them, then one extraction per page
+    model = rel(BOILERPLATE_PATH)
+    tasks.append(Task("extract:boilerplate", learn_boilerplate, (BOILERPLATE_PATH,),
+                      inputs=["sources/blog_posts/*.html", "corpus/boilerplate.py"], outputs=[model]))
+    pages = {rel(p) for p in (BASE_DIR / "sources" / "blog_posts").glob("*.html")}
+    pages |= {out for out in declared if out.endswith(".html")}
+    for page in sorted(pages):
+        stem = Path(page).stem
+        tasks.append(Task(f"extract:blog_posts/{stem}", extract_blog, (BASE_DIR / page, BOILERPLATE_PATH),
+                          inputs=[page, model, "corpus/boilerplate.py", "scripts/clean_blog_posts.py"],
+                          outputs=[f"extracted/blog_posts/{stem}.txt"], pool="cpu"))
+
+    # PDFs and placeholders: an item's text comes from its PDF when it was downloaded, else its summary
+    pdfs = {rel(p) for p in (BASE_DIR / "sources").glob("*/*.pdf")}
+    pdfs |= {out for out in declared if out.endswith(".pdf")}
+    placeholders = {f"{item['type']}/{item['filename']}": item for item in create_placeholders.PLACEHOLDER_ITEMS}
+    for item in sorted({p[len("sources/"):-len(".pdf")] for p in pdfs} | set(placeholders)):
+        pdf = f"sources/{item}.pdf"
+        meta = f"metadata/{item}.json"
+        outputs = [f"extracted/{item}.txt"] + ([meta] if meta not in declared else [])
+        if pdf in pdfs:
+            tasks.append(Task(f"extract:{item}", extract_or_placeholder, (BASE_DIR / pdf, placeholders.get(item)),
+                              inputs=[pdf, "scripts/extract_text.py"], outputs=outputs,
+                              params=placeholders.get(item), pool="cpu"))
+        else:
+            tasks.append(Task(f"placeholder:{item}", extract_or_placeholder, (BASE_DIR / pdf, placeholders[item]),
+                              outputs=outputs, params=placeholders[item]))
+
+    tasks.append(Task("tokens", build_token_store, outputs=["build/tokens/meta.json"],
+                      inputs=["extracted/**/*.txt", "corpus/tokenizer.py", "corpus/tokens.py"]))
+    tasks.append(Task("manifest", write_manifest, outputs=["manifest.json"],
+                      inputs=["sources/**/*", "extracted/**/*.txt", "metadata/**/*.json", "build/tokens/meta.json",
+                              "scripts/generate_manifest.py", "corpus/dedup.py"]))
+    return tasks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="Show what would run, and why, without running it")
+    parser.add_argument('--only', action='append', metavar='PATTERN',
+                        help="Only tasks matching this name pattern and what they depend on (repeatable)")
+    parser.add_argument('--force', action='append', default=[], metavar='PATTERN',
+                        help="Rerun tasks matching this name pattern even if fresh (repeatable)")
+    parser.add_argument('--offline', action='store_true', help="Skip the download tasks")
+    parser.add_argument('--retry-failed', action='store_true', help="Retry tasks that failed on an earlier run")
+    parser.add_argument('--jobs', type=int, help="Extraction worker processes (default: CPU count)")
+    parser.add_argument('--downloads', type=int, default=4, help="Download requests in flight")
+    parser.add_argument('--state', type=Path, default=STATE_PATH)
+    parser.add_argument('--profile', action='append', default=[], metavar='STAGE',
+                        help="Profile this stage (download, extract, placeholder, tokens, manifest, dedup or all)")
+    args = parser.parse_args()
+    metrics.profile_stages.update(args.profile)
+    log_file = setup_logging("pipeline")
+
+    start = time.perf_counter()
+    workers = {"network": args.downloads}
+    if args.jobs:
+        workers["cpu"] = args.jobs
+    pipeline = Pipeline(build_tasks(), BASE_DIR, args.state, workers)
+    skip = ("network",) if args.offline else ()
+
+    if args.dry_run:
+        plan = pipeline.plan(args.only, args.force, args.retry_failed, skip)
+        stale = [(task, reason) for task, reason in plan if reason]
+        for task, reason in stale:
+            print(f"  {task.name:<70} {reason}")
+        log(f"{len(stale)} of {len(plan)} tasks would run ({time.perf_counter() - start:.2f}s to check)")
+        return
+
+    def report(event, task, info):
+        if event == "start":
+            log(f"Running {task.name} ({info})")
+        elif event == "done":
+            log(f"  {task.name} done in {info['seconds']:.2f}s")
+        elif event == "failed":
+            log(f"  {task.name} FAILED: {info['error']}")
+        elif event == "blocked":
+            log(f"  {task.name} blocked by a failed dependency")
+
+    statuses = pipeline.run(args.only, args.force, args.retry_failed, skip, report)
+    counts = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    log(f"{len(statuses)} tasks: {summary} in {time.perf_counter() - start:.2f}s")
+    if any(status == "ran" for status in statuses.values()):
+        metrics.log_summary(log)
+    log(f"Metrics: {metrics.dump('pipeline')}")
+    log(f"Log file: {log_file}")
+    if counts.get("failed") or counts.get("blocked"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Query the BM25 index (or, with --method dense|ivf|hybrid, the vector store) from the command line.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.ann import DEFAULT_NPROBE, IVF_DIR, IVFIndex
+from corpus.context import METHODS as PACK_METHODS, ContextPacker
+from corpus.hybrid import FUSIONS, HybridSearcher
+from corpus.lexical import INDEX_DIR, LexicalIndex
+from corpus.segments import SegmentedIndex
+from corpus.snippets import WINDOW, Snippets
+from corpus.vectors import VECTOR_DIR, VectorStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('query')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--method', choices=['exhaustive', 'maxscore', 'wand', 'dense', 'ivf', 'hybrid'], default='exhaustive')
+    parser.add_argument('--index', type=Path, default=INDEX_DIR)
+    parser.add_argument('--segments', action='store_true', help="Search the incrementally updated index in build/segments")
+    parser.add_argument('--vectors', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--ivf', type=Path, default=IVF_DIR)
+    parser.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE)
+    parser.add_argument('--fusion', choices=FUSIONS, default='rrf', help="How --method hybrid combines the two lists")
+    parser.add_argument('--type', dest='resource_type', action='append', help="Only this resource type (repeatable)")
+    parser.add_argument('--series', action='append', help="Only this blog series (repeatable)")
+    parser.add_argument('--min-year', type=int)
+    parser.add_argument('--max-year', type=int)
+    parser.add_argument('--no-placeholders', action='store_true', help="Skip AI-generated placeholder summaries")
+    parser.add_argument('--snippet-size', type=int, default=WINDOW, help="Snippet length in tokens")
+    parser.add_argument('--context', type=int, metavar='TOKENS',
+                        help="Print the hits packed into a cited context of at most this many tokens")
+    parser.add_argument('--pack', choices=PACK_METHODS, default='knapsack', help="How --context selects passages")
+    args = parser.parse_args()
+
+    filters = {
+        "resource_type": args.resource_type,
+        "series": args.series,
+        "min_year": args.min_year,
+        "max_year": args.max_year,
+        "is_placeholder": False if args.no_placeholders else None,
+    }
+    filters = {name: value for name, value in filters.items() if value is not None}
+    options = {"filters": filters} if filters else {}
+    if options and (args.method == 'ivf' or args.segments):
+        parser.error("filters are not supported with --method ivf or --segments")
+
+    if args.method == 'dense':
+        store = VectorStore.load(args.vectors)
+        search = lambda: store.search(args.query, args.k, **options)
+    elif args.method == 'ivf':
+        ivf = IVFIndex.load(args.ivf, VectorStore.load(args.vectors))
+        search = lambda: ivf.search(args.query, args.k, args.nprobe)
+    elif args.method == 'hybrid':
+        hybrid = HybridSearcher(LexicalIndex.load(args.index), VectorStore.load(args.vectors), fusion=args.fusion)
+        search = lambda: hybrid.search(args.query, args.k, **options)
+    elif args.segments:
+        index = SegmentedIndex.load()
+        search = lambda: index.search(args.query, args.k)
+    else:
+        index = LexicalIndex.load(args.index)
+        search = lambda: index.search(args.query, args.k, method=args.method, **options)
+    corpus = Corpus.from_manifest()
+
+    start = time.perf_counter()
+    hits = search()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.context:
+        packer = ContextPacker(LexicalIndex.load(args.index), corpus)
+        start = time.perf_counter()
+        packed = packer.pack(hits, args.context, args.pack)
+        pack_ms = (time.perf_counter() - start) * 1000
+        print(packed["context"])
+        print(f"\n{len(packed['passages'])} passages from {len(hits)} hits, ~{packed['tokens']} of "
+              f"{args.context} tokens ({len(packed['dropped'])} chunks left out) in {pack_ms:.3f} ms "
+              f"(search {elapsed:.2f} ms)")
+        return
+
+    snippets = Snippets.load(LexicalIndex.load(args.index), corpus)
+    start = time.perf_counter()
+    snippets.annotate(hits, args.query, args.snippet_size)
+    snippet_ms = (time.perf_counter() - start) * 1000
+
+    for rank, hit in enumerate(hits, 1):
+        doc = corpus.get(hit["doc_id"])
+        title = doc.title if doc else hit["doc_id"]
+        page = f", page {hit['page']}" if hit["page"] is not None else ""
+        print(f"{rank:2}. {hit['score']:.3f}  {title}{page}")
+        if hit["snippet"]:
+            print(f"    {hit['snippet']['text']}")
+    print(f"\n{len(hits)} hits in {elapsed:.2f} ms (+{snippet_ms:.2f} ms for snippets)")
+
+if __name__ == "__main__":
+    main()
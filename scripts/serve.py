@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Serve the corpus and its indexes over local HTTP/JSON (see corpus/server.py).
+
+    curl 'http://127.0.0.1:8765/search?q=Lau+v.+Nichols&k=5'
+    curl 'http://127.0.0.1:8765/page?id=eric_docs/1973-Cortes-ED079204&n=12'
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.lexical import INDEX_DIR, LexicalIndex
+from corpus.pack import CorpusPack
+from corpus.server import MAX_BATCH, MAX_PENDING, MAX_WAIT_MS, RetrievalServer
+from corpus.vectors import VECTOR_DIR, VectorStore
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+async def run(args):
+    options = {"max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms, "max_pending": args.max_pending}
+    if args.pack:
+        pack = CorpusPack(args.pack)
+        server = RetrievalServer(corpus=pack.corpus, lexical=pack.lexical, scorer=pack.scorer,
+                                 snippets=pack.snippets, vectors=pack.vectors() if args.dense else None, **options)
+    else:
+        vectors = VectorStore.load(args.vectors) if args.dense else None
+        server = RetrievalServer(lexical=LexicalIndex.load(args.index), vectors=vectors, **options)
+    await server.start(args.host, args.port)
+    log(f"Serving {len(server.corpus)} documents, {server.lexical.n_docs:,} chunks "
+        f"on http://{args.host}:{args.port} (methods: {', '.join(sorted(server.batchers))})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--index', type=Path, default=INDEX_DIR)
+    parser.add_argument('--pack', type=Path, help="Serve everything from a corpus pack (build_pack.py)")
+    parser.add_argument('--dense', action='store_true', help="Also serve method=dense from the vector store")
+    parser.add_argument('--vectors', type=Path, default=VECTOR_DIR)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="Most queries scored in one call")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="How long a query may wait for others to batch with")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help="Queued queries before the server answers 503")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        log("Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Incrementally update the segmented BM25 index in build/segments.
+
+Diffs manifest.json against the documents already indexed (by extracted path
+and content hash) and only re-chunks and re-indexes what was added or
+changed; deletions become tombstones until their segment is merged. The
+first run indexes everything.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus import Corpus
+from corpus.chunking import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP
+from corpus.segments import SEGMENTS_DIR, update
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--manifest', type=Path, help="Manifest to index (default: the repo's manifest.json)")
+    parser.add_argument('--output', type=Path, default=SEGMENTS_DIR)
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP)
+    parser.add_argument('--unit', choices=['sentence', 'token'], default='sentence')
+    args = parser.parse_args()
+
+    log("=== Updating Segmented Index ===")
+    corpus = Corpus.from_manifest(args.manifest)
+    report = update(corpus, args.output, args.max_tokens, args.overlap, args.unit)
+    log(f"{report['added']} added, {report['changed']} changed, {report['removed']} removed, "
+        f"{report['unchanged']} unchanged")
+    log(f"{report['new_chunks']:,} chunks indexed, {report['merged_segments']} segments merged, "
+        f"{report['segments']} segments live")
+    log(f"Done in {report['seconds'] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Check that sources/, extracted/, metadata/ and manifest.json still agree,
+e.g. as a gate before deploying the corpus (see corpus/verify.py).
+
+Source files are hashed with MD5 on parallel threads and compared with the
+source_md5 their sidecars recorded. Digests are cached in build/verify/md5.json
+while a file's size and mtime are unchanged. Reports source mismatches, stale
+or missing extractions, missing or unreadable sidecars, word_count drift and
+orphan files.
+
+Exit status: 0 if there are no errors (with --strict, no warnings either),
+1 if there are, 2 if manifest.json cannot be read.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from corpus.documents import MANIFEST_PATH, load_manifest
+from corpus.verify import CACHE_PATH, load_hash_cache, save_hash_cache, verify_corpus
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strict', action='store_true', help="Fail on warnings too (orphans, drift, missing sidecars)")
+    parser.add_argument('--workers', type=int, help="Hashing threads (default: CPU count)")
+    parser.add_argument('--no-cache', action='store_true', help="Hash every file again instead of using the digest cache")
+    parser.add_argument('--json', type=Path, metavar='PATH', help="Also write the full report as JSON")
+    parser.add_argument('--quiet', action='store_true', help="Print only the summary")
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(MANIFEST_PATH)
+    except (OSError, ValueError) as e:
+        log(f"Cannot read {MANIFEST_PATH}: {e}")
+        sys.exit(2)
+
+    cache = load_hash_cache(None if args.no_cache else CACHE_PATH)
+    report = verify_corpus(manifest, BASE_DIR, cache, args.workers)
+    save_hash_cache(cache)
+
+    if not args.quiet:
+        for finding in report["findings"]:
+            print(f"  {finding['level'].upper():<8} {finding['check']:<18} {finding['path']}: {finding['detail']}")
+    counts = ", ".join(f"{n} {check}" for check, n in sorted(report["counts"].items())) or "no findings"
+    log(f"{report['files']} files ({report['hashed']} hashed, {report['cached']} cached digests) "
+        f"in {report['seconds']:.2f}s: {counts}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        log(f"Report: {args.json}")
+
+    failed = report["errors"] or (args.strict and report["warnings"])
+    log(f"{'FAILED' if failed else 'OK'}: {report['errors']} errors, {report['warnings']} warnings")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
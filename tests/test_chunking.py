@@ -0,0 +1,41 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from corpus.chunking import chunk_document
+
+BASE_DIR = Path(__file__).parent.parent
+
+def _document(path):
+    return SimpleNamespace(path=path, doc_id=f"test/{path.stem}", is_placeholder=False)
+
+@pytest.mark.parametrize("max_tokens, overlap, unit", [
+    (100, 40, "sentence"),
+    (50, 20, "sentence"),
+    (30, 25, "sentence"),
+    (64, 32, "token"),
+])
+def test_chunks_never_exceed_max_tokens(tmp_path, max_tokens, overlap, unit):
+    sentences = []
+    for i in range(200):
+        # Sentence lengths from 3 to 19 words, so overlap tails rarely line up with the budget
+        sentences.append(" ".join(f"word{i}_{j}" for j in range(3 + (i * 7) % 17)) + ".")
+    path = tmp_path / "doc.txt"
+    path.write_text("[Page 1]\n" + " ".join(sentences) + "\n", encoding="utf-8")
+
+    chunks = list(chunk_document(_document(path), max_tokens=max_tokens, overlap=overlap, unit=unit))
+
+    assert chunks
+    assert max(c["token_count"] for c in chunks) <= max_tokens
+    assert all(len(c["text"].split()) == c["token_count"] for c in chunks)
+
+@pytest.mark.parametrize("max_tokens, overlap", [(100, 40), (50, 20)])
+def test_corpus_chunks_never_exceed_max_tokens(max_tokens, overlap):
+    path = BASE_DIR / "extracted" / "blog_posts" / "from-conditional-to-equitable-inclusion-by-carlos-cortes.txt"
+    if not path.exists():
+        pytest.skip("extracted corpus text not available")
+
+    chunks = list(chunk_document(_document(path), max_tokens=max_tokens, overlap=overlap))
+
+    assert max(c["token_count"] for c in chunks) <= max_tokens
@@ -0,0 +1,41 @@
+import random
+
+from corpus.dedup import find_duplicate_documents
+from corpus.documents import Corpus
+
+def _words(rng, n):
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(n))
+
+def _corpus(tmp_path, texts):
+    items = []
+    for name, (text, placeholder) in texts.items():
+        (tmp_path / f"{name}.txt").write_text(text, encoding="utf-8")
+        items.append({"resource_type": "eric_docs", "extracted_path": f"{name}.txt", "is_placeholder": placeholder,
+                      "word_count": len(text.split())})
+    return Corpus({"items": items}, tmp_path)
+
+def test_placeholder_inside_full_text_is_clustered(tmp_path):
+    rng = random.Random(7)
+    full = _words(rng, 20000)
+    words = full.split()
+    # A one-page summary lifted from the middle of the full text, with a heading of its own
+    summary = "Summary of ED304241. " + " ".join(words[12000:12300])
+    corpus = _corpus(tmp_path, {
+        "ED304241": (full, False),
+        "ED304241-summary": (summary, True),
+        "other-summary": (_words(rng, 300), True),
+        "other-text": (_words(rng, 5000), False),
+    })
+
+    clusters = find_duplicate_documents(corpus)
+
+    assert len(clusters) == 1
+    assert clusters[0]["canonical"] == "eric_docs/ED304241"
+    assert clusters[0]["members"] == ["eric_docs/ED304241", "eric_docs/ED304241-summary"]
+    assert clusters[0]["similarity"] >= 0.8
+
+def test_unrelated_placeholders_are_not_clustered(tmp_path):
+    rng = random.Random(3)
+    corpus = _corpus(tmp_path, {"a": (_words(rng, 4000), False), "b": (_words(rng, 300), True)})
+
+    assert find_duplicate_documents(corpus) == []
@@ -0,0 +1,37 @@
+import pytest
+
+from corpus import documents
+from corpus.documents import Document
+
+def _document(tmp_path, data):
+    (tmp_path / "doc.txt").write_bytes(data)
+    return Document({"resource_type": "test", "extracted_path": "doc.txt"}, tmp_path)
+
+@pytest.mark.parametrize("scan_block", [7, 1 << 20])
+def test_char_offsets_follow_utf8_lead_bytes(tmp_path, monkeypatch, scan_block):
+    monkeypatch.setattr(documents, "CHAR_STRIDE", 5)
+    monkeypatch.setattr(documents, "SCAN_BLOCK", scan_block)
+    text = "Cortés — señor ∑ 𝄞 naïve " * 20
+    data = text.encode("utf-8")
+    doc = _document(tmp_path, data)
+
+    assert doc.char_length == len(text)
+    for pos in range(len(text) + 1):
+        assert doc.char_to_byte(pos) == len(text[:pos].encode("utf-8"))
+
+def test_invalid_utf8_does_not_shift_offsets(tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, "CHAR_STRIDE", 4)
+    # A stray continuation byte counts as part of the character before it
+    data = "ab".encode() + b"\x80" + "é cd é".encode() * 3
+    doc = _document(tmp_path, data)
+    leads = [i for i, b in enumerate(data) if b & 0xC0 != 0x80]
+
+    assert doc.char_length == len(leads)
+    assert [doc.char_to_byte(pos) for pos in range(len(leads))] == leads
+    assert doc.char_to_byte(len(leads)) == len(data)
+
+def test_ascii_and_empty_text(tmp_path):
+    assert _document(tmp_path, b"plain text").char_to_byte(5) == 5
+    empty = _document(tmp_path, b"")
+    assert empty.char_length == 0
+    assert empty.char_to_byte(3) == 0
@@ -0,0 +1,38 @@
+import pytest
+
+from corpus.documents import BUILD_DIR
+
+pytestmark = pytest.mark.skipif(not (BUILD_DIR / "lexical" / "meta.json").exists() or
+                                not (BUILD_DIR / "vectors" / "meta.json").exists(),
+                                reason="built indexes not available")
+
+EMPTY_FILTERS = [{"series": "no such series"}, {"max_year": 1900}]
+
+@pytest.fixture(scope="module")
+def searchers():
+    from corpus.hybrid import HybridSearcher
+    from corpus.lexical import LexicalIndex
+    from corpus.sparse import BatchScorer
+    from corpus.vectors import VectorStore
+
+    lexical = LexicalIndex.load()
+    vectors = VectorStore.load()
+    return {
+        "lexical": lexical,
+        "vectors": vectors,
+        "hybrid": HybridSearcher(lexical, vectors),
+        "batch": BatchScorer.from_index(lexical),
+    }
+
+@pytest.mark.parametrize("filters", EMPTY_FILTERS)
+@pytest.mark.parametrize("method", ["exhaustive", "maxscore", "wand", "dense", "hybrid", "batch"])
+def test_filter_matching_nothing_returns_no_hits(searchers, method, filters):
+    if method == "dense":
+        hits = searchers["vectors"].search("diversity", 5, filters=filters)
+    elif method == "hybrid":
+        hits = searchers["hybrid"].search("diversity", 5, filters=filters)
+    elif method == "batch":
+        hits = searchers["batch"].search_batch(["diversity"], 5, filters=filters)[0]
+    else:
+        hits = searchers["lexical"].search("diversity", 5, method=method, filters=filters)
+    assert hits == []
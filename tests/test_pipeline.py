@@ -0,0 +1,53 @@
+from corpus.pipeline import Pipeline, Task
+
+def write_upper(base_dir, source, target):
+    (base_dir / target).write_text((base_dir / source).read_text().upper())
+
+def write_text(base_dir, target, text):
+    (base_dir / target).write_text(text)
+
+def _pipeline(tmp_path):
+    tasks = [
+        Task("model", write_text, (tmp_path, "model.txt", "new model"), outputs=["model.txt"]),
+        Task("extract", write_upper, (tmp_path, "model.txt", "out.txt"), inputs=["model.txt"], outputs=["out.txt"]),
+    ]
+    return Pipeline(tasks, tmp_path, tmp_path / "state.json", workers={"cpu": 1})
+
+def test_outputs_are_not_adopted_after_a_dependency_ran(tmp_path):
+    # A checkout holding a stale output, and no model yet
+    (tmp_path / "out.txt").write_text("STALE")
+    pipeline = _pipeline(tmp_path)
+
+    plan = dict((task.name, reason) for task, reason in pipeline.plan())
+    statuses = pipeline.run()
+
+    assert plan == {"model": "new", "extract": "after model"}
+    assert statuses == {"model": "ran", "extract": "ran"}
+    assert (tmp_path / "out.txt").read_text() == "NEW MODEL"
+    assert _pipeline(tmp_path).run() == {"model": "fresh", "extract": "fresh"}
+
+def test_outputs_are_adopted_when_nothing_upstream_ran(tmp_path):
+    (tmp_path / "model.txt").write_text("new model")
+    (tmp_path / "out.txt").write_text("NEW MODEL")
+
+    assert _pipeline(tmp_path).run() == {"model": "adopted", "extract": "adopted"}
+
+def annotate(base_dir, source, target):
+    # Also edits its input, as extraction updates the word count in a download's sidecar
+    write_upper(base_dir, source, target)
+    with open(base_dir / source, 'a') as f:
+        f.write(" (annotated)")
+
+def test_edit_to_a_fresh_tasks_output_is_not_recorded_away(tmp_path):
+    def pipeline():
+        tasks = [
+            Task("model", write_text, (tmp_path, "model.txt", "new model"), outputs=["model.txt"]),
+            Task("annotate", annotate, (tmp_path, "model.txt", "out.txt"), inputs=["model.txt"], outputs=["out.txt"]),
+        ]
+        return Pipeline(tasks, tmp_path, tmp_path / "state.json", workers={"cpu": 1})
+
+    assert pipeline().run() == {"model": "ran", "annotate": "ran"}
+    assert pipeline().run(force=["annotate"]) == {"model": "fresh", "annotate": "ran"}
+    # annotate edited model's output while model was fresh; the next run notices
+    reason, _ = pipeline().check(pipeline().tasks["model"])
+    assert reason == "output changed: model.txt"